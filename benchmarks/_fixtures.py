@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import random
+import uuid
+
+from typing     import List, Tuple
+
+from utilities  import database, new_profile_entries
+################################################################################
+
+__all__ = (
+    "FakeGuild",
+    "FakeUser",
+    "seed_profiles",
+    "seed_additional_images",
+    "sample_profile_record",
+)
+
+################################################################################
+class FakeGuild:
+
+    def __init__(self, guild_id: int):
+
+        self.id: int = guild_id
+
+################################################################################
+class FakeUser:
+
+    def __init__(self, user_id: int):
+
+        self.id: int = user_id
+
+################################################################################
+async def seed_profiles(
+    num_profiles: int,
+    num_guilds: int,
+    *,
+    seed: int = 0
+) -> List[Tuple[str, int, int]]:
+    """Inserts ``num_profiles`` synthetic profiles spread over ``num_guilds``
+    guilds into the connected database and returns ``(profile_id, user_id, guild_id)``
+    for each. Roughly a third of the users have profiles in several guilds."""
+
+    rng = random.Random(seed)
+
+    guild_ids = [10_000 + i for i in range(num_guilds)]
+    user_pool = [1_000_000 + i for i in range(max(num_profiles * 2 // 3, 1))]
+
+    owners = set()
+    while len(owners) < num_profiles:
+        owners.add((rng.choice(guild_ids), rng.choice(user_pool)))
+
+    created = await new_profile_entries(sorted(owners))
+    rows = [(profile_id, user_id, guild_id) for profile_id, guild_id, user_id in created]
+
+    await database.executemany(
+        "UPDATE details SET char_name = $1, jobs = $2 WHERE profile_id = $3",
+        [
+            (f"Ribbit Croakington {i}", ["Bard", "Dancer", "Blue Mage"], r[0])
+            for i, r in enumerate(rows)
+        ]
+    )
+
+    return rows
+
+################################################################################
+async def seed_additional_images(profile_ids: List[str], per_profile: int = 2) -> int:
+
+    rows = [
+        (profile_id, uuid.uuid4().hex, f"https://cdn.example.com/{profile_id}/{i}.png", None)
+        for profile_id in profile_ids
+        for i in range(per_profile)
+    ]
+
+    await database.executemany(
+        "INSERT INTO addl_images (profile_id, image_id, url, caption) VALUES ($1, $2, $3, $4)",
+        rows
+    )
+
+    return len(rows)
+
+################################################################################
+def sample_profile_record(index: int = 0) -> Tuple:
+    """A fully filled-in ``profile_master`` row."""
+
+    return (
+        uuid.uuid4().hex, 1_000_000 + index, 10_000,
+        # Details
+        f"Ribbit Croakington the {index}th", "https://example.com/ribbit", 0x2ECC71,
+        ["Bard", "Dancer", "Blue Mage", "Astrologian"], "Hourly: 1.5M gil\nNightly: 5M gil",
+        None,
+        # Personality
+        ["Long walks by the pond", "Fly hunting", "Karaoke"], ["Herons", "Dry weather"],
+        "Loud, cheerful and very, very damp.",
+        "Born in a quiet pond outside Gridania, Ribbit set out to croak across "
+        "all of Eorzea. " * 8,
+        # At A Glance
+        "1", [1, 4], "3", "5", "2", "183", "27", "Ribbit Croakington@Mateus",
+        # Images
+        "https://cdn.example.com/thumb.png", "https://cdn.example.com/main.png",
+        # Post hash
+        None,
+    )
+
+################################################################################
@@ -0,0 +1,59 @@
+"""Profile compile benchmark.
+
+Compares compiling a fully filled-in profile from scratch every time (the old
+behaviour, forced here by invalidating every section) with the cached render,
+and with the common case of one section changing between renders.
+
+    python -m benchmarks.bench_compile --iterations 5000
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from classes.profiles   import Profile
+
+from benchmarks._fixtures   import FakeUser, sample_profile_record
+################################################################################
+def main(args: argparse.Namespace) -> None:
+
+    record = sample_profile_record()
+    profile = Profile.load(FakeUser(record[1]), None, record)  # type: ignore
+    profile.images.additional_images_from_data([
+        (profile.id, f"img{i}", f"https://cdn.example.com/{i}.png", f"Caption {i}")
+        for i in range(5)
+    ])
+
+    def cold():
+        profile.invalidate()
+        profile.compile()
+        profile.progress_text()
+
+    def one_section():
+        profile.invalidate(profile.ataglance)
+        profile.compile()
+        profile.progress_text()
+
+    def warm():
+        profile.compile()
+        profile.progress_text()
+
+    n = args.iterations
+    print(f"{'scenario':<28}{'renders/s':>12}")
+    for name, func in (
+        ("uncached (before)", cold),
+        ("one section invalidated", one_section),
+        ("cached (after)", warm),
+    ):
+        elapsed = timeit.timeit(func, number=n)
+        print(f"{name:<28}{n / elapsed:>12,.0f}")
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+
+    main(parser.parse_args())
+
+################################################################################
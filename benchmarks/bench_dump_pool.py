@@ -0,0 +1,82 @@
+"""Image dump pool throughput benchmark.
+
+Pushes a burst of uploads through :class:`DiscordChannelStorage` with pools of
+simulated dump targets, each costing a simulated REST round trip and allowed
+``--burst`` posts per ``--period`` seconds like a real channel. Reports
+uploads per second for each pool size and how evenly the pool was used.
+
+    python -m benchmarks.bench_dump_pool --uploads 30 --pool 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from utilities  import DiscordChannelStorage, DumpTarget, StoredObject
+################################################################################
+class SimulatedTarget(DumpTarget):
+
+    __slots__ = ("round_trip", "rng")
+
+    def __init__(self, index: int, round_trip: float, **kwargs):
+
+        super().__init__(f"bench:{index}", **kwargs)
+
+        self.round_trip: float = round_trip
+        self.rng: random.Random = random.Random(index)
+
+    async def send(self, fp, filename: str) -> StoredObject:
+
+        await asyncio.sleep(self.round_trip * self.rng.uniform(0.5, 1.5))
+        channel_id = int(self.label[6:])
+        return StoredObject(
+            f"https://cdn.discordapp.com/attachments/{channel_id}/1/{filename}", channel_id, 1, 1
+        )
+
+################################################################################
+async def run(args: argparse.Namespace, size: int) -> None:
+
+    limits = {"rate": args.burst / args.period, "burst": args.burst}
+    storage = DiscordChannelStorage(
+        [SimulatedTarget(i, args.latency, **limits) for i in range(size)]
+    )
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        storage.put(io.BytesIO(b""), f"k{i}", filename=f"{i}.png", content_type="image/png")
+        for i in range(args.uploads)
+    ])
+    elapsed = time.perf_counter() - start
+
+    uploads = [t.uploads for t in storage.targets]
+    latency = sum(t.total_seconds for t in storage.targets) / args.uploads
+    print(
+        f"{size:>6}{args.uploads / elapsed:>12,.1f}{latency * 1000:>14,.0f}"
+        f"{min(uploads):>8}{max(uploads):>8}"
+    )
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    print(f"{args.uploads} uploads, {args.burst} per {args.period:g}s per target\n")
+    print(f"{'pool':>6}{'uploads/s':>12}{'latency (ms)':>14}{'min':>8}{'max':>8}")
+
+    for size in args.pool:
+        await run(args, size)
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=30)
+    parser.add_argument("--pool", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--period", type=float, default=5.0)
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
@@ -0,0 +1,87 @@
+"""Startup hydration benchmark.
+
+Seeds synthetic ``profile_master`` rows into an in-memory SQLite database and
+loads them through :meth:`FrogBot.load_profiles` with a fake Discord client
+whose ``fetch_user`` costs a simulated REST round trip. Reports the time until
+the bot is responsive (``load_profiles`` returns) and until every profile
+owner has been resolved, next to the old one-request-at-a-time loop.
+
+    python -m benchmarks.bench_hydration --profiles 2000 --guilds 20 --latency 0.05
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from classes.bot    import FrogBot
+from utilities      import assert_db_structure, database
+
+from benchmarks._fixtures   import FakeGuild, FakeUser, seed_profiles
+################################################################################
+class FakeFrogBot(FrogBot):
+
+    def __init__(self, latency: float, concurrency: int, rate: float):
+
+        super().__init__()
+
+        # Client.latency is the gateway heartbeat latency, and read-only.
+        self.fetch_latency: float = latency
+        self.hydration_concurrency = concurrency
+        self.hydration_rate = rate
+        self.profile_cache = None
+
+    def get_user(self, user_id: int):
+
+        return None
+
+    async def fetch_user(self, user_id: int):
+
+        await asyncio.sleep(self.fetch_latency)
+        return FakeUser(user_id)
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    await database.connect("sqlite://:memory:")
+    await assert_db_structure()
+
+    rows = await seed_profiles(args.profiles, args.guilds)
+    guild_ids = sorted({r[2] for r in rows})
+    distinct_users = len({r[1] for r in rows})
+
+    bot = FakeFrogBot(args.latency, args.concurrency, args.rate)
+    for guild_id in guild_ids:
+        bot.add_frog(FakeGuild(guild_id))  # type: ignore
+
+    start = time.perf_counter()
+    await bot.load_profiles()
+    responsive = time.perf_counter() - start
+
+    await bot._hydration
+    hydrated = time.perf_counter() - start
+
+    # The previous implementation awaited one fetch per profile row.
+    sequential_estimate = len(rows) * args.latency
+
+    print(f"profiles={len(rows)} guilds={len(guild_ids)} distinct_users={distinct_users}")
+    print(f"fetch latency={args.latency * 1000:.0f}ms concurrency={args.concurrency} rate={args.rate}/s")
+    print(f"responsive after   {responsive:8.3f}s")
+    print(f"fully hydrated in  {hydrated:8.3f}s")
+    print(f"sequential (old)  ~{sequential_estimate:8.3f}s")
+
+    await database.close()
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=40.0)
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
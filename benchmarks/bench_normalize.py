@@ -0,0 +1,84 @@
+"""Image normalization throughput benchmark.
+
+Pushes a batch of synthetic photo-sized PNGs and JPEGs through
+:class:`ImageNormalizer` (as main images and as thumbnails) with increasing
+process pool sizes and reports images per second overall and per worker,
+plus how much smaller the stored images are. Requires Pillow.
+
+    python -m benchmarks.bench_normalize --images 48 --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import random
+import time
+
+from PIL    import Image
+
+from utilities  import ImageNormalizer, SectionType
+################################################################################
+def synthetic_images(count: int, seed: int) -> list:
+
+    rng = random.Random(seed)
+    images = []
+
+    for i in range(count):
+        width, height = rng.choice(((2400, 1600), (1920, 1080), (3024, 4032), (1200, 1200)))
+        # Noise over a gradient compresses about as badly as a real photo.
+        noise = Image.effect_noise((width, height), rng.uniform(20, 60))
+        gradient = Image.linear_gradient("L").resize((width, height))
+        image = Image.merge("RGB", (noise, gradient, Image.blend(noise, gradient, 0.5)))
+
+        out = io.BytesIO()
+        if i % 2:
+            image.save(out, format="PNG", compress_level=1)
+        else:
+            image.save(out, format="JPEG", quality=92)
+        images.append(out.getvalue())
+
+    return images
+
+################################################################################
+async def run(normalizer: ImageNormalizer, images: list) -> tuple:
+
+    sections = (SectionType.MainImage, SectionType.Thumbnail)
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        normalizer.normalize(data, sections[i % 2]) for i, data in enumerate(images)
+    ])
+    elapsed = time.perf_counter() - start
+
+    return elapsed, sum(len(r.data) for r in results)
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    images = synthetic_images(args.images, args.seed)
+    total_in = sum(len(data) for data in images)
+    print(f"{len(images)} images, {total_in / 1e6:,.1f} MB in total\n")
+
+    print(f"{'workers':>8}{'images/s':>12}{'per worker':>12}{'MB out':>10}")
+    for workers in args.workers:
+        normalizer = ImageNormalizer(workers=workers)
+        # Spin the pool up first so process start-up isn't counted.
+        await run(normalizer, images[:workers])
+
+        elapsed, total_out = await run(normalizer, images)
+        rate = len(images) / elapsed
+        print(f"{workers:>8}{rate:>12,.1f}{rate / workers:>12,.1f}{total_out / 1e6:>10,.1f}")
+
+        normalizer.close()
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
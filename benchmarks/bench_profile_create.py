@@ -0,0 +1,85 @@
+"""Profile creation benchmark.
+
+Times creating blank profiles three ways: the old path (an existence check
+and five INSERTs, each its own round trip), the single-statement
+``new_profile_entry`` and the bulk ``new_profile_entries``. Round trips are
+what the new paths save, so point ``--dsn`` at a real Postgres server to see
+the full difference; the default in-memory SQLite database only shows the
+statement overhead.
+
+    python -m benchmarks.bench_profile_create --profiles 2000 --dsn postgresql://...
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+
+from utilities  import (
+    assert_db_structure,
+    database,
+    new_profile_entries,
+    new_profile_entry
+)
+################################################################################
+async def old_profile_entry(guild_id: int, user_id: int) -> str:
+
+    async with database.transaction() as conn:
+        if await database.profiles.exists(guild_id, user_id, conn=conn):
+            raise ValueError("Profile already exists.")
+
+        new_profile_id = uuid.uuid4().hex
+        await conn.execute(
+            "INSERT INTO profiles (profile_id, user_id, guild_id) VALUES ($1, $2, $3)",
+            new_profile_id, user_id, guild_id
+        )
+        for table in ("details", "personality", "ataglance", "images"):
+            await conn.execute(f"INSERT INTO {table} (profile_id) VALUES ($1)", new_profile_id)
+
+    return new_profile_id
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    await database.connect(args.dsn, ssl=args.ssl)
+    await assert_db_structure()
+
+    n = args.profiles
+    print(f"{'path':<28}{'profiles/s':>12}")
+
+    # A distinct guild per scenario keeps the existence checks honest.
+    for guild_id, name, create in (
+        (1, "check + 5 INSERTs (before)", old_profile_entry),
+        (2, "single statement", new_profile_entry),
+    ):
+        start = time.perf_counter()
+        for user_id in range(n):
+            await create(guild_id, user_id)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28}{n / elapsed:>12,.0f}")
+
+    start = time.perf_counter()
+    created = await new_profile_entries((3, user_id) for user_id in range(n))
+    elapsed = time.perf_counter() - start
+    print(f"{'bulk':<28}{len(created) / elapsed:>12,.0f}")
+
+    await database.execute("DELETE FROM profiles WHERE guild_id IN (1, 2, 3)")
+    for table in ("details", "personality", "ataglance", "images"):
+        await database.execute(
+            f"DELETE FROM {table} WHERE profile_id NOT IN (SELECT profile_id FROM profiles)"
+        )
+
+    await database.close()
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=2000)
+    parser.add_argument("--dsn", default="sqlite://:memory:")
+    parser.add_argument("--ssl", default="disable")
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
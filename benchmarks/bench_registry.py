@@ -0,0 +1,120 @@
+"""Guild/profile registry benchmark.
+
+Loads synthetic profiles (default 100k across 1k guilds, a tenth of them with
+additional images) from the SQLite stand-in through :meth:`FrogBot.load_profiles`
+and times startup plus the three hot lookups -- ``get_frog``, the per-guild
+owner lookup behind ``GuildData.get_profile`` and ``_get_profile`` -- against
+the linear scans they replaced.
+
+    python -m benchmarks.bench_registry --profiles 100000 --guilds 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import timeit
+
+from classes.bot    import FrogBot
+from utilities      import assert_db_structure, database
+
+from benchmarks._fixtures   import FakeGuild, FakeUser, seed_additional_images, seed_profiles
+################################################################################
+class FakeFrogBot(FrogBot):
+
+    def __init__(self):
+
+        super().__init__()
+
+        # Eager mode: everything is loaded at startup.
+        self.profile_cache = None
+
+    def get_user(self, user_id: int):
+
+        return FakeUser(user_id)
+
+################################################################################
+def per_call(func, number: int) -> float:
+
+    return timeit.timeit(func, number=number) / number
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    await database.connect("sqlite://:memory:")
+    await assert_db_structure()
+
+    rows = await seed_profiles(args.profiles, args.guilds)
+    with_images = [r[0] for r in rows[::10]]
+    num_images = await seed_additional_images(with_images)
+
+    bot = FakeFrogBot()
+    for guild_id in sorted({r[2] for r in rows}):
+        bot.add_frog(FakeGuild(guild_id))  # type: ignore
+
+    start = time.perf_counter()
+    await bot.load_profiles()
+    startup = time.perf_counter() - start
+    await bot._hydration
+
+    rng = random.Random(1)
+    samples = [rng.choice(rows) for _ in range(1000)]
+    frogs = list(bot.frog_guilds.values())
+    profiles = list(bot._profiles.values())
+
+    def linear_frog(guild_id):
+        for frog in frogs:
+            if frog.parent.id == guild_id:
+                return frog
+
+    def linear_profile(profile_id):
+        for profile in profiles:
+            if profile.id == profile_id:
+                return profile
+
+    def linear_owner(frog, user_id):
+        for profile in frog.profiles.values():
+            if profile.user_id == user_id:
+                return profile
+
+    results = [
+        (
+            "get_frog",
+            per_call(lambda: [bot.get_frog(s[2]) for s in samples], 20),
+            per_call(lambda: [linear_frog(s[2]) for s in samples], 5),
+        ),
+        (
+            "guild owner lookup",
+            per_call(lambda: [bot.get_frog(s[2]).find_profile(s[1]) for s in samples], 20),
+            per_call(lambda: [linear_owner(bot.get_frog(s[2]), s[1]) for s in samples], 5),
+        ),
+        (
+            "_get_profile",
+            per_call(lambda: [bot._get_profile(s[0]) for s in samples], 20),
+            per_call(lambda: [linear_profile(s[0]) for s in samples[:20]], 1) * 50,
+        ),
+    ]
+
+    print(f"profiles={len(rows)} guilds={len(frogs)} addl_images={num_images}")
+    print(f"load_profiles: {startup:.3f}s")
+    # The old startup resolved each image-owning profile with a full scan.
+    scan = per_call(lambda: linear_profile(rows[-1][0]), 5)
+    print(f"  old addl-image attach estimate: {scan * len(with_images):.1f}s (full scan x {len(with_images)})")
+    print()
+    print(f"{'lookup (x1000)':<22}{'indexed':>12}{'linear':>12}")
+    for name, indexed, linear in results:
+        print(f"{name:<22}{indexed * 1000:>10.3f}ms{linear * 1000:>10.1f}ms")
+
+    await database.close()
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=1_000)
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
@@ -0,0 +1,161 @@
+"""Profile republish benchmark.
+
+Republishes an already-posted profile through a fake client whose REST calls
+each cost a simulated round trip, comparing the old fetch-then-edit path
+(resolving the channel and fetching the message before editing it) with
+:meth:`Profile.post` editing through a partial message, and with the post
+already showing the same content, when the edit is skipped. Reports REST
+calls and milliseconds per republish, with the post channel cached and
+uncached.
+
+    python -m benchmarks.bench_republish --latency 0.08 --iterations 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from classes.profiles   import Profile
+from utilities          import assert_db_structure, database, outbound
+
+from benchmarks._fixtures   import FakeUser, sample_profile_record
+################################################################################
+class FakeClient:
+
+    def __init__(self, latency: float, cached: bool):
+
+        self.latency: float = latency
+        self.cached: bool = cached
+        self.calls: int = 0
+
+    async def rest(self) -> None:
+
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    def get_channel(self, channel_id: int):
+
+        return FakeChannel(self, channel_id) if self.cached else None
+
+    def get_partial_messageable(self, channel_id: int):
+
+        return FakeChannel(self, channel_id)
+
+    async def fetch_channel(self, channel_id: int):
+
+        await self.rest()
+        return FakeChannel(self, channel_id)
+
+    async def get_or_fetch_channel(self, channel_id: int):
+
+        return self.get_channel(channel_id) or await self.fetch_channel(channel_id)
+
+################################################################################
+class FakeChannel:
+
+    def __init__(self, client: FakeClient, channel_id: int):
+
+        self.client: FakeClient = client
+        self.id: int = channel_id
+
+    def get_partial_message(self, message_id: int):
+
+        return FakeMessage(self, message_id)
+
+    async def fetch_message(self, message_id: int):
+
+        await self.client.rest()
+        return FakeMessage(self, message_id)
+
+################################################################################
+class FakeMessage:
+
+    def __init__(self, channel: FakeChannel, message_id: int):
+
+        self.channel: FakeChannel = channel
+        self.id: int = message_id
+
+    async def edit(self, **kwargs) -> None:
+
+        await self.channel.client.rest()
+
+################################################################################
+class FakeResponse:
+
+    def is_done(self) -> bool:
+
+        return False
+
+    async def send_message(self, **kwargs) -> None:
+
+        return
+
+class FakeInteraction:
+
+    def __init__(self, client: FakeClient):
+
+        self.id: int = 40000
+        self.client: FakeClient = client
+        self.response: FakeResponse = FakeResponse()
+
+################################################################################
+async def republish_before(profile: Profile, client: FakeClient) -> None:
+
+    parts = profile.details.post_url.split("/")
+    channel = await client.get_or_fetch_channel(int(parts[5]))
+    message = await channel.fetch_message(int(parts[6]))
+    await message.edit(embeds=list(filter(None, profile.compile())))
+
+################################################################################
+async def main(args: argparse.Namespace) -> None:
+
+    # Publishing persists the post's hash through the write-behind queue.
+    await database.connect("sqlite://:memory:")
+    await assert_db_structure()
+
+    record = sample_profile_record()
+    profile = Profile.load(FakeUser(record[1]), None, record)  # type: ignore
+    profile.details._post_url = "https://discord.com/channels/10000/20000/30000"
+
+    async def after(p: Profile, client: FakeClient) -> None:
+        # Forget what was published so every run really edits.
+        p.details._post_hash = None
+        await p.post(FakeInteraction(client))  # type: ignore
+
+    async def unchanged(p: Profile, client: FakeClient) -> None:
+        await p.post(FakeInteraction(client))  # type: ignore
+
+    paths = (
+        ("fetch + edit (before)", republish_before),
+        ("partial edit (after)", after),
+        ("unchanged (suppressed)", unchanged),
+    )
+
+    print(f"{'path':<24}{'channel':>10}{'REST calls':>12}{'ms':>10}")
+    for name, republish in paths:
+        for cached in (False, True):
+            client = FakeClient(args.latency, cached)
+            start = time.perf_counter()
+            for _ in range(args.iterations):
+                await republish(profile, client)
+            elapsed = (time.perf_counter() - start) / args.iterations
+
+            print(
+                f"{name:<24}{'cached' if cached else 'uncached':>10}"
+                f"{client.calls / args.iterations:>12.1f}{elapsed * 1000:>10.1f}"
+            )
+
+    await outbound.close()
+    await database.close()
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.08)
+    parser.add_argument("--iterations", type=int, default=20)
+
+    asyncio.run(main(parser.parse_args()))
+
+################################################################################
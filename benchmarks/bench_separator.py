@@ -0,0 +1,135 @@
+"""Separator width benchmark.
+
+Compares the old per-character if/elif chain in ``draw_separator`` with the
+precomputed glyph table, both uncached and memoized, over realistic character
+names and job strings.
+
+    python -m benchmarks.bench_separator --iterations 200000
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import timeit
+
+from utilities.utils.common import draw_separator
+################################################################################
+
+FIRST_NAMES = (
+    "Allegro", "Y'shtola", "Thancred", "Alisaie", "Urianger", "G'raha",
+    "Estinien", "Lyse", "Hien", "Ryne", "Zenos", "Krile", "Tataru", "M'naago",
+)
+LAST_NAMES = (
+    "Vivo", "Rhul", "Waters", "Leveilleur", "Augurelt", "Tia", "Wyrmblood",
+    "Hext", "Rijin", "Waters", "yae Galvus", "Mayata", "Taru", "Rae'koh",
+)
+JOBS = (
+    "Paladin", "Warrior", "Dark Knight", "Gunbreaker", "White Mage", "Scholar",
+    "Astrologian", "Sage", "Monk", "Dragoon", "Ninja", "Samurai", "Reaper",
+    "Bard", "Machinist", "Dancer", "Black Mage", "Summoner", "Red Mage",
+    "Blue Mage", "Bartender", "Dancer (1st shift)", "Courtesan {VIP}",
+)
+
+################################################################################
+def _old_draw_separator(*, text: str = "", num_emoji: int = 0, extra: float = 0.0) -> str:
+
+    text_value = extra + (1.95 * num_emoji)
+
+    for c in text:
+        if c == "'":
+            text_value += 0.25
+        elif c in ("i", "j", ".", " "):
+            text_value += 0.30
+        elif c in ("I", "!", ";", "|", ","):
+            text_value += 0.35
+        elif c in ("f", "l", "`", "[", "]"):
+            text_value += 0.40
+        elif c in ("(", ")", "t"):
+            text_value += 0.45
+        elif c in ("r", "t", "1", "{", "}", '"', "\\", "/"):
+            text_value += 0.50
+        elif c in ("s", "z", "*", "-"):
+            text_value += 0.60
+        elif c in ("x", "^"):
+            text_value += 0.65
+        elif c in ("a", "c", "e", "g", "k", "v", "y", "J", "7", "_", "=", "+", "~", "<", ">", "?"):
+            text_value += 0.70
+        elif c in ("n", "o", "u", "2", "5", "6", "8", "9"):
+            text_value += 0.75
+        elif c in ("b", "d", "h", "p", "q", "E", "F", "L", "S", "T", "Z", "3", "4", "$"):
+            text_value += 0.80
+        elif c in ("P", "V", "X", "Y", "0"):
+            text_value += 0.85
+        elif c in ("A", "B", "C", "D", "K", "R", "#", "&"):
+            text_value += 0.90
+        elif c in ("G", "H", "U"):
+            text_value += 0.95
+        elif c in ("w", "N", "O", "Q", "%"):
+            text_value += 1.0
+        elif c in ("m", "W"):
+            text_value += 1.15
+        elif c == "M":
+            text_value += 1.2
+        elif c == "@":
+            text_value += 1.3
+
+    return "═" * math.ceil(text_value)
+
+################################################################################
+def _samples(count: int, seed: int) -> list:
+
+    rng = random.Random(seed)
+    samples = []
+
+    for _ in range(count):
+        if rng.random() < 0.5:
+            samples.append(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+        else:
+            samples.append("/".join(rng.sample(JOBS, rng.randint(1, 4))))
+
+    return samples
+
+################################################################################
+def main(args: argparse.Namespace) -> None:
+
+    samples = _samples(args.distinct, args.seed)
+
+    # The old chain (with its "1" "{" typo fixed above) must agree everywhere.
+    for text in samples:
+        assert _old_draw_separator(text=text) == draw_separator(text=text), text
+
+    n = args.iterations
+    new_draw_separator = draw_separator.__wrapped__
+
+    def run(func):
+        for text in samples:
+            func(text=text)
+
+    def cached():
+        run(draw_separator)
+
+    print(f"{len(samples)} distinct strings, {n:,} calls per scenario")
+    print(f"{'scenario':<28}{'calls/s':>14}")
+    for name, func in (
+        ("if/elif chain (before)", lambda: run(_old_draw_separator)),
+        ("glyph table, uncached", lambda: run(new_draw_separator)),
+        ("glyph table, memoized", cached),
+    ):
+        elapsed = timeit.timeit(func, number=max(n // len(samples), 1))
+        print(f"{name:<28}{n / elapsed:>14,.0f}")
+
+    info = draw_separator.cache_info()
+    print(f"\ncache: {info.hits:,} hits, {info.misses:,} misses, {info.currsize} entries")
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+
+    main(parser.parse_args())
+
+################################################################################
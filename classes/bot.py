@@ -1,15 +1,53 @@
 from __future__ import annotations
 
-from discord    import Attachment, Bot, NotFound, TextChannel
-from typing     import TYPE_CHECKING, Dict, List, Optional, Tuple
-
-from utilities  import convert_db_list, db_connection
+import asyncio
+import os
+import time
+import weakref
+
+from discord    import (
+    ApplicationContext,
+    Attachment,
+    Bot,
+    DiscordException,
+    Guild,
+    Member,
+    NotFound,
+    TextChannel,
+    User
+)
+from typing     import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from utilities  import (
+    BackgroundJobs,
+    DebouncedQueue,
+    DiscordChannelStorage,
+    ImageIngestor,
+    ImageNormalizer,
+    ImageStorage,
+    LRUCache,
+    LoopMonitor,
+    MetricsServer,
+    SectionType,
+    UserHydrator,
+    attachment_urls,
+    compact_empty_profiles,
+    connect_database,
+    database,
+    interaction_failed,
+    open_image_storage,
+    outbound,
+    profiler,
+    tracer,
+    track_interaction
+)
 
 from classes.profiles   import Profile
 from classes.config     import GuildConfiguration
+from classes.guild      import GuildData
 
 if TYPE_CHECKING:
-    from classes.guild  import GuildData
+    from utilities.database.pool    import Record
 ################################################################################
 
 __all__ = (
@@ -22,31 +60,177 @@ class FrogBot(Bot):
 
     Attributes
     -----------
-    frog_guilds: :class:`list`
-        A list of custom guild objects that hold data pertaining
-        to bot features.
+    frog_guilds: Dict[:class:`int`, :class:`GuildData`]
+        Custom guild objects that hold data pertaining to bot
+        features, keyed by guild ID.
+
+    hydration_concurrency: :class:`int`
+        The maximum number of user fetches in flight while resolving
+        profile owners after startup. (``HYDRATION_CONCURRENCY``)
+
+    hydration_rate: :class:`float`
+        The maximum number of user fetches per second while resolving
+        profile owners after startup. (``HYDRATION_RATE``)
+
+    profile_cache: Optional[:class:`LRUCache`]
+        In ``lazy`` load mode (``PROFILE_LOAD_MODE``, the default), the
+        working set of profiles keyed by ``(guild_id, user_id)`` and bounded
+        by ``PROFILE_CACHE_SIZE``. Profiles are fetched on first access and
+        evicted least-recently-used first. An evicted profile that's still in
+        use (eg. by an open view, or its own queued writes) is brought back as
+        is when next fetched. ``None`` in ``eager`` mode, where every profile
+        is loaded at startup and kept.
+
+    image_normalizer: :class:`ImageNormalizer`
+        Validates uploaded images and downscales/transcodes them for the
+        profile section they're used in, in a pool of ``IMAGE_WORKERS``
+        processes.
+
+    image_storage: :class:`ImageStorage`
+        Where profile images are stored, chosen by ``IMAGE_STORAGE``:
+        ``discord`` (the default; a pool of dump channels/webhooks),
+        ``local`` or ``s3``.
+
+    image_ingestor: :class:`ImageIngestor`
+        Streams uploaded images into ``image_storage``, uploading each
+        distinct image (by SHA-256) only once.
+
+    image_uploads: :class:`BackgroundJobs`
+        Runs image uploads started by interactions in the background,
+        ``IMAGE_UPLOAD_CONCURRENCY`` at a time, retrying failures with
+        backoff.
+
+    auto_republish: Optional[:class:`DebouncedQueue`]
+        With ``AUTO_REPUBLISH`` on, edits posted profiles' posts after their
+        profile changes, without another ``/profiles finalize``. Changes within
+        ``AUTO_REPUBLISH_DELAY`` seconds of each other (up to
+        ``AUTO_REPUBLISH_MAX_DELAY``) are published in one edit, and at most
+        ``AUTO_REPUBLISH_RATE`` edits go out per second. ``None`` when off.
+
+    metrics_server: Optional[:class:`MetricsServer`]
+        Serves the bot's metrics in Prometheus' text format on
+        ``METRICS_HOST`` (default loopback) port ``METRICS_PORT`` (default
+        9108; ``0`` turns it off).
+
+    loop_monitor: Optional[:class:`LoopMonitor`]
+        Measures event loop lag every ``LOOP_LAG_INTERVAL`` seconds (default
+        0.5) and logs a stack sample of whatever blocks the loop for longer
+        than ``LOOP_BLOCK_THRESHOLD_MS`` (default 250; ``0`` turns it off).
     """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self.frog_guilds: List[GuildData] = []
-        self.image_dump: Optional[TextChannel] = None
+        self.frog_guilds: Dict[int, GuildData] = {}
+        self.image_storage: ImageStorage = open_image_storage(
+            os.getenv("IMAGE_STORAGE", "discord"), client=self
+        )
+        self.image_normalizer: ImageNormalizer = ImageNormalizer(
+            workers=int(os.getenv("IMAGE_WORKERS", 0)) or None
+        )
+        self.image_ingestor: ImageIngestor = ImageIngestor(
+            storage=self.image_storage,
+            normalizer=self.image_normalizer
+        )
+        self.image_uploads: BackgroundJobs = BackgroundJobs(
+            "image_uploads",
+            concurrency=int(os.getenv("IMAGE_UPLOAD_CONCURRENCY", 4)),
+            # Invalid or oversized images won't get any better for retrying.
+            permanent=(ValueError, )
+        )
+
+        self.auto_republish: Optional[DebouncedQueue[str]] = None
+        if os.getenv("AUTO_REPUBLISH", "").lower() in ("1", "true", "yes", "on"):
+            self.auto_republish = DebouncedQueue(
+                "auto_republish",
+                self._auto_republish,
+                delay=float(os.getenv("AUTO_REPUBLISH_DELAY", 10)),
+                max_delay=float(os.getenv("AUTO_REPUBLISH_MAX_DELAY", 60)),
+                rate=float(os.getenv("AUTO_REPUBLISH_RATE", 0.5))
+            )
+
+        self.metrics_server: Optional[MetricsServer] = None
+        metrics_port = int(os.getenv("METRICS_PORT", 9108))
+        if metrics_port:
+            self.metrics_server = MetricsServer(os.getenv("METRICS_HOST", "127.0.0.1"), metrics_port)
+
+        self.loop_monitor: Optional[LoopMonitor] = None
+        block_threshold = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", 250))
+        if block_threshold:
+            self.loop_monitor = LoopMonitor(
+                interval=float(os.getenv("LOOP_LAG_INTERVAL", 0.5)),
+                threshold=block_threshold / 1000
+            )
+
+        # Every loaded profile, keyed by profile ID. Kept in sync by
+        # GuildData.add_profile() / remove_profile().
+        self._profiles: Dict[str, Profile] = {}
+
+        self.hydration_concurrency: int = int(os.getenv("HYDRATION_CONCURRENCY", 8))
+        self.hydration_rate: float = float(os.getenv("HYDRATION_RATE", 40))
+        self._hydration: Optional[asyncio.Task] = None
+
+        self.profile_load_mode: str = os.getenv("PROFILE_LOAD_MODE", "lazy").lower()
+        self.profile_cache: Optional[LRUCache[Tuple[int, int], Profile]] = None
+        if self.profile_load_mode == "lazy":
+            self.profile_cache = LRUCache(
+                "profiles",
+                int(os.getenv("PROFILE_CACHE_SIZE", 2000)),
+                on_evict=self._evict_profile
+            )
+        self._profile_loads: Dict[Tuple[int, int], asyncio.Task] = {}
+        # Evicted profiles, for as long as anything else still holds them.
+        self._evicted: weakref.WeakValueDictionary[Tuple[int, int], Profile] = weakref.WeakValueDictionary()
 
 ################################################################################
-    async def load_guilds(self) -> None:
+    async def start(self, *args, **kwargs) -> None:
+
+        await connect_database()
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        await super().start(*args, **kwargs)
 
-        c = db_connection.cursor()
-        c.execute("SELECT * FROM guild_config")
+################################################################################
+    async def close(self) -> None:
+
+        await super().close()
+        if self.auto_republish is not None:
+            await self.auto_republish.close()
+        await self.image_uploads.close()
+        await outbound.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        if self.loop_monitor is not None:
+            await self.loop_monitor.close()
+        await self.image_ingestor.close()
+        await attachment_urls.close()
+        self.image_normalizer.close()
+        await database.close()
 
-        data = c.fetchall()
-        c.close()
+################################################################################
+    async def invoke_application_command(self, ctx: ApplicationContext) -> None:
 
-        for record in data:
-            post_channel_ids = [int(c) for c in convert_db_list(record[1])]
+        name = ctx.command.qualified_name
+        with track_interaction("command", name), database.scope(name), profiler.profile(name):
+            with tracer.trace(name, "command", interaction=ctx.interaction.id):
+                await super().invoke_application_command(ctx)
+
+################################################################################
+    async def on_application_command_error(self, ctx: ApplicationContext, error: DiscordException) -> None:
 
+        interaction_failed("command", ctx.command.qualified_name)
+        await super().on_application_command_error(ctx, error)
+
+################################################################################
+    async def load_guilds(self) -> None:
+
+        data = await database.guild_config.fetch_all()
+
+        for record in data:
             post_channels = []
-            for ch in post_channel_ids:
+            for ch in record[1] or []:
                 channel = await self.get_or_fetch_channel(ch)
                 if channel is not None:
                     post_channels.append(channel)
@@ -59,22 +243,20 @@ class FrogBot(Bot):
 ################################################################################
     async def load_profiles(self) -> None:
 
-        c = db_connection.cursor()
-        c.execute("SELECT * FROM profile_master")
-        data = c.fetchall()
+        data = await database.profiles.fetch_all()
 
         for record in data:
-            user = await self.get_or_fetch_user(record[1]) or record[1]
+            frog = self.get_frog(record[2])
+            if frog is None:
+                continue
+
+            # Owners are resolved in the background by hydrate_users(); until
+            # then uncached profiles just hold on to the raw user ID.
+            user = self.get_user(record[1]) or record[1]
 
-            for frog in self.frog_guilds:
-                if frog.parent.id == record[2]:
-                    profile = Profile.load(user, frog, record)
-                    frog.profiles.append(profile)
-                    break
+            frog.add_profile(Profile.load(user, frog, record))
 
-        c.execute("SELECT * FROM addl_images")
-        data = c.fetchall()
-        c.close()
+        data = await database.addl_images.fetch_all()
 
         additional_images: Dict[str, List[Tuple[str, str, str, Optional[str]]]] = {}
         for img in data:
@@ -91,37 +273,225 @@ class FrogBot(Bot):
 
                 p.images.additional_images_from_data(additional_images[profile_id])
 
+        if self._hydration is None or self._hydration.done():
+            self._hydration = asyncio.create_task(self.hydrate_users(), name="frogbot-hydration")
+
+################################################################################
+    async def hydrate_users(self) -> None:
+
+        waiting: Dict[int, List[Profile]] = {}
+        for profile in self._profiles.values():
+            if isinstance(profile.user, int):
+                waiting.setdefault(profile.user, []).append(profile)
+
+        def resolved(user_id: int, user: User) -> None:
+            for p in waiting.pop(user_id, []):
+                # Don't clobber a member object set by an interaction meanwhile.
+                if isinstance(p.user, int):
+                    p.user = user
+
+        hydrator = UserHydrator(
+            get=self.get_user,
+            fetch=self.fetch_user,
+            on_resolved=resolved,
+            concurrency=self.hydration_concurrency,
+            rate=self.hydration_rate
+        )
+
+        start = time.perf_counter()
+        await hydrator.run(list(waiting.keys()))
+
+        print(
+            f"Profile owners hydrated in {time.perf_counter() - start:.2f}s "
+            f"({hydrator.resolved} resolved, {hydrator.requests} requests, "
+            f"{hydrator.failed} unresolved)"
+        )
+
+################################################################################
+    async def compact_profiles(self) -> int:
+        """Deletes every never-filled-in profile from the database and drops any
+        in-memory copies. Returns the number of profiles removed."""
+
+        removed = await compact_empty_profiles()
+
+        for profile_id, guild_id, user_id in removed:
+            profile = self._get_profile(profile_id)
+            if profile is not None:
+                # Anything still holding on to it will recreate the rows on write.
+                profile.mark_transient()
+                profile.guild.remove_profile(profile)
+                continue
+
+            # An evicted copy still in use stays where _load_profile() can bring
+            # it back, so it has to recreate its rows too.
+            profile = self._evicted.get((guild_id, user_id))
+            if profile is not None:
+                profile.mark_transient()
+
+        return len(removed)
+
+################################################################################
+    async def republish_profiles(self) -> Dict[str, int]:
+        """Edits every posted profile whose post is out of date. Profiles whose
+        content hashes the same as what they were last published with are
+        skipped without a request. Returns how many were edited, unchanged,
+        missing (no longer posted) or invalid (eg. too long to post)."""
+
+        results = {"edited": 0, "unchanged": 0, "missing": 0, "invalid": 0}
+
+        for record in await database.profiles.fetch_posted():
+            # An evicted profile still in use is the live copy; see _load_profile().
+            profile = self._get_profile(record[0]) or self._evicted.get((record[2], record[1]))
+            if profile is None:
+                profile = await self._load_detached(record)
+                if profile is None:
+                    continue
+
+            results[await profile.republish(self)] += 1
+
+        return results
+
+################################################################################
+    def schedule_republish(self, profile: Profile) -> None:
+
+        if self.auto_republish is not None:
+            self.auto_republish.schedule(profile.id)
+
+################################################################################
+    async def _auto_republish(self, profile_id: str) -> Optional[str]:
+
+        # The profile may have been evicted (or evicted and reloaded) since it
+        # was scheduled, so publish whichever copy is live now.
+        profile = self._get_profile(profile_id)
+        if profile is None:
+            profile = next((p for p in self._evicted.values() if p.id == profile_id), None)
+        if profile is None:
+            record = await database.profiles.fetch_by_id(profile_id)
+            if record is None:
+                return None
+            profile = await self._load_detached(record)
+            if profile is None:
+                return None
+
+        return await profile.republish(self)
+
+################################################################################
+    async def _load_detached(self, record: Record) -> Optional[Profile]:
+
+        frog = self.get_frog(record[2])
+        if frog is None:
+            return None
+
+        # Loaded just to publish, without displacing the working set.
+        profile = Profile.load(self.get_user(record[1]) or record[1], frog, record)
+        images = await database.addl_images.fetch_for_profile(profile.id)
+        if images:
+            profile.images.additional_images_from_data(images)
+
+        return profile
+
 ################################################################################
     def _get_profile(self, profile_id: str) -> Optional[Profile]:
 
-        for frog in self.frog_guilds:
-            for profile in frog.profiles:
-                if profile.id == profile_id:
-                    return profile
+        return self._profiles.get(profile_id)
+
+################################################################################
+    def index_profile(self, profile: Profile) -> None:
+
+        self._profiles[profile.id] = profile
+
+        if self.profile_cache is not None:
+            self.profile_cache.put((profile.guild.guild_id, profile.user_id), profile)
+
+################################################################################
+    def unindex_profile(self, profile: Profile) -> None:
+
+        self._profiles.pop(profile.id, None)
+        self._evicted.pop((profile.guild.guild_id, profile.user_id), None)
+
+        if self.profile_cache is not None:
+            self.profile_cache.pop((profile.guild.guild_id, profile.user_id))
+
+################################################################################
+    def _evict_profile(self, key: Tuple[int, int], profile: Profile) -> None:
+
+        # Any pending writes still hold the evicted object and flush normally.
+        self._profiles.pop(profile.id, None)
+        profile.guild.profiles.pop(profile.user_id, None)
+        self._evicted[key] = profile
+
+################################################################################
+    async def fetch_profile(self, frog: GuildData, user: Union[Member, User]) -> Optional[Profile]:
+        """Loads a single profile (and its additional images) from the database
+        into the working set. Concurrent calls for the same owner share one load."""
+
+        key = (frog.guild_id, user.id)
+
+        task = self._profile_loads.get(key)
+        if task is None:
+            task = self._profile_loads[key] = asyncio.create_task(self._load_profile(frog, user))
+            task.add_done_callback(lambda _: self._profile_loads.pop(key, None))
+
+        return await asyncio.shield(task)
+
+################################################################################
+    async def _load_profile(self, frog: GuildData, user: Union[Member, User]) -> Optional[Profile]:
+
+        # Reloading a profile that's still in use would leave two copies
+        # overwriting each other's rows. Nothing else holding it means no
+        # writes are queued for it either, since they hold their profile.
+        profile = self._evicted.pop((frog.guild_id, user.id), None)
+        if profile is not None:
+            frog.add_profile(profile)
+            return profile
+
+        record = await database.profiles.fetch_one(frog.guild_id, user.id)
+        if record is None:
+            return None
+
+        profile = Profile.load(user, frog, record)
+
+        images = await database.addl_images.fetch_for_profile(profile.id)
+        if images:
+            profile.images.additional_images_from_data(images)
+
+        frog.add_profile(profile)
+
+        return profile
 
 ################################################################################
     async def load_frog_channels(self) -> None:
 
         # Image Dump
-        try:
-            self.image_dump = await self.fetch_channel(991902526188302427)
-        except:
-            raise
+        if isinstance(self.image_storage, DiscordChannelStorage):
+            await self.image_storage.resolve()
 
 ################################################################################
-    async def dump_image(self, image: Attachment) -> str:
+    async def dump_image(self, image: Attachment, section: Optional[SectionType] = None) -> str:
+
+        stored = await self.image_ingestor.ingest(image.url, image.filename, section)
+        return stored.url
 
-        file = await image.to_file()
-        post = await self.image_dump.send(file=file)
+################################################################################
+    def upload_image(self, image: Attachment, section: Optional[SectionType] = None) -> asyncio.Task:
+        """Starts storing ``image`` in the background and returns the task that
+        resolves to its URL."""
 
-        return post.attachments[0].url
+        return self.image_uploads.submit(lambda: self.dump_image(image, section))
 
 ################################################################################
-    def get_frog(self, guild_id: int) -> GuildData:
+    def get_frog(self, guild_id: int) -> Optional[GuildData]:
 
-        for frog in self.frog_guilds:
-            if frog.parent.id == guild_id:
-                return frog
+        return self.frog_guilds.get(guild_id)
+
+################################################################################
+    def add_frog(self, guild: Guild) -> GuildData:
+
+        frog = self.frog_guilds.get(guild.id)
+        if frog is None:
+            frog = self.frog_guilds[guild.id] = GuildData.load(self, guild)
+
+        return frog
 
 ################################################################################
     async def get_or_fetch_channel(self, channel_id: int) -> Optional[TextChannel]:
@@ -131,9 +501,10 @@ class FrogBot(Bot):
         if ret is not None:
             return ret  # type: ignore
 
-        try:
-            return await self.fetch_channel(channel_id)  # type:ignore
-        except NotFound:
-            return None
+        with tracer.span("discord fetch_channel", "rest", channel=channel_id):
+            try:
+                return await self.fetch_channel(channel_id)  # type:ignore
+            except NotFound:
+                return None
 
 ################################################################################
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from discord    import Embed, TextChannel
-from typing     import TYPE_CHECKING, List, Type, TypeVar
+from typing     import TYPE_CHECKING, List, Optional, Type, TypeVar
 
 from utilities  import *
 
 if TYPE_CHECKING:
     from classes.guild  import GuildData
+    from utilities.database.pool    import DatabaseConnection
 ################################################################################
 
 __all__ = ("GuildConfiguration", )
@@ -77,14 +78,18 @@ class GuildConfiguration:
 ################################################################################
     def update(self) -> None:
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE guild_config SET post_channels = %s WHERE guild_id = %s",
-            (self.post_channel_ids, self.parent.guild_id)
-        )
+        database.writes.mark_dirty(("guild_config", self.parent.guild_id), self.save)
+
+        return
 
-        db_connection.commit()
-        c.close()
+################################################################################
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
+
+        await database.guild_config.update(
+            self.parent.guild_id,
+            self.post_channel_ids,
+            conn=conn
+        )
 
         return
 
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 from discord    import Guild, Member, User
-from typing     import List, Optional, Type, TypeVar, Union
+from typing     import TYPE_CHECKING, Dict, Optional, Type, TypeVar, Union
 
 from classes.profiles   import Profile
+
+if TYPE_CHECKING:
+    from classes.bot    import FrogBot
 ################################################################################
 
 __all__ = ("GuildData", )
@@ -14,25 +17,29 @@ GD = TypeVar("GD", bound="GuildData")
 class GuildData:
 
     __slots__ = (
+        "bot",
         "parent",
         "profiles",
         "config"
     )
 
 ################################################################################
-    def __init__(self, parent: Guild):
+    def __init__(self, bot: FrogBot, parent: Guild):
 
+        self.bot: FrogBot = bot
         self.parent: Guild = parent
-        self.profiles: List[Profile] = []
+        # Keyed by owner user ID.
+        self.profiles: Dict[int, Profile] = {}
 
 ################################################################################
     @classmethod
-    def load(cls: Type[GD], parent: Guild) -> GD:
+    def load(cls: Type[GD], bot: FrogBot, parent: Guild) -> GD:
 
         self: GD = cls.__new__(cls)
 
+        self.bot = bot
         self.parent = parent
-        self.profiles = []
+        self.profiles = {}
 
         return self
 
@@ -43,14 +50,45 @@ class GuildData:
         return self.parent.id
 
 ################################################################################
-    def get_profile(self, user: Union[Member, User]) -> Profile:
+    def add_profile(self, profile: Profile) -> None:
+
+        self.profiles[profile.user_id] = profile
+        self.bot.index_profile(profile)
+
+################################################################################
+    def remove_profile(self, profile: Profile) -> None:
 
-        for profile in self.profiles:
-            if profile.user.id == user.id:
-                return profile
+        self.profiles.pop(profile.user_id, None)
+        self.bot.unindex_profile(profile)
 
+################################################################################
+    def find_profile(self, user_id: int) -> Optional[Profile]:
+
+        return self.profiles.get(user_id)
+
+################################################################################
+    async def get_profile(self, user: Union[Member, User]) -> Profile:
+
+        cache = self.bot.profile_cache
+        if cache is None:
+            profile = self.profiles.get(user.id)
+        else:
+            profile = cache.get((self.guild_id, user.id))
+            if profile is None:
+                profile = await self.bot.fetch_profile(self, user)
+                if profile is None:
+                    # A concurrent call may have created a transient profile
+                    # while this one was waiting for the load.
+                    profile = self.profiles.get(user.id)
+
+        if profile is not None:
+            if isinstance(profile.user, int):
+                profile.user = user
+            return profile
+
+        # Held in memory only until the user actually changes something.
         profile = Profile.new(user, self)
-        self.profiles.append(profile)
+        self.add_profile(profile)
 
         return profile
 
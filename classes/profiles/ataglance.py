@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from discord    import Embed, EmbedField, Interaction
-from typing     import TYPE_CHECKING, List, Optional, Type, TypeVar, Union
+from typing     import TYPE_CHECKING, Any, List, Optional, Type, TypeVar, Union
 
 from assets         import *
 from ui.profiles    import *
@@ -10,6 +10,8 @@ from utilities      import *
 from .section   import ProfileSection
 
 if TYPE_CHECKING:
+    from utilities.database.pool    import DatabaseConnection
+
     from .profile   import Profile
 ################################################################################
 
@@ -47,18 +49,14 @@ class ProfileAtAGlance(ProfileSection):
 
 ################################################################################
     @classmethod
-    def load(cls: Type[AAG], parent: Profile, data: List[str]) -> AAG:
+    def load(cls: Type[AAG], parent: Profile, data: List[Any]) -> AAG:
 
         gender_val = (
             Gender(int(data[0])) if data[0] is not None
             and data[0].isdigit() and int(data[0]) <= len(Gender)
             else None
         )
-        pronoun_val = (
-            [Pronoun(int(i)) for i in convert_db_list(data[1])]
-            if data[1] is not None
-            else []
-        )
+        pronoun_val = [Pronoun(i) for i in data[1]] if data[1] else []
         race_val = (
             Race(int(data[2])) if data[2] is not None
             and data[2].isdigit() and int(data[2]) <= len(Race)
@@ -394,12 +392,13 @@ class ProfileAtAGlance(ProfileSection):
 ################################################################################
     def compile(self) -> Optional[EmbedField]:
 
-        if not self._raw_string():
+        raw = self._raw_string()
+        if not raw:
             return
 
         return EmbedField(
             name=f"{BotEmojis.Eyes.value}  __At A Glance__ {BotEmojis.Eyes.value}",
-            value=self._raw_string(),
+            value=raw,
             inline=False
         )
 
@@ -540,7 +539,7 @@ class ProfileAtAGlance(ProfileSection):
         return
 
 ################################################################################
-    def update(self) -> None:
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
 
         gender_val = (
             self._gender if isinstance(self._gender, str) or self._gender is None
@@ -568,19 +567,19 @@ class ProfileAtAGlance(ProfileSection):
             else str(self._age)
         )
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE ataglance SET gender = %s, pronouns = %s, race = %s, clan = %s, "
-            "orientation = %s, height = %s, age = %s, mare = %s WHERE profile_id = %s",
-            (
-                gender_val, pronoun_val, race_val, clan_val, orientation_val,
-                height_val, age_val, self._mare, self.parent.id
-            )
+        await database.ataglance.update(
+            self.parent.id,
+            gender=gender_val,
+            pronouns=pronoun_val,
+            race=race_val,
+            clan=clan_val,
+            orientation=orientation_val,
+            height=height_val,
+            age=age_val,
+            mare=self._mare,
+            conn=conn
         )
 
-        db_connection.commit()
-        c.close()
-
         return
 
 ################################################################################
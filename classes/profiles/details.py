@@ -3,6 +3,8 @@ from __future__ import annotations
 from discord    import Colour, Embed, EmbedField, Interaction
 from typing     import (
     TYPE_CHECKING,
+    Any,
+    Callable,
     List,
     Optional,
     Tuple,
@@ -18,6 +20,8 @@ from ui.profiles    import *
 from .section   import ProfileSection
 
 if TYPE_CHECKING:
+    from utilities.database.pool    import DatabaseConnection
+
     from .profile   import Profile
 ################################################################################
 
@@ -36,7 +40,8 @@ class ProfileDetails(ProfileSection):
         "_color",
         "_jobs",
         "_rates",
-        "_post_url"
+        "_post_url",
+        "_post_hash"
     )
 
 ################################################################################
@@ -50,13 +55,14 @@ class ProfileDetails(ProfileSection):
         self._jobs: List[str] = kwargs.pop("jobs", []) or []
         self._rates: Optional[str] = kwargs.pop("rates", None)
         self._post_url: Optional[str] = kwargs.pop("post_url", None)
+        self._post_hash: Optional[str] = kwargs.pop("post_hash", None)
 
 ################################################################################
     @classmethod
     def load(
         cls: Type[PD],
         parent: Profile,
-        data: List[Optional[Union[str, int]]]
+        data: List[Any]
     ) -> PD:
 
         return cls(
@@ -64,9 +70,10 @@ class ProfileDetails(ProfileSection):
             char_name=data[0],
             custom_url=data[1],
             color=Colour(data[2]) if data[2] is not None else None,
-            jobs=convert_db_list(data[3]),
+            jobs=data[3] or [],
             rates=data[4],
-            post_url=data[5]
+            post_url=data[5],
+            post_hash=data[6]
         )
 
 ################################################################################
@@ -233,7 +240,33 @@ class ProfileDetails(ProfileSection):
     def post_url(self, value: Optional[str]) -> None:
 
         self._post_url = value
-        self.update()
+        # Whatever a new post (or none at all) shows, it isn't the old content.
+        self._post_hash = None
+        # Progress shows whether the profile's been posted.
+        self.parent.invalidate(self)
+        self._persist_post()
+
+################################################################################
+    @property
+    def post_hash(self) -> Optional[str]:
+        """The :func:`embed_digest` of what the post at :attr:`post_url` was
+        last published with."""
+
+        return self._post_hash
+
+################################################################################
+    @post_hash.setter
+    def post_hash(self, value: Optional[str]) -> None:
+
+        self._post_hash = value
+        self._persist_post()
+
+################################################################################
+    def _persist_post(self) -> None:
+
+        # Only the post's columns, so a copy of the profile loaded just to
+        # republish it can't write the rest of the row back over newer values.
+        database.writes.mark_dirty(("post", self.parent.id), self._save_post)
 
 ################################################################################
     async def set_char_name(self, interaction: Interaction) -> None:
@@ -322,23 +355,30 @@ class ProfileDetails(ProfileSection):
         return
 
 ################################################################################
-    def update(self) -> None:
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
 
         color_value = self._color.value if self._color is not None else None
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE details SET char_name = %s, url = %s, color = %s, jobs = %s, "
-            "rates = %s, post_url = %s WHERE profile_id = %s",
-            (
-                self._char_name, self._url, color_value, self._jobs, self._rates,
-                self._post_url, self.parent.id
-            )
+        await database.details.update(
+            self.parent.id,
+            char_name=self._char_name,
+            url=self._url,
+            color=color_value,
+            jobs=self._jobs,
+            rates=self._rates,
+            post_url=self._post_url,
+            post_hash=self._post_hash,
+            conn=conn
         )
 
-        db_connection.commit()
-        c.close()
-
         return
 
+################################################################################
+    async def _save_post(self, conn: DatabaseConnection) -> Optional[Callable[[], None]]:
+
+        callback = await self.parent.materialize(conn)
+        await database.details.update_post(self.parent.id, self._post_url, self._post_hash, conn=conn)
+
+        return callback
+
 ################################################################################
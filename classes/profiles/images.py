@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+
 from discord            import Attachment, Embed, EmbedField, Interaction
 from discord.ext.pages  import Page
 from typing             import TYPE_CHECKING, List, Optional, Tuple, Type, TypeVar
@@ -11,6 +14,8 @@ from utilities      import *
 from .section   import ProfileSection
 
 if TYPE_CHECKING:
+    from utilities.database.pool    import DatabaseConnection
+
     from .profile   import Profile
 ################################################################################
 
@@ -19,6 +24,8 @@ __all__ = (
     "AdditionalImage"
 )
 
+log = logging.getLogger(__name__)
+
 AI = TypeVar("AI", bound="AdditionalImage")
 PI = TypeVar("PI", bound="ProfileImages")
 
@@ -40,9 +47,9 @@ class AdditionalImage:
 
 ################################################################################
     @classmethod
-    def new(cls: Type[AI], parent_id: str, url: str, caption: Optional[str]) -> AI:
+    async def new(cls: Type[AI], parent_id: str, url: str, caption: Optional[str]) -> AI:
 
-        image_id = new_additional_image(parent_id, url, caption)
+        image_id = await new_additional_image(parent_id, url, caption)
 
         self = cls.__new__(cls)
 
@@ -59,7 +66,7 @@ class AdditionalImage:
             embeds=[
                 make_embed(
                     title="Additional Images",
-                    image_url=self.url,
+                    image_url=attachment_urls.resolve(self.url),
                     footer_text=f"Caption: {self.caption}" if self.caption is not NS else Embed.Empty,
                     timestamp=False
                 )
@@ -70,10 +77,11 @@ class AdditionalImage:
 ################################################################################
     def compile(self) -> str:
 
+        url = attachment_urls.resolve(self.url)
         if self.caption is NS:
-            return self.url
+            return url
 
-        return f"[{self.caption}]({self.url})"
+        return f"[{self.caption}]({url})"
 
 ################################################################################
     @property
@@ -91,25 +99,27 @@ class AdditionalImage:
 ################################################################################
     def delete(self) -> None:
 
-        c = db_connection.cursor()
-        c.execute("DELETE FROM addl_images WHERE image_id = %s", (self.id, ))
-
-        db_connection.commit()
-        c.close()
+        # Shares the row's key so a pending caption edit is superseded.
+        database.writes.mark_dirty(("addl_images", self.id), self._delete)
 
         return
 
+################################################################################
+    async def _delete(self, conn: DatabaseConnection) -> None:
+
+        await database.addl_images.delete(self.id, conn=conn)
+
 ################################################################################
     def update(self) -> None:
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE addl_images SET caption = %s WHERE image_id = %s",
-            (self._caption, self.id)
-        )
+        database.writes.mark_dirty(("addl_images", self.id), self.save)
+
+        return
+
+################################################################################
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
 
-        db_connection.commit()
-        c.close()
+        await database.addl_images.update(self.id, caption=self._caption, conn=conn)
 
         return
 
@@ -119,7 +129,8 @@ class ProfileImages(ProfileSection):
     __slots__ = (
         "_thumbnail",
         "_main_image",
-        "additional"
+        "additional",
+        "_compiled_urls"
     )
 
 ################################################################################
@@ -131,6 +142,9 @@ class ProfileImages(ProfileSection):
         self._main_image: Optional[str] = kwargs.pop("main_image", None)
         self.additional: List[AdditionalImage] = kwargs.pop("additional", [])
 
+        # The image URLs as of the last compile(), after resolving refreshes.
+        self._compiled_urls: Tuple[Optional[str], ...] = ()
+
 ################################################################################
     @classmethod
     def load(cls: Type[PI], parent: Profile, data: List[Optional[str]]) -> PI:
@@ -175,8 +189,8 @@ class ProfileImages(ProfileSection):
                 "***To change your thumbnail and main image assets, or to add an additional image\n"
                 "to your profile, use the `/profiles add_image` command.***"
             ),
-            thumbnail_url=self._thumbnail or BotImages.ThumbnailMissing.value,
-            image_url=self._main_image or BotImages.MainImageMissing.value,
+            thumbnail_url=attachment_urls.resolve(self._thumbnail) or BotImages.ThumbnailMissing.value,
+            image_url=attachment_urls.resolve(self._main_image) or BotImages.MainImageMissing.value,
             timestamp=False,
             fields=fields
         )
@@ -301,18 +315,47 @@ class ProfileImages(ProfileSection):
 ################################################################################
     def compile(self) -> Tuple[Optional[str], Optional[str], Optional[EmbedField]]:
 
+        self._compiled_urls = self._resolved_urls()
+
         return (
-            self.thumbnail,
-            self.main_image,
+            attachment_urls.resolve(self.thumbnail),
+            attachment_urls.resolve(self.main_image),
             self.compile_additional()
         )
 
+################################################################################
+    def urls(self) -> List[Optional[str]]:
+
+        return [self._thumbnail, self._main_image] + [i.url for i in self.additional]
+
+################################################################################
+    def _resolved_urls(self) -> Tuple[Optional[str], ...]:
+
+        return tuple(attachment_urls.resolve(url) for url in self.urls())
+
+################################################################################
+    async def refresh_urls(self, timeout: float = 2.0) -> None:
+        """Refreshes any of this section's Discord attachment URLs that are
+        about to expire, waiting up to ``timeout`` seconds (the refresh carries
+        on in the background past that), and has the section recompiled if a
+        fresher URL has turned up since it was last compiled."""
+
+        try:
+            await asyncio.wait_for(attachment_urls.ensure_fresh(self.urls()), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+        if self._resolved_urls() != self._compiled_urls:
+            self.parent.invalidate(self)
+
 ################################################################################
     def modify_caption(self, image_id: str, caption: Optional[str]) -> None:
 
         for i in self.additional:
             if i.id == image_id:
                 i.caption = caption
+                self.parent.invalidate(self)
+                self.parent.schedule_republish()
                 return
 
 ################################################################################
@@ -327,19 +370,14 @@ class ProfileImages(ProfileSection):
                 )
             )
 
+        self.parent.invalidate(self)
+
 ################################################################################
+    @profiled
     async def handle_image(self, interaction: Interaction, section: SectionType, image: Attachment) -> None:
 
-        if image.content_type not in (
-            "image/jpeg", "image/png", "image/gif", "image/apng", "image/webp"
-        ):
-            error = InvalidFileTypeError(image.content_type, section.proper_name)
-            await interaction.response.send_message(embed=error, ephemeral=True)
-            return
-
-        if section is not SectionType.AdditionalImages:
-            await interaction.response.defer()
-        else:
+        caption = None
+        if section is SectionType.AdditionalImages:
             if len(self.additional) == 10:
                 error = TooManyImages()
                 await interaction.response.send_message(embed=error, ephemeral=True)
@@ -347,7 +385,41 @@ class ProfileImages(ProfileSection):
 
             caption = await self.get_caption(interaction)
 
-        image_url = await interaction.client.dump_image(image)  # type: ignore
+        # Store the image in the background so the interaction can be answered
+        # straight away, then fill in the result once it's ready.
+        upload = interaction.client.upload_image(image, section)  # type: ignore
+
+        processing = make_embed(
+            color=self.parent.color,
+            title="Processing...",
+            description=(
+                f"Your {section.proper_name} is being uploaded.\n"
+                "This message will update as soon as it's ready!"
+            ),
+            timestamp=False
+        )
+
+        if interaction.response.is_done():
+            status = await interaction.followup.send(embed=processing, wait=True)
+        else:
+            await interaction.response.send_message(embed=processing)
+            status = await interaction.original_response()
+
+        # The content itself is checked while it's stored; the declared type can lie.
+        try:
+            image_url = await upload
+        except InvalidImageError:
+            error = InvalidFileTypeError(image.content_type or "unknown", section.proper_name)
+            await status.edit(embed=error)
+            return
+        except ImageTooLargeError as exc:
+            await status.edit(embed=ImageTooLarge(exc.max_bytes))
+            return
+        except Exception:
+            log.exception("Couldn't store %s for profile %s.", section.proper_name, self.parent.id)
+            await status.edit(embed=ImageUploadFailed())
+            return
+
         message = ""
 
         if section is SectionType.Thumbnail:
@@ -357,7 +429,22 @@ class ProfileImages(ProfileSection):
             self.main_image = image_url
             message = "Your main image was updated successfully!"
         elif section is SectionType.AdditionalImages:
-            self.additional.append(AdditionalImage.new(self.parent.id, image_url, caption))
+            # Another upload may have filled the last slot in the meantime.
+            if len(self.additional) == 10:
+                await status.edit(embed=TooManyImages())
+                return
+
+            try:
+                await self.parent.materialize()
+                additional = await AdditionalImage.new(self.parent.id, image_url, caption)
+            except Exception:
+                log.exception("Couldn't add an additional image to profile %s.", self.parent.id)
+                await status.edit(embed=ImageUploadFailed())
+                return
+
+            self.additional.append(additional)
+            self.parent.invalidate(self)
+            self.parent.schedule_republish()
             message = "A new additional image was added to your profile!"
 
         confirm = self.status()
@@ -366,7 +453,7 @@ class ProfileImages(ProfileSection):
 
         view = ImageStatusView(interaction.user, self)
 
-        await interaction.followup.send(embed=confirm, view=view)
+        await status.edit(embed=confirm, view=view)
         await view.wait()
 
         return
@@ -421,6 +508,8 @@ class ProfileImages(ProfileSection):
             for i, img in enumerate(self.additional):
                 if img.id == image_id:
                     self.additional.pop(i)
+            self.parent.invalidate(self)
+            self.parent.schedule_republish()
 
         return
 
@@ -449,17 +538,15 @@ class ProfileImages(ProfileSection):
         return
 
 ################################################################################
-    def update(self) -> None:
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
 
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE images SET thumbnail = %s, main_image = %s WHERE profile_id = %s",
-            (self._thumbnail, self._main_image, self.parent.id)
+        await database.images.update(
+            self.parent.id,
+            thumbnail=self._thumbnail,
+            main_image=self._main_image,
+            conn=conn
         )
 
-        db_connection.commit()
-        c.close()
-
         return
 
 ################################################################################
@@ -19,6 +19,8 @@ from utilities      import *
 from .section   import ProfileSection
 
 if TYPE_CHECKING:
+    from utilities.database.pool    import DatabaseConnection
+
     from .profile   import Profile
 ################################################################################
 
@@ -48,12 +50,12 @@ class ProfilePersonality(ProfileSection):
 
 ################################################################################
     @classmethod
-    def load(cls: Type[PP], parent: Profile, data: List[Optional[str]]) -> PP:
+    def load(cls: Type[PP], parent: Profile, data: List[Any]) -> PP:
 
         return cls(
             parent=parent,
-            likes=convert_db_list(data[0]),
-            dislikes=convert_db_list(data[1]),
+            likes=data[0] or [],
+            dislikes=data[1] or [],
             personality=data[2],
             aboutme=data[3]
         )
@@ -287,21 +289,17 @@ class ProfilePersonality(ProfileSection):
         return
 
 ################################################################################
-    def update(self) -> None:
-
-        c = db_connection.cursor()
-        c.execute(
-            "UPDATE personality SET likes = %s, dislikes = %s, personality = %s, "
-            "aboutme = %s WHERE profile_id = %s",
-            (
-                self._likes, self._dislikes, self._personality, self._aboutme,
-                self.parent.id
-            )
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
+
+        await database.personality.update(
+            self.parent.id,
+            likes=self._likes,
+            dislikes=self._dislikes,
+            personality=self._personality,
+            aboutme=self._aboutme,
+            conn=conn
         )
 
-        db_connection.commit()
-        c.close()
-
         return
 
 ################################################################################
@@ -1,21 +1,25 @@
 from __future__ import annotations
 
+import time
+import uuid
+
 from discord    import (
-    ApplicationCommandInvokeError,
     Colour,
     Embed,
     EmbedField,
     Guild,
     Interaction,
     Member,
-    Message,
     NotFound,
     PartialEmoji,
+    PartialMessage,
     User
 )
 from typing     import (
     TYPE_CHECKING,
     Any,
+    Callable,
+    Dict,
     List,
     Optional,
     Tuple,
@@ -33,12 +37,25 @@ from classes.profiles   import *
 if TYPE_CHECKING:
     from classes.bot    import FrogBot
     from classes.guild  import GuildData
+    from classes.profiles.section   import ProfileSection
+    from utilities.database.pool    import DatabaseConnection
 ################################################################################
 
 __all__ = ("Profile", )
 
 P = TypeVar("P", bound="Profile")
 
+PUBLISH_LATENCY = metrics.histogram(
+    "frogbot_profile_publish_seconds",
+    "Time taken to publish a profile: editing the existing post in place, "
+    "finding it gone, or sending a new one.",
+    ("result", )
+)
+PUBLISH_SUPPRESSED = metrics.counter(
+    "frogbot_profile_publish_suppressed_total",
+    "Profile post edits skipped because the post already showed the same embeds."
+)
+
 ################################################################################
 class Profile:
 
@@ -49,7 +66,13 @@ class Profile:
         "details",
         "ataglance",
         "personality",
-        "images"
+        "images",
+        "_persisted",
+        "_version",
+        "_sections",
+        "_rendered",
+        "_progress",
+        "__weakref__"
     )
 
 ################################################################################
@@ -74,13 +97,18 @@ class Profile:
         self.ataglance: ProfileAtAGlance = ataglance
         self.images: ProfileImages = images
 
+        self._persisted: bool = True
+        self._reset_render_cache()
+
 ################################################################################
     @classmethod
     def new(cls: Type[P], user: Union[Member, User], guild: GuildData) -> P:
+        """Creates a blank, transient profile. Nothing is written to the
+        database until the first real change (see :meth:`materialize`)."""
 
         self: P = cls.__new__(cls)
 
-        self.id = new_profile_entry(guild_id=guild.parent.id, user_id=user.id)
+        self.id = uuid.uuid4().hex
         self.user = user
         self.guild = guild
 
@@ -89,6 +117,9 @@ class Profile:
         self.ataglance = ProfileAtAGlance(self)
         self.images = ProfileImages(self)
 
+        self._persisted = False
+        self._reset_render_cache()
+
         return self
 
 ################################################################################
@@ -106,13 +137,126 @@ class Profile:
         self.user = user
         self.guild = guild
 
-        self.details = ProfileDetails.load(self, data[3:9])
+        self.details = ProfileDetails.load(self, [*data[3:9], data[23]])
         self.personality = ProfilePersonality.load(self, data[9:13])
         self.ataglance = ProfileAtAGlance.load(self, data[13:21])
         self.images = ProfileImages.load(self, data[21:23])
 
+        self._persisted = True
+        self._reset_render_cache()
+
         return self
 
+################################################################################
+    @property
+    def persisted(self) -> bool:
+        """Whether this profile's rows exist in the database."""
+
+        return self._persisted
+
+################################################################################
+    async def materialize(
+        self,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[Callable[[], None]]:
+        """Writes a transient profile's (blank) rows to the database.
+
+        Without ``conn`` the rows are committed straight away. Inside a caller's
+        transaction, returns a callback that marks the profile persisted and must
+        only be run once that transaction commits. Does nothing for profiles that
+        are already persisted."""
+
+        if self._persisted:
+            return None
+
+        if conn is None:
+            # A flush may be materializing this profile too; until it commits,
+            # both would see it transient and insert the same rows.
+            await database.writes.write_now(self.materialize)
+            return None
+
+        created = await database.profiles.create(self.id, self.guild.guild_id, self.user_id, conn=conn)
+        if not created:
+            # Either an earlier write in the same batch already created our
+            # rows, or another copy of this profile (eg. made by a concurrent
+            # first interaction) got its rows in first. Take those over, or
+            # every later write keyed by our ID would update nothing.
+            profile_id = await database.profiles.fetch_id(self.guild.guild_id, self.user_id, conn=conn)
+            if profile_id is not None and profile_id != self.id:
+                self._adopt(profile_id)
+
+        return self._mark_persisted
+
+################################################################################
+    def _adopt(self, profile_id: str) -> None:
+
+        self.guild.remove_profile(self)
+        self.id = profile_id
+        self.guild.add_profile(self)
+
+################################################################################
+    def _mark_persisted(self) -> None:
+
+        self._persisted = True
+
+################################################################################
+    def mark_transient(self) -> None:
+        """Flags the profile as having no rows, eg. after they were compacted
+        away, so that its next change writes them again."""
+
+        self._persisted = False
+
+################################################################################
+    def _reset_render_cache(self) -> None:
+
+        self._version: int = 0
+        self._sections: Dict[Type[ProfileSection], Any] = {}
+        self._rendered: Optional[Tuple[Embed, Optional[Embed]]] = None
+        self._progress: Optional[str] = None
+
+################################################################################
+    @property
+    def version(self) -> int:
+        """Incremented every time any part of the profile changes."""
+
+        return self._version
+
+################################################################################
+    def invalidate(self, section: Optional[ProfileSection] = None) -> None:
+        """Drops the cached render of ``section`` (or of every section) and of
+        the compiled embeds built from it."""
+
+        self._version += 1
+        self._rendered = None
+        self._progress = None
+
+        if section is None:
+            self._sections.clear()
+            return
+
+        self._sections.pop(type(section), None)
+        if section is self.details:
+            # The About Me embed borrows the accent color, name and custom URL.
+            self._sections.pop(ProfilePersonality, None)
+
+################################################################################
+    def _compiled(self, section: ProfileSection) -> Any:
+
+        key = type(section)
+
+        try:
+            return self._sections[key]
+        except KeyError:
+            with tracer.span(f"compile {key.__name__}", "compile"):
+                ret = self._sections[key] = section.compile()
+            return ret
+
+################################################################################
+    @property
+    def user_id(self) -> int:
+
+        return self.user if isinstance(self.user, int) else self.user.id
+
 ################################################################################
     @property
     def color(self) -> Optional[Colour]:
@@ -127,11 +271,24 @@ class Profile:
 
 ################################################################################
     def compile(self) -> Tuple[Embed, Optional[Embed]]:
+        """Returns the main profile embed and the About Me embed, if any.
+
+        The result is cached until a section changes, so the returned embeds
+        are shared between callers and must not be modified."""
+
+        if self._rendered is None:
+            with tracer.span("compile Profile", "compile"):
+                self._rendered = self._compile()
 
-        char_name, url, color, jobs, rates_field = self.details.compile()
-        ataglance = self.ataglance.compile()
-        likes, dislikes, personality, aboutme = self.personality.compile()
-        thumbnail, main_image, additional_imgs = self.images.compile()
+        return self._rendered
+
+################################################################################
+    def _compile(self) -> Tuple[Embed, Optional[Embed]]:
+
+        char_name, url, color, jobs, rates_field = self._compiled(self.details)
+        ataglance = self._compiled(self.ataglance)
+        likes, dislikes, personality, aboutme = self._compiled(self.personality)
+        thumbnail, main_image, additional_imgs = self._compiled(self.images)
 
         if char_name is NS:
             char_name = f"Character Name: {NS}"
@@ -140,11 +297,8 @@ class Profile:
 
         description = Embed.Empty
         if jobs is not NS:
-            description = (
-                f"{draw_separator(text=jobs)}\n"
-                f"{jobs}\n"
-                f"{draw_separator(text=jobs)}"
-            )
+            separator = draw_separator(text=jobs)
+            description = f"{separator}\n{jobs}\n{separator}"
 
         fields: List[EmbedField] = []
         if ataglance is not None:
@@ -158,8 +312,14 @@ class Profile:
         if personality is not None:
             fields.append(personality)
         if additional_imgs is not None:
-            additional_imgs.value += draw_separator(extra=15)
-            fields.append(additional_imgs)
+            # Don't modify the cached section field in place.
+            fields.append(
+                EmbedField(
+                    name=additional_imgs.name,
+                    value=additional_imgs.value + draw_separator(extra=15),
+                    inline=additional_imgs.inline
+                )
+            )
 
         main_profile = make_embed(
             color=color,
@@ -174,32 +334,34 @@ class Profile:
         return main_profile, aboutme
 
 ################################################################################
+    @profiled
     async def post(self, interaction: Interaction) -> None:
 
         if self.char_name is NS:
             error = CharNameNotSet()
-            await interaction.response.send_message(embed=error, emphemeral=True)
+            await outbound.respond(interaction, embed=error, ephemeral=True)
             return
 
+        # Don't post image links that are about to expire.
+        with tracer.span("refresh image URLs"):
+            await self.images.refresh_urls()
+
         main_profile, aboutme = self.compile()
 
         if len(main_profile) > 5999:
             error = ExceedsMaxLengthError(len(main_profile))
-            await interaction.response.send_message(embed=error, emphemeral=True)
+            await outbound.respond(interaction, embed=error, ephemeral=True)
             return
 
         embeds = [main_profile]
         if aboutme is not None:
             embeds.append(aboutme)
 
-        profile_msg = await self.fetch_post_message(interaction.client)  # type: ignore
-        if profile_msg is not None:
-            try:
-                await profile_msg.edit(embeds=embeds)
-            except NotFound:
-                self.details.post_url = None
-
-            await interaction.response.send_message(embed=self.success_message())
+        result = await self.republish(
+            interaction.client, embeds, priority=OutboundPriority.Interactive  # type: ignore
+        )
+        if result != "missing":
+            await outbound.respond(interaction, embed=self.success_message())
             return
 
         prompt = make_embed(
@@ -214,57 +376,107 @@ class Profile:
         )
         view = ProfileChannelSelectorView(interaction.user, self.guild.config.profile_channels)
 
-        try:
-            await interaction.response.send_message(embed=prompt, view=view)
-        except ApplicationCommandInvokeError:
-            await interaction.followup.send(embed=prompt, view=view)
+        await outbound.respond(interaction, embed=prompt, view=view)
 
         await view.wait()
 
         if not view.complete or view.value is False:
             return
 
-        try:
-            post_channel = await interaction.client.get_or_fetch_channel(view.value)  # type: ignore
-        except NotFound:
+        post_channel = await interaction.client.get_or_fetch_channel(view.value)  # type: ignore
+        if post_channel is None:
             error = ChannelNotFoundError()
-            await interaction.response.send_message(embed=error, emphemeral=True)
+            await outbound.respond(interaction, embed=error, ephemeral=True)
             return
 
-        try:
-            post_msg = await post_channel.send(embeds=embeds)
-        except:
-            raise
-        else:
-            self.details.post_url = post_msg.jump_url
+        start = time.perf_counter()
+        post_msg = await outbound.send(post_channel, embeds=embeds)
+        PUBLISH_LATENCY.observe(time.perf_counter() - start, result="posted")
+
+        self.details.post_url = post_msg.jump_url
+        self.details.post_hash = embed_digest(embeds)
 
-        await interaction.followup.send(embed=self.success_message())
+        await outbound.respond(interaction, embed=self.success_message())
 
         return
 
 ################################################################################
-    async def fetch_post_message(self, client: FrogBot) -> Optional[Message]:
+    async def republish(
+        self,
+        client: FrogBot,
+        embeds: Optional[List[Embed]] = None,
+        *,
+        priority: OutboundPriority = OutboundPriority.Background
+    ) -> str:
+        """Brings this profile's existing post up to date with ``embeds`` (by
+        default, the profile as it stands), queued at ``priority``.
+
+        The edit is skipped if the post was last published with identical
+        embeds. Returns ``"edited"``, ``"unchanged"``, ``"missing"`` if the
+        profile isn't posted or its post has been deleted, or ``"invalid"`` if
+        the profile as it stands can't be posted."""
+
+        profile_msg = self.post_message(client)
+        if profile_msg is None:
+            return "missing"
+
+        if embeds is None:
+            await self.images.refresh_urls()
+            main_profile, aboutme = self.compile()
+            if self.char_name is NS or len(main_profile) > 5999:
+                return "invalid"
+
+            embeds = [main_profile]
+            if aboutme is not None:
+                embeds.append(aboutme)
+
+        digest = embed_digest(embeds)
+        if digest == self.details.post_hash:
+            PUBLISH_SUPPRESSED.inc()
+            return "unchanged"
+
+        start = time.perf_counter()
+        try:
+            await outbound.edit(profile_msg, embeds=embeds, priority=priority)
+        except NotFound:
+            # The post (or its channel) is gone.
+            PUBLISH_LATENCY.observe(time.perf_counter() - start, result="missing")
+            self.details.post_url = None
+            return "missing"
+
+        PUBLISH_LATENCY.observe(time.perf_counter() - start, result="edited")
+        self.details.post_hash = digest
+
+        return "edited"
+
+################################################################################
+    def schedule_republish(self) -> None:
+        """Queues an edit of this profile's post to follow a change, if it's
+        posted and auto-republishing is on. Changes in quick succession are
+        published together."""
+
+        if self.guild is not None and self.details._post_url is not None:
+            self.guild.bot.schedule_republish(self)
+
+################################################################################
+    def post_message(self, client: FrogBot) -> Optional[PartialMessage]:
+        """A reference to this profile's current post, built from the IDs in its
+        jump URL without any REST calls. Whether the post still exists is only
+        found out when it's used."""
 
         post_url = self.details.post_url
         if post_url is NS:
             return
 
         parts = post_url.split("/")
-        channel_id = int(parts[5])
-        msg_id = int(parts[6])
-
-        profile_msg = None
         try:
-            channel = await client.get_or_fetch_channel(channel_id)
-        except:
+            channel_id = int(parts[5])
+            msg_id = int(parts[6])
+        except (IndexError, ValueError):
             return
-        else:
-            try:
-                profile_msg = await channel.fetch_message(msg_id)
-            except:
-                self.details.post_url = None
 
-        return profile_msg
+        channel = client.get_channel(channel_id) or client.get_partial_messageable(channel_id)
+        return channel.get_partial_message(msg_id)
 
 ################################################################################
     def success_message(self) -> Embed:
@@ -307,23 +519,29 @@ class Profile:
         return
 
 ################################################################################
-    async def progress(self, interaction: Interaction) -> None:
+    def progress_text(self) -> str:
+
+        if self._progress is None:
+            em_final = self.details.progress_emoji(self.details._post_url)
+
+            self._progress = (
+                self.details.progress() +
+                self.ataglance.progress() +
+                self.personality.progress() +
+                self.images.progress() +
+                f"{draw_separator(extra=15)}\n"
+                f"{em_final} -- Finalize"
+            )
 
-        em_final = self.details.progress_emoji(self.details._post_url)
+        return self._progress
 
-        value = (
-            self.details.progress() +
-            self.ataglance.progress() +
-            self.personality.progress() +
-            self.images.progress() +
-            f"{draw_separator(extra=15)}\n"
-            f"{em_final} -- Finalize"
-        )
+################################################################################
+    async def progress(self, interaction: Interaction) -> None:
 
         progress = make_embed(
             color=self.color,
             title="Profile Progress",
-            description=value,
+            description=self.progress_text(),
             timestamp=False
         )
         view = CloseMessageView(interaction.user)
@@ -1,13 +1,14 @@
 from __future__ import annotations
 
 from discord    import Embed, Interaction, PartialEmoji
-from typing     import TYPE_CHECKING, Any, Optional, Tuple, Type, TypeVar
+from typing     import TYPE_CHECKING, Any, Callable, Optional, Tuple, Type, TypeVar
 
 from assets     import BotEmojis
-from utilities  import NS
+from utilities  import NS, database
 
 if TYPE_CHECKING:
     from classes.profiles.profile import Profile
+    from utilities.database.pool  import DatabaseConnection
 ################################################################################
 
 __all__ = ("ProfileSection", )
@@ -51,6 +52,33 @@ class ProfileSection:
 
 ################################################################################
     def update(self) -> None:
+        """Marks this section dirty. Repeated updates before the next flush of
+        the write-behind queue collapse into a single :meth:`save`. If the
+        profile is posted, its post is brought up to date too (when
+        auto-republishing is on)."""
+
+        self.parent.invalidate(self)
+        self.persist()
+        self.parent.schedule_republish()
+
+################################################################################
+    def persist(self) -> None:
+        """Marks this section dirty without touching the profile's render cache,
+        for changes that don't show up in it."""
+
+        database.writes.mark_dirty((type(self).__name__, self.parent.id), self._write)
+
+################################################################################
+    async def _write(self, conn: DatabaseConnection) -> Optional[Callable[[], None]]:
+
+        # A transient profile only gets its rows on its first real change.
+        callback = await self.parent.materialize(conn)
+        await self.save(conn)
+
+        return callback
+
+################################################################################
+    async def save(self, conn: Optional[DatabaseConnection] = None) -> None:
 
         raise NotImplementedError
 
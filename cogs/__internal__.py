@@ -4,7 +4,7 @@ from discord        import Cog, Guild, TextChannel
 from discord.abc    import GuildChannel
 from typing         import TYPE_CHECKING
 
-from classes.guild  import GuildData
+from classes.config import GuildConfiguration
 from utilities      import *
 
 if TYPE_CHECKING:
@@ -24,20 +24,26 @@ class Internal(Cog):
         await self.bot.load_frog_channels()
 
         print("Asserting database structure...")
-        assert_db_structure()
+        await assert_db_structure()
+
+        print("Starting attachment URL refresher...")
+        attachment_urls.start(self.bot)
 
         print("Asserting guild records...")
-        assert_guild_records(self.bot.guilds)
+        await assert_guild_records(self.bot.guilds)
 
         print("Loading custom guild data...")
         for guild in self.bot.guilds:
-            self.bot.frog_guilds.append(GuildData.load(guild))
+            self.bot.add_frog(guild)
 
         print("Loading guild configurations...")
         await self.bot.load_guilds()
 
-        print("Loading profiles...")
-        await self.bot.load_profiles()
+        if self.bot.profile_cache is None:
+            print("Loading profiles...")
+            await self.bot.load_profiles()
+        else:
+            print(f"Profiles will load on demand (cache size {self.bot.profile_cache.maxsize})...")
 
         print("FrogBot Online!")
 
@@ -47,7 +53,10 @@ class Internal(Cog):
 
         print(f"Guild Joined! || {guild.id} -- {guild.name}")
 
-        new_guild_entry(guild.id)
+        await new_guild_entry(guild.id)
+
+        frog = self.bot.add_frog(guild)
+        frog.config = GuildConfiguration.load(frog, [])
 
         print("Database Entry Created...")
 
@@ -0,0 +1,192 @@
+from discord        import (
+    ApplicationContext,
+    Cog,
+    Colour,
+    Option,
+    SlashCommandGroup,
+    SlashCommandOptionType
+)
+from discord.ext    import commands
+from typing         import TYPE_CHECKING
+
+from utilities  import *
+
+if TYPE_CHECKING:
+    from classes.bot    import FrogBot
+################################################################################
+class Admin(Cog):
+
+    def __init__(self, bot: "FrogBot"):
+
+        self.bot: "FrogBot" = bot
+
+################################################################################
+
+    admin = SlashCommandGroup(
+        name="admin",
+        description="Bot maintenance commands. (Bot owner only.)"
+    )
+
+################################################################################
+    @admin.command(
+        name="compact_profiles",
+        description="Delete every profile that was created but never filled in."
+    )
+    @commands.is_owner()
+    async def admin_compact_profiles(self, ctx: ApplicationContext) -> None:
+
+        await ctx.defer(ephemeral=True)
+
+        removed = await self.bot.compact_profiles()
+
+        confirm = make_embed(
+            color=Colour.brand_green(),
+            title="Profiles Compacted",
+            description=f"Removed **{removed}** empty profile(s) from the database.",
+            timestamp=True
+        )
+
+        await ctx.respond(embed=confirm, ephemeral=True)
+
+        return
+
+################################################################################
+    @admin.command(
+        name="republish_profiles",
+        description="Bring every posted profile up to date, skipping unchanged ones."
+    )
+    @commands.is_owner()
+    async def admin_republish_profiles(self, ctx: ApplicationContext) -> None:
+
+        await ctx.defer(ephemeral=True)
+
+        results = await self.bot.republish_profiles()
+
+        confirm = make_embed(
+            color=Colour.brand_green(),
+            title="Profiles Republished",
+            description=(
+                f"Edited **{results['edited']}** post(s); "
+                f"**{results['unchanged']}** were already up to date.\n"
+                f"Missing: **{results['missing']}** -- Too long: **{results['invalid']}**"
+            ),
+            timestamp=True
+        )
+
+        await ctx.respond(embed=confirm, ephemeral=True)
+
+        return
+
+################################################################################
+    @admin.command(
+        name="dbstats",
+        description="Show which database statements and commands are the heaviest."
+    )
+    @commands.is_owner()
+    async def admin_dbstats(
+        self,
+        ctx: ApplicationContext,
+        reset: Option(
+            SlashCommandOptionType.boolean,
+            name="reset",
+            description="Start counting afresh after this report.",
+            required=False,
+            default=False
+        )
+    ) -> None:
+
+        stats = database.stats
+
+        statements = "\n".join(
+            f"{calls:>6} {seconds * 1000 / calls:>7.1f} {max_seconds * 1000:>7.1f} {rows:>7}  "
+            f"{statement[:70]}"
+            for statement, calls, rows, seconds, max_seconds in stats.top_statements(8)
+        )
+        commands_ = "\n".join(
+            f"{interactions:>6} {per_call:>6.1f} {seconds * 1000:>7.1f} {writes:>6.1f}  {command[:40]}"
+            for command, interactions, per_call, seconds, writes in stats.top_commands(8)
+        )
+        slow = "\n".join(
+            f"{q.seconds * 1000:>7.0f}ms  {q.command[:20]:<20}  {q.statement[:60]}"
+            for q in list(stats.slow)[-5:]
+        )
+
+        report = make_embed(
+            color=Colour.blurple(),
+            title="Database Statistics",
+            description=(
+                "**Statements** (by total time)\n"
+                f"```\n{'calls':>6} {'avg ms':>7} {'max ms':>7} {'rows':>7}  statement\n"
+                f"{statements or '(none yet)'}\n```\n"
+                "**Commands** (by statements per interaction)\n"
+                f"```\n{'runs':>6} {'stmts':>6} {'db ms':>7} {'writes':>6}  command\n"
+                f"{commands_ or '(none yet)'}\n```\n"
+                f"**Slow queries** (over {stats.slow_threshold * 1000:.0f}ms, latest last)\n"
+                f"```\n{slow or '(none)'}\n```"
+            )[:4096],
+            timestamp=True
+        )
+
+        if reset:
+            stats.reset()
+
+        await ctx.respond(embed=report, ephemeral=True)
+
+        return
+
+################################################################################
+    @admin.command(
+        name="profile",
+        description="Profile a fraction of a command's, callback's or function's runs."
+    )
+    @commands.is_owner()
+    async def admin_profile(
+        self,
+        ctx: ApplicationContext,
+        target: Option(
+            SlashCommandOptionType.string,
+            name="target",
+            description="Eg. 'profiles finalize' or 'Profile.post'. Leave out to list targets.",
+            required=False,
+            default=None
+        ),
+        fraction: Option(
+            SlashCommandOptionType.number,
+            name="fraction",
+            description="Fraction of runs to profile, from 0 (stop) to 1 (every run).",
+            required=False,
+            default=1.0,
+            min_value=0,
+            max_value=1
+        )
+    ) -> None:
+
+        if target is not None:
+            profiler.set_target(target, fraction)
+
+        targets = "\n".join(
+            f"{f:>5.0%}  {pattern}" for pattern, f in sorted(profiler.targets.items())
+        )
+        files = "\n".join(profiler.files()[:5])
+
+        report = make_embed(
+            color=Colour.blurple(),
+            title="Profiler",
+            description=(
+                f"**Targets**\n```\n{targets or '(none)'}\n```\n"
+                f"**Latest profiles** (in `{profiler.directory}`, "
+                f"keeping {profiler.retention})\n```\n{files or '(none)'}\n```"
+            )[:4096],
+            timestamp=True
+        )
+
+        await ctx.respond(embed=report, ephemeral=True)
+
+        return
+
+################################################################################
+def setup(bot: "FrogBot") -> None:
+
+    bot.add_cog(Admin(bot))
+
+################################################################################
@@ -38,7 +38,7 @@ class Profiles(Cog):
     async def profile_details(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.details.set(ctx.interaction)
 
@@ -52,7 +52,7 @@ class Profiles(Cog):
     async def profile_personality(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.personality.set(ctx.interaction)
 
@@ -64,7 +64,7 @@ class Profiles(Cog):
     async def profile_ataglance(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.ataglance.set(ctx.interaction)
 
@@ -76,7 +76,7 @@ class Profiles(Cog):
     async def profile_images(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.images.set(ctx.interaction)
 
@@ -116,7 +116,7 @@ class Profiles(Cog):
     ):
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.images.handle_image(ctx.interaction, SectionType(int(section)), file)
 
@@ -128,7 +128,7 @@ class Profiles(Cog):
     async def profile_preview(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.preview(ctx.interaction)
 
@@ -146,7 +146,7 @@ class Profiles(Cog):
             await ctx.respond(embed=error, ephemeral=True)
             return
 
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
         await profile.post(ctx.interaction)
 
         return
@@ -159,7 +159,7 @@ class Profiles(Cog):
     async def profile_progress(self, ctx: ApplicationContext) -> None:
 
         guild_data = self.bot.get_frog(ctx.guild_id)
-        profile = guild_data.get_profile(ctx.user)
+        profile = await guild_data.get_profile(ctx.user)
 
         await profile.progress(ctx.interaction)
 
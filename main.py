@@ -1,3 +1,4 @@
+import logging
 import os
 
 from discord    import Intents
@@ -9,6 +10,11 @@ from classes.bot    import FrogBot
 from classes.guild  import GuildData
 ################################################################################
 
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+
 bot = FrogBot(
     description="FrogBot is Best!",
     intents=Intents.default(),
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from discord    import Interaction, Member, User
-from discord.ui import View
+from discord    import HTTPException, Interaction, Member, User
+from discord.ui import Item, View
 from typing     import TYPE_CHECKING, Any, Optional, Union
 
+from utilities  import database, interaction_failed, outbound, profiler, tracer, track_interaction
+
 if TYPE_CHECKING:
     pass
 ################################################################################
@@ -40,6 +42,28 @@ class FrogView(View):
 
         return False
 
+################################################################################
+    @staticmethod
+    def _callback_name(item: Item) -> str:
+
+        # Decorated callbacks are partials of the view's method.
+        callback = getattr(item.callback, "func", item.callback)
+        return getattr(callback, "__qualname__", type(item).__name__)
+
+################################################################################
+    async def _scheduled_task(self, item: Item, interaction: Interaction):
+
+        name = self._callback_name(item)
+        with track_interaction("view", name), database.scope(name), profiler.profile(name):
+            with tracer.trace(name, "view", interaction=interaction.id):
+                await super()._scheduled_task(item, interaction)
+
+################################################################################
+    async def on_error(self, error: Exception, item: Item, interaction: Interaction) -> None:
+
+        interaction_failed("view", self._callback_name(item))
+        await super().on_error(error, item, interaction)
+
 ################################################################################
     async def on_timeout(self) -> None:
 
@@ -53,12 +77,18 @@ class FrogView(View):
 ################################################################################
     async def _edit_message_helper(self) -> None:
 
-        try:
-            await self.message.edit(view=self)
-        except:
+        if self.message is not None:
+            try:
+                await outbound.edit(self.message, view=self)
+                return
+            except HTTPException:
+                pass
+
+        if self._interaction is not None:
             try:
-                await self._interaction.edit_original_response(view=self)
-            except:
+                await outbound.edit_response(self._interaction, view=self)
+            except HTTPException:
+                # Most likely the interaction token expired along with the view.
                 pass
 
 ################################################################################
@@ -1,5 +1,7 @@
 from .database  import *
 from .enums     import *
 from .errors    import *
+from .images    import *
+from .metrics   import *
 from .utils     import *
 ################################################################################
@@ -1,3 +1,4 @@
+from .core      import *
 from .profiles  import *
 from .system    import *
 ################################################################################
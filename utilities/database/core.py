@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from typing     import (
+    Any,
+    AsyncIterator,
+    ContextManager,
+    Iterable,
+    List,
+    Optional,
+    Sequence
+)
+
+from .instrument    import InstrumentedConnection, QueryScope, QueryStats, query_scope
+from .pool          import DatabaseBackend, DatabaseConnection, Record, create_backend
+from .repositories  import *
+from .writer        import WriteBehindQueue
+################################################################################
+
+__all__ = ("Database", )
+
+################################################################################
+class Database:
+    """The bot's asynchronous database subsystem.
+
+    Owns a bounded connection pool, exposes one awaitable repository per
+    table and runs a write-behind queue so synchronous code paths (such as
+    property setters) can hand off writes without touching the event loop.
+
+    Attributes
+    -----------
+    backend: Optional[:class:`DatabaseBackend`]
+        The connection pool in use. ``None`` until :meth:`connect` is awaited.
+
+    writes: :class:`WriteBehindQueue`
+        Coalescing queue for row updates, flushed in batches.
+
+    stats: :class:`QueryStats`
+        Timings of every statement run through the pool, and how many each
+        command runs (see :meth:`scope`).
+    """
+
+    def __init__(self):
+
+        self.backend: Optional[DatabaseBackend] = None
+
+        self.guild_config: GuildConfigRepository = GuildConfigRepository(self)
+        self.profiles: ProfileRepository = ProfileRepository(self)
+        self.details: DetailsRepository = DetailsRepository(self)
+        self.personality: PersonalityRepository = PersonalityRepository(self)
+        self.ataglance: AtAGlanceRepository = AtAGlanceRepository(self)
+        self.images: ImagesRepository = ImagesRepository(self)
+        self.addl_images: AdditionalImagesRepository = AdditionalImagesRepository(self)
+        self.image_store: ImageStoreRepository = ImageStoreRepository(self)
+
+        self.writes: WriteBehindQueue = WriteBehindQueue(self)
+        self.stats: QueryStats = QueryStats()
+
+################################################################################
+    @property
+    def connected(self) -> bool:
+
+        return self.backend is not None
+
+################################################################################
+    @property
+    def dialect(self) -> str:
+
+        return self.backend.dialect if self.backend is not None else ""
+
+################################################################################
+    async def connect(
+        self,
+        dsn: str,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        ssl: Optional[str] = "require",
+        flush_interval: float = 2.0,
+        flush_batch: int = 100,
+        slow_query_threshold: float = 0.1
+    ) -> None:
+
+        if self.connected:
+            return
+
+        backend = create_backend(dsn, min_size=min_size, max_size=max_size, ssl=ssl)
+        await backend.connect()
+
+        self.backend = backend
+
+        self.stats.slow_threshold = slow_query_threshold
+
+        self.writes.interval = flush_interval
+        self.writes.max_batch = flush_batch
+        self.writes.start()
+
+        print(f"Database pool initialized ({backend.dialect}, max {backend.max_size})...")
+
+################################################################################
+    async def close(self) -> None:
+
+        if not self.connected:
+            return
+
+        await self.writes.close()
+
+        await self.backend.close()
+        self.backend = None
+
+################################################################################
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[DatabaseConnection]:
+
+        async with self.backend.acquire() as conn:
+            yield InstrumentedConnection(conn, self.stats)
+
+################################################################################
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[DatabaseConnection]:
+
+        async with self.backend.acquire() as conn:
+            async with conn.transaction():
+                yield InstrumentedConnection(conn, self.stats)
+
+################################################################################
+    def scope(self, name: str) -> ContextManager[QueryScope]:
+        """Attributes statements run in this context to the command or view
+        callback ``name``, for :attr:`stats`."""
+
+        return query_scope(name, self.stats)
+
+################################################################################
+    async def execute(self, query: str, *args: Any) -> int:
+
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args)
+
+################################################################################
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+
+        async with self.acquire() as conn:
+            await conn.executemany(query, args)
+
+################################################################################
+    async def fetch(self, query: str, *args: Any) -> List[Record]:
+
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args)
+
+################################################################################
+    async def fetchrow(self, query: str, *args: Any) -> Optional[Record]:
+
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args)
+
+################################################################################
+    async def fetchval(self, query: str, *args: Any) -> Any:
+
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args)
+
+################################################################################
@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+
+from collections    import deque
+from contextlib     import contextmanager
+from contextvars    import ContextVar
+from typing         import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence
+)
+
+from utilities.metrics  import metrics, tracer
+
+from .pool  import DatabaseConnection
+
+if TYPE_CHECKING:
+    from .pool  import Record
+################################################################################
+
+__all__ = (
+    "QueryScope",
+    "QueryStats",
+    "InstrumentedConnection",
+    "query_scope",
+    "current_query_scope",
+    "fingerprint",
+)
+
+log = logging.getLogger(__name__)
+
+STATEMENT_LATENCY = metrics.histogram(
+    "frogbot_db_statement_seconds",
+    "Time taken to run one database statement, by statement.",
+    ("statement", )
+)
+STATEMENT_ROWS = metrics.counter(
+    "frogbot_db_statement_rows_total",
+    "Rows returned or affected by database statements, by statement.",
+    ("statement", )
+)
+STATEMENTS_BY_COMMAND = metrics.counter(
+    "frogbot_db_statements_total",
+    "Database statements run, by the command or view callback that ran them.",
+    ("command", )
+)
+STATEMENTS_PER_INTERACTION = metrics.histogram(
+    "frogbot_db_statements_per_interaction",
+    "Database statements run directly by one command or view callback.",
+    ("command", ),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+)
+SLOW_QUERIES = metrics.counter(
+    "frogbot_db_slow_queries_total",
+    "Database statements slower than the slow query threshold.",
+    ("statement", )
+)
+
+# Statements run outside any command, eg. write-behind flushes and sweeps.
+BACKGROUND = "background"
+
+_PARAMETER_LIST = re.compile(r"\$\d+(?:\s*,\s*\$\d+)*")
+_VALUES_LIST = re.compile(r"\(\$\)(?:\s*,\s*\(\$\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+################################################################################
+def fingerprint(query: str, max_length: int = 120) -> str:
+    """Reduces a statement to its shape, for use as a label: parameter lists
+    and multi-row ``VALUES`` of any length look the same."""
+
+    query = _WHITESPACE.sub(" ", query).strip()
+    query = _PARAMETER_LIST.sub("$", query)
+    query = _VALUES_LIST.sub("($), ...", query)
+
+    return query if len(query) <= max_length else query[:max_length - 3] + "..."
+
+################################################################################
+class QueryScope:
+    """The database work done on behalf of one command or view callback."""
+
+    __slots__ = (
+        "name",
+        "statements",
+        "rows",
+        "seconds",
+        "deferred_writes",
+        "finished"
+    )
+
+    def __init__(self, name: str):
+
+        self.name: str = name
+        self.statements: int = 0
+        self.rows: int = 0
+        self.seconds: float = 0.0
+        # Rows marked dirty for the write-behind queue to write later.
+        self.deferred_writes: int = 0
+        self.finished: bool = False
+
+################################################################################
+
+_scope: ContextVar[Optional[QueryScope]] = ContextVar("frogbot_query_scope", default=None)
+
+################################################################################
+def current_query_scope() -> Optional[QueryScope]:
+
+    # Long-lived tasks started during a command inherit its scope after the
+    # command's done; their work is background work.
+    scope = _scope.get()
+    return scope if scope is not None and not scope.finished else None
+
+################################################################################
+class SlowQuery(NamedTuple):
+
+    at: float
+    statement: str
+    command: str
+    seconds: float
+    rows: int
+
+################################################################################
+class _StatementStats:
+
+    __slots__ = ("calls", "rows", "seconds", "max_seconds")
+
+    def __init__(self):
+
+        self.calls: int = 0
+        self.rows: int = 0
+        self.seconds: float = 0.0
+        self.max_seconds: float = 0.0
+
+################################################################################
+class _CommandStats:
+
+    __slots__ = ("interactions", "statements", "seconds", "deferred_writes")
+
+    def __init__(self):
+
+        self.interactions: int = 0
+        self.statements: int = 0
+        self.seconds: float = 0.0
+        self.deferred_writes: int = 0
+
+################################################################################
+class QueryStats:
+    """Running totals behind ``/admin dbstats``: per-statement timings and
+    per-command statement counts, plus the most recent slow queries.
+
+    Statements taking ``slow_threshold`` seconds or longer are logged."""
+
+    def __init__(self, slow_threshold: float = 0.1, slow_log_size: int = 20):
+
+        self.slow_threshold: float = slow_threshold
+
+        self.statements: Dict[str, _StatementStats] = {}
+        self.commands: Dict[str, _CommandStats] = {}
+        self.slow: Deque[SlowQuery] = deque(maxlen=slow_log_size)
+
+################################################################################
+    def record(self, query: str, seconds: float, rows: int) -> str:
+        """Counts one statement, returning its fingerprint."""
+
+        statement = fingerprint(query)
+        scope = current_query_scope()
+        command = scope.name if scope is not None else BACKGROUND
+
+        stats = self.statements.get(statement)
+        if stats is None:
+            stats = self.statements[statement] = _StatementStats()
+        stats.calls += 1
+        stats.rows += rows
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+
+        if scope is not None:
+            scope.statements += 1
+            scope.rows += rows
+            scope.seconds += seconds
+
+        STATEMENT_LATENCY.observe(seconds, statement=statement)
+        STATEMENT_ROWS.inc(rows, statement=statement)
+        STATEMENTS_BY_COMMAND.inc(command=command)
+
+        if seconds >= self.slow_threshold:
+            SLOW_QUERIES.inc(statement=statement)
+            self.slow.append(SlowQuery(time.time(), statement, command, seconds, rows))
+            log.warning(
+                "Slow query (%.0fms, %d rows, %s): %s",
+                seconds * 1000, rows, command, statement
+            )
+
+        return statement
+
+################################################################################
+    def finish(self, scope: QueryScope) -> None:
+
+        stats = self.commands.get(scope.name)
+        if stats is None:
+            stats = self.commands[scope.name] = _CommandStats()
+        stats.interactions += 1
+        stats.statements += scope.statements
+        stats.seconds += scope.seconds
+        stats.deferred_writes += scope.deferred_writes
+
+        STATEMENTS_PER_INTERACTION.observe(scope.statements, command=scope.name)
+
+################################################################################
+    def top_statements(self, limit: int = 10) -> List[tuple]:
+        """``(statement, calls, rows, total seconds, max seconds)`` for the
+        statements that took longest in total."""
+
+        ranked = sorted(self.statements.items(), key=lambda item: item[1].seconds, reverse=True)
+        return [
+            (statement, s.calls, s.rows, s.seconds, s.max_seconds)
+            for statement, s in ranked[:limit]
+        ]
+
+################################################################################
+    def top_commands(self, limit: int = 10) -> List[tuple]:
+        """``(command, interactions, statements per interaction, database
+        seconds per interaction, deferred writes per interaction)`` for the
+        commands running the most statements per interaction."""
+
+        rows = [
+            (
+                command,
+                c.interactions,
+                c.statements / c.interactions,
+                c.seconds / c.interactions,
+                c.deferred_writes / c.interactions
+            )
+            for command, c in self.commands.items()
+            if c.interactions
+        ]
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        return rows[:limit]
+
+################################################################################
+    def reset(self) -> None:
+
+        self.statements.clear()
+        self.commands.clear()
+        self.slow.clear()
+
+################################################################################
+@contextmanager
+def query_scope(name: str, stats: Optional[QueryStats] = None) -> Iterator[QueryScope]:
+    """Attributes database statements run in this context (and any tasks it
+    starts, until it exits) to the command or view callback ``name``."""
+
+    scope = QueryScope(name)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        scope.finished = True
+        _scope.reset(token)
+        if stats is not None:
+            stats.finish(scope)
+
+################################################################################
+class InstrumentedConnection(DatabaseConnection):
+    """Wraps a pooled connection, timing every statement it runs and counting
+    the rows each one returned or touched into ``stats``, and adding each one
+    to the current trace."""
+
+    __slots__ = ("_inner", "_stats")
+
+    def __init__(self, inner: DatabaseConnection, stats: QueryStats):
+
+        self._inner: DatabaseConnection = inner
+        self._stats: QueryStats = stats
+
+################################################################################
+    def _record(self, query: str, start: float, rows: int) -> None:
+
+        end = time.perf_counter()
+        statement = self._stats.record(query, end - start, rows)
+        tracer.add_span(statement, "db", start, end, rows=rows)
+
+################################################################################
+    async def execute(self, query: str, *args: Any) -> int:
+
+        # Statements that fail (or time out) are recorded too, with no rows.
+        rows = 0
+        start = time.perf_counter()
+        try:
+            rows = await self._inner.execute(query, *args)
+        finally:
+            self._record(query, start, rows)
+
+        return rows
+
+################################################################################
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+
+        args = list(args)
+        rows = 0
+        start = time.perf_counter()
+        try:
+            await self._inner.executemany(query, args)
+            rows = len(args)
+        finally:
+            self._record(query, start, rows)
+
+################################################################################
+    async def fetch(self, query: str, *args: Any) -> List[Record]:
+
+        records: List[Record] = []
+        start = time.perf_counter()
+        try:
+            records = await self._inner.fetch(query, *args)
+        finally:
+            self._record(query, start, len(records))
+
+        return records
+
+################################################################################
+    async def fetchrow(self, query: str, *args: Any) -> Optional[Record]:
+
+        record = None
+        start = time.perf_counter()
+        try:
+            record = await self._inner.fetchrow(query, *args)
+        finally:
+            self._record(query, start, int(record is not None))
+
+        return record
+
+################################################################################
+    async def fetchval(self, query: str, *args: Any) -> Any:
+
+        value = None
+        start = time.perf_counter()
+        try:
+            value = await self._inner.fetchval(query, *args)
+        finally:
+            self._record(query, start, int(value is not None))
+
+        return value
+
+################################################################################
+    async def copy_records(
+        self,
+        table: str,
+        columns: Sequence[str],
+        records: Iterable[Sequence[Any]]
+    ) -> int:
+
+        rows = 0
+        start = time.perf_counter()
+        try:
+            rows = await self._inner.copy_records(table, columns, records)
+        finally:
+            self._record(f"COPY {table} ({', '.join(columns)})", start, rows)
+
+        return rows
+
+################################################################################
+    def transaction(self):
+
+        return self._inner.transaction()
+
+################################################################################
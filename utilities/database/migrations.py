@@ -0,0 +1,316 @@
+"""Brings databases created by older versions of the bot up to date:
+converts the old text-encoded list columns into native arrays, re-keys
+image_store by variant, makes profiles unique per owner and adds columns
+introduced since.
+
+Runs automatically from :func:`assert_db_structure`, or ahead of a deploy with
+
+    python -m utilities.database.migrations --batch-size 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+from typing     import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Set, Tuple
+
+from utilities.utils.parsers    import convert_db_list
+
+from .system    import assert_db_structure, connect_database, database
+
+if TYPE_CHECKING:
+    from .pool  import DatabaseConnection
+################################################################################
+
+__all__ = (
+    "ListColumn",
+    "LIST_COLUMNS",
+    "IMAGE_STORE_ATTACHMENT_COLUMNS",
+    "DETAILS_POST_COLUMNS",
+    "migrate_list_columns",
+    "migrate_image_store_key",
+    "migrate_unique_owner",
+    "add_missing_columns",
+)
+
+log = logging.getLogger(__name__)
+
+################################################################################
+class ListColumn(NamedTuple):
+
+    table: str
+    key: str
+    column: str
+    sql_type: str
+    element: Callable[[str], Any]
+
+################################################################################
+
+LIST_COLUMNS = (
+    ListColumn("guild_config", "guild_id", "post_channels", "BIGINT[]", int),
+    ListColumn("details", "profile_id", "jobs", "TEXT[]", str),
+    ListColumn("personality", "profile_id", "likes", "TEXT[]", str),
+    ListColumn("personality", "profile_id", "dislikes", "TEXT[]", str),
+    ListColumn("ataglance", "profile_id", "pronouns", "INTEGER[]", int),
+)
+
+IMAGE_STORE_ATTACHMENT_COLUMNS = (
+    ("channel_id", "BIGINT"),
+    ("message_id", "BIGINT"),
+    ("attachment_id", "BIGINT"),
+    ("expires_at", "BIGINT"),
+)
+
+DETAILS_POST_COLUMNS = (
+    ("post_hash", "TEXT"),
+)
+
+################################################################################
+async def _column_types(conn: DatabaseConnection, table: str) -> Dict[str, str]:
+
+    if database.dialect == "sqlite":
+        records = await conn.fetch("SELECT name, type FROM pragma_table_info($1)", table)
+        return {r[0]: r[1].upper() for r in records}
+
+    # Array types are reported with a leading underscore, eg. _text for TEXT[].
+    records = await conn.fetch(
+        "SELECT column_name, udt_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = $1",
+        table
+    )
+    return {
+        r[0]: (r[1][1:] + "[]" if r[1].startswith("_") else r[1]).upper()
+        for r in records
+    }
+
+################################################################################
+async def _migrate_column(spec: ListColumn, batch_size: int) -> int:
+
+    table, key, column = spec.table, spec.key, spec.column
+    staging = f"{column}_array"
+
+    async with database.acquire() as conn:
+        types = await _column_types(conn, table)
+
+    if types.get(column, "").endswith("[]"):
+        return 0
+
+    if staging not in types:
+        await database.execute(f"ALTER TABLE {table} ADD COLUMN {staging} {spec.sql_type}")
+
+    # Walk the table in key order, one short transaction per batch, so a large
+    # table is never locked for long and an interrupted run can simply restart.
+    converted = 0
+    last_key = None
+    while True:
+        async with database.transaction() as conn:
+            if last_key is None:
+                records = await conn.fetch(
+                    f"SELECT {key}, {column} FROM {table} ORDER BY {key} LIMIT $1",
+                    batch_size
+                )
+            else:
+                records = await conn.fetch(
+                    f"SELECT {key}, {column} FROM {table} WHERE {key} > $1 "
+                    f"ORDER BY {key} LIMIT $2",
+                    last_key, batch_size
+                )
+            if not records:
+                break
+
+            await conn.executemany(
+                f"UPDATE {table} SET {staging} = $1 WHERE {key} = $2",
+                [
+                    ([spec.element(i) for i in convert_db_list(r[1])] or None, r[0])
+                    for r in records
+                ]
+            )
+
+        converted += len(records)
+        last_key = records[-1][0]
+
+    # The view reads the old column, so it has to go too; assert_db_structure()
+    # puts it back.
+    async with database.transaction() as conn:
+        await conn.execute("DROP VIEW IF EXISTS profile_master")
+        await conn.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        await conn.execute(f"ALTER TABLE {table} RENAME COLUMN {staging} TO {column}")
+
+    return converted
+
+################################################################################
+async def migrate_list_columns(batch_size: int = 500) -> Dict[str, int]:
+    """Moves every list column still stored as text over to a native array
+    column, converting ``batch_size`` rows per transaction. Columns that are
+    already arrays are skipped, so this is safe to run on every startup.
+
+    Returns the number of rows converted per ``table.column``."""
+
+    results: Dict[str, int] = {}
+
+    for spec in LIST_COLUMNS:
+        start = time.perf_counter()
+        converted = await _migrate_column(spec, batch_size)
+        if converted:
+            log.info(
+                "Migrated %s.%s to %s: %d rows in %.2fs.",
+                spec.table, spec.column, spec.sql_type, converted,
+                time.perf_counter() - start
+            )
+        results[f"{spec.table}.{spec.column}"] = converted
+
+    return results
+
+################################################################################
+async def migrate_image_store_key() -> bool:
+    """Re-keys an ``image_store`` table from before images were stored per
+    variant, from ``(sha256)`` to ``(sha256, variant)``. Its images were all
+    stored as uploaded, so they're filed under ``original``. Returns whether
+    the table needed migrating."""
+
+    async with database.acquire() as conn:
+        types = await _column_types(conn, "image_store")
+
+    if not types or "variant" in types:
+        return False
+
+    start = time.perf_counter()
+
+    if database.dialect == "sqlite":
+        # SQLite can't change a table's primary key, so the table is rebuilt.
+        columns = ", ".join(types)
+        async with database.transaction() as conn:
+            await conn.execute("ALTER TABLE image_store RENAME TO image_store_old")
+            await conn.execute(
+                "CREATE TABLE image_store("
+                "sha256 TEXT NOT NULL,"
+                "variant TEXT NOT NULL,"
+                "url TEXT NOT NULL,"
+                "CONSTRAINT image_store_pkey PRIMARY KEY (sha256, variant))"
+            )
+            for name, sql_type in types.items():
+                if name not in ("sha256", "url"):
+                    await conn.execute(f"ALTER TABLE image_store ADD COLUMN {name} {sql_type}")
+            await conn.execute(
+                f"INSERT INTO image_store (variant, {columns}) "
+                f"SELECT 'original', {columns} FROM image_store_old"
+            )
+            await conn.execute("DROP TABLE image_store_old")
+    else:
+        async with database.transaction() as conn:
+            await conn.execute(
+                "ALTER TABLE image_store ADD COLUMN variant TEXT NOT NULL DEFAULT 'original'"
+            )
+            await conn.execute("ALTER TABLE image_store ALTER COLUMN variant DROP DEFAULT")
+            # The old table was also UNIQUE on sha256 alone.
+            await conn.execute("ALTER TABLE image_store DROP CONSTRAINT IF EXISTS image_store_sha256_key")
+            await conn.execute("ALTER TABLE image_store DROP CONSTRAINT image_store_pkey")
+            await conn.execute(
+                "ALTER TABLE image_store ADD CONSTRAINT image_store_pkey PRIMARY KEY (sha256, variant)"
+            )
+
+    log.info("Re-keyed image_store by variant in %.2fs.", time.perf_counter() - start)
+
+    return True
+
+################################################################################
+async def _index_is_unique(conn: DatabaseConnection, table: str, index: str) -> bool:
+
+    if database.dialect == "sqlite":
+        unique = await conn.fetchval(
+            "SELECT \"unique\" FROM pragma_index_list($1) WHERE name = $2", table, index
+        )
+    else:
+        unique = await conn.fetchval(
+            "SELECT indisunique FROM pg_index WHERE indexrelid = to_regclass(CAST($1 AS TEXT))",
+            index
+        )
+
+    return bool(unique)
+
+################################################################################
+async def migrate_unique_owner() -> int:
+    """Makes ``profiles_owner_idx`` unique, so a user has at most one profile
+    per guild. Concurrent creates could each add one while it wasn't, so all
+    but one of any user's profiles in a guild are deleted first, keeping the
+    posted one if there is one. Returns the number of profiles deleted."""
+
+    async with database.acquire() as conn:
+        if await _index_is_unique(conn, "profiles", "profiles_owner_idx"):
+            return 0
+
+    async with database.transaction() as conn:
+        records = await conn.fetch(
+            "SELECT p.profile_id, p.guild_id, p.user_id FROM profiles p "
+            "LEFT JOIN details d ON d.profile_id = p.profile_id "
+            "WHERE EXISTS ("
+                "SELECT 1 FROM profiles o WHERE o.guild_id = p.guild_id "
+                "AND o.user_id = p.user_id AND o.profile_id <> p.profile_id"
+            ") "
+            "ORDER BY p.guild_id, p.user_id, d.post_url IS NULL, p.profile_id"
+        )
+
+        kept: Set[Tuple[int, int]] = set()
+        duplicates: List[str] = []
+        for record in records:
+            owner = (record[1], record[2])
+            if owner in kept:
+                duplicates.append(record[0])
+            else:
+                kept.add(owner)
+
+        if duplicates:
+            await conn.executemany(
+                "DELETE FROM addl_images WHERE profile_id = $1", [(d, ) for d in duplicates]
+            )
+            await database.profiles.delete_many(duplicates, conn=conn)
+            log.warning("Deleted %d duplicate profiles.", len(duplicates))
+
+        await conn.execute("DROP INDEX IF EXISTS profiles_owner_idx")
+        await conn.execute("CREATE UNIQUE INDEX profiles_owner_idx ON profiles (guild_id, user_id)")
+
+    return len(duplicates)
+
+################################################################################
+async def add_missing_columns(table: str, columns: Tuple[Tuple[str, str], ...]) -> int:
+    """Adds any of the (name, SQL type) ``columns`` that ``table`` doesn't have
+    yet, as nullable columns. Returns the number added."""
+
+    async with database.acquire() as conn:
+        existing = await _column_types(conn, table)
+
+    missing = [(name, sql_type) for name, sql_type in columns if name not in existing]
+    if missing:
+        async with database.transaction() as conn:
+            for name, sql_type in missing:
+                await conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {sql_type}")
+        log.info("Added %s to %s.", ", ".join(name for name, _ in missing), table)
+
+    return len(missing)
+
+################################################################################
+async def _main(args: argparse.Namespace) -> None:
+
+    await connect_database()
+    try:
+        results = await migrate_list_columns(args.batch_size)
+        await assert_db_structure()
+    finally:
+        await database.close()
+
+    for name, converted in results.items():
+        print(f"{name:<28}{converted:>10,} rows")
+
+################################################################################
+if __name__ == "__main__":
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+
+    asyncio.run(_main(parser.parse_args()))
+
+################################################################################
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import sqlite3
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib         import asynccontextmanager
+from typing             import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Sequence
+)
+################################################################################
+
+__all__ = (
+    "DatabaseConnection",
+    "DatabaseBackend",
+    "PostgresBackend",
+    "SQLiteBackend",
+    "create_backend",
+)
+
+Record = Any
+
+# The SQLite stand-in keeps array columns (declared as eg. TEXT[]) as JSON text,
+# converted back into lists by sqlite3 itself as rows are read.
+for _array_type in ("TEXT[]", "INTEGER[]", "BIGINT[]"):
+    sqlite3.register_converter(_array_type, json.loads)
+
+################################################################################
+class DatabaseConnection:
+    """A thin, backend-agnostic wrapper around a single pooled connection.
+
+    All queries are written with asyncpg-style positional placeholders
+    (``$1``, ``$2``, ...) regardless of the backend in use.
+    """
+
+    # Bind parameters allowed in one statement by the most restrictive backend
+    # (SQLite builds before 3.32 stop at 999).
+    MAX_PARAMETERS: int = 999
+
+    async def execute(self, query: str, *args: Any) -> int:
+
+        raise NotImplementedError
+
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+
+        raise NotImplementedError
+
+    async def fetch(self, query: str, *args: Any) -> List[Record]:
+
+        raise NotImplementedError
+
+    async def copy_records(
+        self,
+        table: str,
+        columns: Sequence[str],
+        records: Iterable[Sequence[Any]]
+    ) -> int:
+        """Bulk-loads ``records`` into ``table`` and returns how many were written.
+
+        Backends without a native ``COPY`` fall back to multi-row ``VALUES``
+        statements, each carrying as many rows as the parameter limit allows.
+        """
+
+        records = list(records)
+        width = len(columns)
+        per_statement = max(self.MAX_PARAMETERS // width, 1)
+        column_list = ", ".join(columns)
+
+        for start in range(0, len(records), per_statement):
+            chunk = records[start:start + per_statement]
+            values = ", ".join(
+                "(" + ", ".join(f"${row * width + col + 1}" for col in range(width)) + ")"
+                for row in range(len(chunk))
+            )
+            await self.execute(
+                f"INSERT INTO {table} ({column_list}) VALUES {values}",
+                *[value for record in chunk for value in record]
+            )
+
+        return len(records)
+
+    async def fetchrow(self, query: str, *args: Any) -> Optional[Record]:
+
+        rows = await self.fetch(query, *args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+
+        row = await self.fetchrow(query, *args)
+        return row[0] if row is not None else None
+
+    def transaction(self):
+
+        raise NotImplementedError
+
+################################################################################
+class DatabaseBackend:
+    """Base class for the connection pools the bot can run against."""
+
+    dialect: str = ""
+
+    def __init__(self, dsn: str, *, min_size: int = 1, max_size: int = 10):
+
+        self.dsn: str = dsn
+        self.min_size: int = min_size
+        self.max_size: int = max_size
+
+    async def connect(self) -> None:
+
+        raise NotImplementedError
+
+    async def close(self) -> None:
+
+        raise NotImplementedError
+
+    def acquire(self):
+
+        raise NotImplementedError
+
+################################################################################
+class _PostgresConnection(DatabaseConnection):
+
+    __slots__ = ("_conn", )
+
+    def __init__(self, conn: Any):
+
+        self._conn = conn
+
+    async def execute(self, query: str, *args: Any) -> int:
+
+        status = await self._conn.execute(query, *args)
+
+        # asyncpg returns a command tag such as "UPDATE 1" or "INSERT 0 5".
+        try:
+            return int(status.rsplit(" ", 1)[-1])
+        except (AttributeError, ValueError):
+            return 0
+
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+
+        await self._conn.executemany(query, list(args))
+
+    async def fetch(self, query: str, *args: Any) -> List[Record]:
+
+        return await self._conn.fetch(query, *args)
+
+    async def fetchrow(self, query: str, *args: Any) -> Optional[Record]:
+
+        return await self._conn.fetchrow(query, *args)
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+
+        return await self._conn.fetchval(query, *args)
+
+    async def copy_records(
+        self,
+        table: str,
+        columns: Sequence[str],
+        records: Iterable[Sequence[Any]]
+    ) -> int:
+
+        records = list(records)
+        await self._conn.copy_records_to_table(table, records=records, columns=list(columns))
+
+        return len(records)
+
+    def transaction(self):
+
+        return self._conn.transaction()
+
+################################################################################
+class PostgresBackend(DatabaseBackend):
+    """An asyncpg connection pool. ``asyncpg`` is only imported on connect so the
+    SQLite stand-in can be used without it installed."""
+
+    dialect = "postgres"
+
+    def __init__(self, dsn: str, *, ssl: Optional[str] = "require", **kwargs):
+
+        super().__init__(dsn, **kwargs)
+
+        self.ssl: Optional[str] = ssl
+        self._pool: Optional[Any] = None
+
+    async def connect(self) -> None:
+
+        import asyncpg
+
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            ssl=self.ssl if self.ssl not in (None, "disable") else None
+        )
+
+    async def close(self) -> None:
+
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[DatabaseConnection]:
+
+        async with self._pool.acquire() as conn:
+            yield _PostgresConnection(conn)
+
+################################################################################
+class _SQLiteConnection(DatabaseConnection):
+
+    __slots__ = ("_conn", "_backend")
+
+    _PLACEHOLDER = re.compile(r"\$(\d+)")
+
+    def __init__(self, conn: sqlite3.Connection, backend: SQLiteBackend):
+
+        self._conn: sqlite3.Connection = conn
+        self._backend: SQLiteBackend = backend
+
+    def _translate(self, query: str) -> str:
+
+        # SQLite understands numbered parameters as ?NNN.
+        return self._PLACEHOLDER.sub(r"?\1", query)
+
+    @staticmethod
+    def _adapt(args: Sequence[Any]) -> Sequence[Any]:
+
+        # Lists are bound for array columns; store them as JSON.
+        if any(isinstance(arg, list) for arg in args):
+            return [json.dumps(arg) if isinstance(arg, list) else arg for arg in args]
+
+        return args
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+
+        return await self._backend.run(func, *args)
+
+    async def execute(self, query: str, *args: Any) -> int:
+
+        cursor = await self._run(self._conn.execute, self._translate(query), self._adapt(args))
+        return max(cursor.rowcount, 0)
+
+    async def executemany(self, query: str, args: Iterable[Sequence[Any]]) -> None:
+
+        await self._run(
+            self._conn.executemany,
+            self._translate(query),
+            [self._adapt(row) for row in args]
+        )
+
+    async def fetch(self, query: str, *args: Any) -> List[Record]:
+
+        def _fetch() -> List[Record]:
+            return self._conn.execute(self._translate(query), self._adapt(args)).fetchall()
+
+        return await self._run(_fetch)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+
+        await self._run(self._conn.execute, "BEGIN")
+        try:
+            yield
+        except BaseException:
+            await self._run(self._conn.execute, "ROLLBACK")
+            raise
+        else:
+            await self._run(self._conn.execute, "COMMIT")
+
+################################################################################
+class SQLiteBackend(DatabaseBackend):
+    """A local stand-in for Postgres built on the standard library ``sqlite3``
+    module, for running the bot and its database layer offline.
+
+    Each pooled connection is only ever used by one task at a time and all
+    blocking calls are pushed onto a dedicated thread pool.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, dsn: str, **kwargs):
+
+        super().__init__(dsn, **kwargs)
+
+        # SQLAlchemy-style: sqlite:///relative.db, sqlite:////abs/path.db
+        path = dsn.split("://", 1)[-1]
+        self.path: str = (path[1:] if path.startswith("/") else path) or ":memory:"
+        if self.path == ":memory:":
+            # Separate connections would each see their own empty database.
+            self.max_size = 1
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._connections: List[sqlite3.Connection] = []
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _open(self) -> sqlite3.Connection:
+
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+
+        return conn
+
+    async def connect(self) -> None:
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_size,
+            thread_name_prefix="frogbot-sqlite"
+        )
+        self._idle = asyncio.Queue()
+
+        for _ in range(self.max_size):
+            conn = await self.run(self._open)
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+
+        for conn in self._connections:
+            await self.run(conn.close)
+
+        self._connections.clear()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[DatabaseConnection]:
+
+        conn = await self._idle.get()
+        try:
+            yield _SQLiteConnection(conn, self)
+        finally:
+            self._idle.put_nowait(conn)
+
+################################################################################
+def create_backend(
+    dsn: str,
+    *,
+    min_size: int = 1,
+    max_size: int = 10,
+    ssl: Optional[str] = "require"
+) -> DatabaseBackend:
+    """Picks a backend from the scheme of the provided DSN. ``sqlite://`` URLs
+    (eg. ``sqlite:///frogbot.db`` or ``sqlite://:memory:``) use the SQLite
+    stand-in; anything else is handed to asyncpg."""
+
+    if dsn.startswith("sqlite://"):
+        return SQLiteBackend(dsn, min_size=min_size, max_size=max_size)
+
+    return PostgresBackend(dsn, min_size=min_size, max_size=max_size, ssl=ssl)
+
+################################################################################
@@ -1,70 +1,70 @@
 import uuid
 
-from typing     import Optional
+from typing     import Iterable, List, Optional, Tuple
 
-from .system    import db_connection
+from .system    import database
 ################################################################################
 
 __all__ = (
     "new_profile_entry",
+    "new_profile_entries",
+    "compact_empty_profiles",
     "new_additional_image"
 )
 
 ################################################################################
-def new_profile_entry(guild_id: int, user_id: int) -> Optional[str]:
+async def new_profile_entry(guild_id: int, user_id: int) -> Optional[str]:
 
-    c = db_connection.cursor()
-    c.execute(
-        "SELECT * FROM profiles WHERE guild_id = %s and user_id = %s",
-        (guild_id, user_id)
-    )
+    new_profile_id = uuid.uuid4().hex
 
-    record = c.fetchone()
-    if record:
+    if not await database.profiles.create(new_profile_id, guild_id, user_id):
         raise ValueError("Profile already exists.")
 
-    new_profile_id = uuid.uuid4().hex
+    return new_profile_id
+
+################################################################################
+async def new_profile_entries(owners: Iterable[Tuple[int, int]]) -> List[Tuple[str, int, int]]:
+    """Bulk-creates blank profiles for ``(guild_id, user_id)`` pairs, for
+    migrations and load tests. Owners that already have a profile (or appear
+    twice) are skipped. Returns ``(profile_id, guild_id, user_id)`` for each
+    profile created."""
 
-    c.execute(
-        "INSERT INTO profiles (profile_id, user_id, guild_id) VALUES (%s, %s, %s)",
-        (new_profile_id, user_id, guild_id)
-    )
-    c.execute(
-        "INSERT INTO details (profile_id) VALUES (%s)",
-        (new_profile_id, )
-    )
-    c.execute(
-        "INSERT INTO personality (profile_id) VALUES (%s)",
-        (new_profile_id,)
-    )
-    c.execute(
-        "INSERT INTO ataglance (profile_id) VALUES (%s)",
-        (new_profile_id,)
-    )
-    c.execute(
-        "INSERT INTO images (profile_id) VALUES (%s)",
-        (new_profile_id,)
-    )
-
-    db_connection.commit()
-    c.close()
+    async with database.transaction() as conn:
+        existing = await database.profiles.owners(conn=conn)
 
-    return new_profile_id
+        rows = []
+        for owner in owners:
+            if owner in existing:
+                continue
+            existing.add(owner)
+            rows.append((uuid.uuid4().hex, owner[0], owner[1]))
+
+        await database.profiles.insert_many(rows, conn=conn)
+
+    return rows
 
 ################################################################################
-def new_additional_image(profile_id: str, url: str, caption: Optional[str]) -> str:
+async def compact_empty_profiles() -> List[Tuple[str, int, int]]:
+    """Removes every profile that was created but never filled in, in a single
+    transaction, and returns ``(profile_id, guild_id, user_id)`` for each.
 
-    image_id = uuid.uuid4().hex
+    Pending writes are flushed first so profiles that were just edited aren't
+    mistaken for empty ones."""
+
+    await database.writes.flush()
+
+    async with database.transaction() as conn:
+        removed = await database.profiles.fetch_empty(conn=conn)
+        await database.profiles.delete_many([r[0] for r in removed], conn=conn)
+
+    return removed
 
-    c = db_connection.cursor()
-    c.execute(
-        "INSERT INTO addl_images (profile_id, image_id, url, caption) "
-        "VALUES (%s, %s, %s, %s)",
-        (profile_id, image_id, url, caption)
-    )
+################################################################################
+async def new_additional_image(profile_id: str, url: str, caption: Optional[str]) -> str:
+
+    image_id = uuid.uuid4().hex
 
-    db_connection.commit()
-    c.close()
+    await database.addl_images.insert(profile_id, image_id, url, caption)
 
     return image_id
 
@@ -0,0 +1,598 @@
+from __future__ import annotations
+
+from typing     import TYPE_CHECKING, Any, Iterable, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from .core  import Database
+    from .pool  import DatabaseConnection, Record
+################################################################################
+
+__all__ = (
+    "Repository",
+    "GuildConfigRepository",
+    "ProfileRepository",
+    "DetailsRepository",
+    "PersonalityRepository",
+    "AtAGlanceRepository",
+    "ImagesRepository",
+    "AdditionalImagesRepository",
+    "ImageStoreRepository",
+)
+
+################################################################################
+def _array(values: Optional[Iterable[Any]]) -> Optional[List[Any]]:
+
+    # Array columns hold NULL rather than an empty array, so "never filled in"
+    # is always just IS NULL.
+    if not values:
+        return None
+
+    return list(values)
+
+################################################################################
+
+# Every profile has exactly one row in each of these.
+_SECTION_TABLES = ("details", "personality", "ataglance", "images")
+
+# Inserts nothing (and returns no row) if the user already has a profile here.
+# Only the unique owner index makes that hold for concurrent creates.
+_CREATE_PROFILE = (
+    "WITH new_profile AS ("
+        "INSERT INTO profiles (profile_id, user_id, guild_id) VALUES ($1, $2, $3) "
+        "ON CONFLICT (guild_id, user_id) DO NOTHING "
+        "RETURNING profile_id"
+    "), "
+    "d AS (INSERT INTO details (profile_id) SELECT profile_id FROM new_profile), "
+    "pr AS (INSERT INTO personality (profile_id) SELECT profile_id FROM new_profile), "
+    "a AS (INSERT INTO ataglance (profile_id) SELECT profile_id FROM new_profile), "
+    "i AS (INSERT INTO images (profile_id) SELECT profile_id FROM new_profile) "
+    "SELECT profile_id FROM new_profile"
+)
+
+# Profiles that were created but never filled in.
+_EMPTY_PROFILES = (
+    "SELECT m.profile_id, m.guild_id, m.user_id FROM profile_master m WHERE "
+    + " AND ".join(
+        f"m.{column} IS NULL" for column in (
+            "char_name", "custom_url", "color", "jobs", "rates", "post_url",
+            "likes", "dislikes", "personality", "aboutme",
+            "gender", "pronouns", "race", "clan", "orientation", "height", "age", "mare",
+            "thumbnail", "main_image",
+        )
+    )
+    + " AND NOT EXISTS (SELECT 1 FROM addl_images ai WHERE ai.profile_id = m.profile_id)"
+)
+
+################################################################################
+class Repository:
+    """Base class for the awaitable per-table data access objects.
+
+    Every method accepts an optional ``conn`` so several calls can share one
+    connection/transaction; otherwise a connection is borrowed from the pool.
+    """
+
+    __slots__ = ("_db", )
+
+    def __init__(self, database: Database):
+
+        self._db: Database = database
+
+################################################################################
+    def _executor(self, conn: Optional[DatabaseConnection]):
+
+        return conn if conn is not None else self._db
+
+################################################################################
+class GuildConfigRepository(Repository):
+
+    async def fetch_all(self, *, conn: Optional[DatabaseConnection] = None) -> List[Record]:
+
+        return await self._executor(conn).fetch("SELECT * FROM guild_config")
+
+################################################################################
+    async def insert(self, guild_id: int, *, conn: Optional[DatabaseConnection] = None) -> None:
+
+        await self._executor(conn).execute(
+            "INSERT INTO guild_config (guild_id) VALUES ($1) "
+            "ON CONFLICT (guild_id) DO NOTHING",
+            guild_id
+        )
+
+################################################################################
+    async def insert_many(
+        self,
+        guild_ids: Iterable[int],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).executemany(
+            "INSERT INTO guild_config (guild_id) VALUES ($1) "
+            "ON CONFLICT (guild_id) DO NOTHING",
+            [(guild_id, ) for guild_id in guild_ids]
+        )
+
+################################################################################
+    async def update(
+        self,
+        guild_id: int,
+        post_channels: List[int],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE guild_config SET post_channels = $1 WHERE guild_id = $2",
+            _array(post_channels), guild_id
+        )
+
+################################################################################
+class ProfileRepository(Repository):
+
+    async def fetch_all(self, *, conn: Optional[DatabaseConnection] = None) -> List[Record]:
+
+        return await self._executor(conn).fetch("SELECT * FROM profile_master")
+
+################################################################################
+    async def fetch_posted(self, *, conn: Optional[DatabaseConnection] = None) -> List[Record]:
+
+        return await self._executor(conn).fetch(
+            "SELECT * FROM profile_master WHERE post_url IS NOT NULL"
+        )
+
+################################################################################
+    async def fetch_one(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[Record]:
+
+        return await self._executor(conn).fetchrow(
+            "SELECT * FROM profile_master WHERE guild_id = $1 AND user_id = $2",
+            guild_id, user_id
+        )
+
+################################################################################
+    async def fetch_by_id(
+        self,
+        profile_id: str,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[Record]:
+
+        return await self._executor(conn).fetchrow(
+            "SELECT * FROM profile_master WHERE profile_id = $1",
+            profile_id
+        )
+
+################################################################################
+    async def exists(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> bool:
+
+        record = await self._executor(conn).fetchrow(
+            "SELECT profile_id FROM profiles WHERE guild_id = $1 AND user_id = $2",
+            guild_id, user_id
+        )
+
+        return record is not None
+
+################################################################################
+    async def fetch_id(
+        self,
+        guild_id: int,
+        user_id: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[str]:
+        """The ID of the user's profile in the guild, if they have one."""
+
+        return await self._executor(conn).fetchval(
+            "SELECT profile_id FROM profiles WHERE guild_id = $1 AND user_id = $2",
+            guild_id, user_id
+        )
+
+################################################################################
+    async def owners(self, *, conn: Optional[DatabaseConnection] = None) -> Set[Tuple[int, int]]:
+        """Every ``(guild_id, user_id)`` pair that already has a profile."""
+
+        records = await self._executor(conn).fetch("SELECT guild_id, user_id FROM profiles")
+        return {(record[0], record[1]) for record in records}
+
+################################################################################
+    async def create(
+        self,
+        profile_id: str,
+        guild_id: int,
+        user_id: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> bool:
+        """Creates the profile and its four section rows atomically, unless the
+        user already has a profile in the guild. Returns whether it was created.
+
+        On Postgres this is a single statement (and so a single round trip)."""
+
+        if self._db.dialect != "sqlite":
+            created = await self._executor(conn).fetchval(
+                _CREATE_PROFILE, profile_id, user_id, guild_id
+            )
+            return created is not None
+
+        # SQLite can't modify data from inside a CTE, but it runs in-process so
+        # the separate statements don't cost any network round trips.
+        if conn is None:
+            async with self._db.transaction() as conn:
+                return await self.create(profile_id, guild_id, user_id, conn=conn)
+
+        created = await conn.execute(
+            "INSERT INTO profiles (profile_id, user_id, guild_id) VALUES ($1, $2, $3) "
+            "ON CONFLICT (guild_id, user_id) DO NOTHING",
+            profile_id, user_id, guild_id
+        )
+        if not created:
+            return False
+
+        for table in _SECTION_TABLES:
+            await conn.execute(f"INSERT INTO {table} (profile_id) VALUES ($1)", profile_id)
+
+        return True
+
+################################################################################
+    async def insert_many(
+        self,
+        rows: Iterable[Tuple[str, int, int]],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> int:
+        """Bulk-creates ``(profile_id, guild_id, user_id)`` profiles with ``COPY``
+        (or multi-row ``VALUES``). Existing owners are not checked; run it inside
+        a transaction so a failure leaves no half-created profiles behind."""
+
+        rows = list(rows)
+        if conn is None:
+            async with self._db.transaction() as conn:
+                return await self.insert_many(rows, conn=conn)
+
+        await conn.copy_records(
+            "profiles",
+            ("profile_id", "user_id", "guild_id"),
+            [(profile_id, user_id, guild_id) for profile_id, guild_id, user_id in rows]
+        )
+        for table in _SECTION_TABLES:
+            await conn.copy_records(table, ("profile_id", ), [(row[0], ) for row in rows])
+
+        return len(rows)
+
+################################################################################
+    async def fetch_empty(
+        self,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> List[Tuple[str, int, int]]:
+        """``(profile_id, guild_id, user_id)`` of profiles that have never been
+        filled in: every section column is NULL and there are no additional
+        images."""
+
+        records = await self._executor(conn).fetch(_EMPTY_PROFILES)
+        return [(record[0], record[1], record[2]) for record in records]
+
+################################################################################
+    async def delete_many(
+        self,
+        profile_ids: Iterable[str],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> int:
+        """Deletes the given profiles and their section rows. Returns the number
+        of profiles removed."""
+
+        profile_ids = list(profile_ids)
+        if conn is None:
+            async with self._db.transaction() as conn:
+                return await self.delete_many(profile_ids, conn=conn)
+
+        deleted = 0
+        step = conn.MAX_PARAMETERS
+        for start in range(0, len(profile_ids), step):
+            chunk = profile_ids[start:start + step]
+            placeholders = ", ".join(f"${i + 1}" for i in range(len(chunk)))
+
+            for table in _SECTION_TABLES:
+                await conn.execute(
+                    f"DELETE FROM {table} WHERE profile_id IN ({placeholders})", *chunk
+                )
+            deleted += await conn.execute(
+                f"DELETE FROM profiles WHERE profile_id IN ({placeholders})", *chunk
+            )
+
+        return deleted
+
+################################################################################
+class DetailsRepository(Repository):
+
+    async def update(
+        self,
+        profile_id: str,
+        *,
+        char_name: Optional[str],
+        url: Optional[str],
+        color: Optional[int],
+        jobs: List[str],
+        rates: Optional[str],
+        post_url: Optional[str],
+        post_hash: Optional[str],
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE details SET char_name = $1, url = $2, color = $3, jobs = $4, "
+            "rates = $5, post_url = $6, post_hash = $7 WHERE profile_id = $8",
+            char_name, url, color, _array(jobs), rates, post_url, post_hash, profile_id
+        )
+
+################################################################################
+    async def update_post(
+        self,
+        profile_id: str,
+        post_url: Optional[str],
+        post_hash: Optional[str],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE details SET post_url = $2, post_hash = $3 WHERE profile_id = $1",
+            profile_id, post_url, post_hash
+        )
+
+################################################################################
+class PersonalityRepository(Repository):
+
+    async def update(
+        self,
+        profile_id: str,
+        *,
+        likes: List[str],
+        dislikes: List[str],
+        personality: Optional[str],
+        aboutme: Optional[str],
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE personality SET likes = $1, dislikes = $2, personality = $3, "
+            "aboutme = $4 WHERE profile_id = $5",
+            _array(likes), _array(dislikes), personality, aboutme,
+            profile_id
+        )
+
+################################################################################
+class AtAGlanceRepository(Repository):
+
+    async def update(
+        self,
+        profile_id: str,
+        *,
+        gender: Optional[str],
+        pronouns: Optional[List[int]],
+        race: Optional[str],
+        clan: Optional[str],
+        orientation: Optional[str],
+        height: Optional[str],
+        age: Optional[str],
+        mare: Optional[str],
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE ataglance SET gender = $1, pronouns = $2, race = $3, clan = $4, "
+            "orientation = $5, height = $6, age = $7, mare = $8 WHERE profile_id = $9",
+            gender, _array(pronouns), race, clan,
+            orientation, height, age, mare, profile_id
+        )
+
+################################################################################
+class ImagesRepository(Repository):
+
+    async def update(
+        self,
+        profile_id: str,
+        *,
+        thumbnail: Optional[str],
+        main_image: Optional[str],
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE images SET thumbnail = $1, main_image = $2 WHERE profile_id = $3",
+            thumbnail, main_image, profile_id
+        )
+
+################################################################################
+class AdditionalImagesRepository(Repository):
+
+    async def fetch_all(self, *, conn: Optional[DatabaseConnection] = None) -> List[Record]:
+
+        return await self._executor(conn).fetch("SELECT * FROM addl_images")
+
+################################################################################
+    async def fetch_for_profile(
+        self,
+        profile_id: str,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> List[Record]:
+
+        return await self._executor(conn).fetch(
+            "SELECT * FROM addl_images WHERE profile_id = $1",
+            profile_id
+        )
+
+################################################################################
+    async def insert(
+        self,
+        profile_id: str,
+        image_id: str,
+        url: str,
+        caption: Optional[str],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "INSERT INTO addl_images (profile_id, image_id, url, caption) "
+            "VALUES ($1, $2, $3, $4)",
+            profile_id, image_id, url, caption
+        )
+
+################################################################################
+    async def update(
+        self,
+        image_id: str,
+        *,
+        caption: Optional[str],
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "UPDATE addl_images SET caption = $1 WHERE image_id = $2",
+            caption, image_id
+        )
+
+################################################################################
+    async def delete(self, image_id: str, *, conn: Optional[DatabaseConnection] = None) -> None:
+
+        await self._executor(conn).execute(
+            "DELETE FROM addl_images WHERE image_id = $1",
+            image_id
+        )
+
+################################################################################
+class ImageStoreRepository(Repository):
+
+    async def fetch_url(
+        self,
+        sha256: str,
+        variant: str,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[str]:
+
+        return await self._executor(conn).fetchval(
+            "SELECT url FROM image_store WHERE sha256 = $1 AND variant = $2",
+            sha256, variant
+        )
+
+################################################################################
+    async def insert(
+        self,
+        sha256: str,
+        variant: str,
+        url: str,
+        size: int,
+        *,
+        channel_id: Optional[int] = None,
+        message_id: Optional[int] = None,
+        attachment_id: Optional[int] = None,
+        expires_at: Optional[int] = None,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+
+        await self._executor(conn).execute(
+            "INSERT INTO image_store (sha256, variant, url, size_bytes, "
+            "channel_id, message_id, attachment_id, expires_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8) "
+            "ON CONFLICT (sha256, variant) DO NOTHING",
+            sha256, variant, url, size, channel_id, message_id, attachment_id, expires_at
+        )
+
+################################################################################
+    async def fetch_message(
+        self,
+        attachment_id: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> Optional[Record]:
+        """The (channel_id, message_id) an attachment was posted in, if known."""
+
+        return await self._executor(conn).fetchrow(
+            "SELECT channel_id, message_id FROM image_store "
+            "WHERE attachment_id = $1 AND message_id IS NOT NULL",
+            attachment_id
+        )
+
+################################################################################
+    async def fetch_unexpired(
+        self,
+        now: int,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> List[Record]:
+        """(attachment_id, url, expires_at) for every attachment whose stored
+        URL is still valid at ``now``."""
+
+        return await self._executor(conn).fetch(
+            "SELECT attachment_id, url, expires_at FROM image_store "
+            "WHERE attachment_id IS NOT NULL AND expires_at > $1",
+            now
+        )
+
+################################################################################
+    async def update_attachment_urls(
+        self,
+        refreshed: List[Tuple[int, str, Optional[int]]],
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+        """Records refreshed (attachment_id, url, expires_at) signed URLs."""
+
+        await self._executor(conn).executemany(
+            "UPDATE image_store SET url = $2, expires_at = $3 WHERE attachment_id = $1",
+            refreshed
+        )
+
+################################################################################
+    async def fetch_all(self, *, conn: Optional[DatabaseConnection] = None) -> List[Record]:
+
+        return await self._executor(conn).fetch("SELECT sha256, variant, url FROM image_store")
+
+################################################################################
+    async def referenced_urls(self, *, conn: Optional[DatabaseConnection] = None) -> List[str]:
+        """Every distinct image URL in use, whether by a profile or the image
+        store itself."""
+
+        records = await self._executor(conn).fetch(
+            "SELECT thumbnail FROM images WHERE thumbnail IS NOT NULL "
+            "UNION SELECT main_image FROM images WHERE main_image IS NOT NULL "
+            "UNION SELECT url FROM addl_images WHERE url IS NOT NULL "
+            "UNION SELECT url FROM image_store"
+        )
+        return [r[0] for r in records]
+
+################################################################################
+    async def rewrite_url(
+        self,
+        old_url: str,
+        new_url: str,
+        *,
+        conn: Optional[DatabaseConnection] = None
+    ) -> None:
+        """Points everything that references ``old_url`` at ``new_url``."""
+
+        executor = self._executor(conn)
+        for statement in (
+            "UPDATE images SET thumbnail = $2 WHERE thumbnail = $1",
+            "UPDATE images SET main_image = $2 WHERE main_image = $1",
+            "UPDATE addl_images SET url = $2 WHERE url = $1",
+            "UPDATE image_store SET url = $2 WHERE url = $1",
+        ):
+            await executor.execute(statement, old_url, new_url)
+
+################################################################################
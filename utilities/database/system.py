@@ -1,13 +1,15 @@
 import os
-import psycopg2
 
 from discord    import Guild
 from dotenv     import load_dotenv
 from typing     import List
+
+from .core  import Database
 ################################################################################
 
 __all__ = (
-    "db_connection",
+    "database",
+    "connect_database",
     "assert_db_structure",
     "new_guild_entry",
     "assert_guild_records"
@@ -17,154 +19,209 @@ __all__ = (
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_SSL = os.getenv("DATABASE_SSL", "require")
+DATABASE_POOL_MIN = int(os.getenv("DATABASE_POOL_MIN", 1))
+DATABASE_POOL_MAX = int(os.getenv("DATABASE_POOL_MAX", 10))
+DATABASE_FLUSH_INTERVAL = float(os.getenv("DATABASE_FLUSH_INTERVAL", 2.0))
+DATABASE_FLUSH_BATCH = int(os.getenv("DATABASE_FLUSH_BATCH", 100))
+DATABASE_SLOW_QUERY_MS = float(os.getenv("DATABASE_SLOW_QUERY_MS", 100))
 
-db_connection = psycopg2.connect(DATABASE_URL, sslmode="require")
-print("Database connection initialized...")
+database = Database()
 
 ################################################################################
-def assert_db_structure() -> None:
-
-    c = db_connection.cursor()
-
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS guild_config("
-        "guild_id BIGINT UNIQUE NOT NULL,"
-        "post_channels TEXT,"
-        "CONSTRAINT guild_config_pkey PRIMARY KEY (guild_id))"
-    )
-
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS profiles("
-        "profile_id TEXT UNIQUE NOT NULL,"
-        "user_id BIGINT NOT NULL,"
-        "guild_id BIGINT,"
-        "CONSTRAINT profile_pkey PRIMARY KEY (profile_id))"
-    )
-
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS details("
-        "profile_id TEXT UNIQUE NOT NULL,"
-        "char_name TEXT,"
-        "url TEXT,"
-        "color INTEGER,"
-        "jobs TEXT,"
-        "rates TEXT,"
-        "post_url TEXT,"
-        "CONSTRAINT details_pkey PRIMARY KEY (profile_id))"
+async def connect_database() -> None:
+
+    await database.connect(
+        DATABASE_URL,
+        min_size=DATABASE_POOL_MIN,
+        max_size=DATABASE_POOL_MAX,
+        ssl=DATABASE_SSL,
+        flush_interval=DATABASE_FLUSH_INTERVAL,
+        flush_batch=DATABASE_FLUSH_BATCH,
+        slow_query_threshold=DATABASE_SLOW_QUERY_MS / 1000
     )
 
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS personality("
-        "profile_id TEXT UNIQUE NOT NULL,"
-        "likes TEXT,"
-        "dislikes TEXT,"
-        "personality TEXT,"
-        "aboutme TEXT,"
-        "CONSTRAINT personality_pkey PRIMARY KEY (profile_id))"
+################################################################################
+async def assert_db_structure() -> None:
+
+    # Imported here so the module can also be run on its own.
+    from .migrations import (
+        DETAILS_POST_COLUMNS,
+        IMAGE_STORE_ATTACHMENT_COLUMNS,
+        add_missing_columns,
+        migrate_image_store_key,
+        migrate_list_columns,
+        migrate_unique_owner
     )
 
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS ataglance("
-        "profile_id TEXT UNIQUE NOT NULL,"
-        "gender TEXT,"
-        "pronouns TEXT,"
-        "race TEXT,"
-        "clan TEXT,"
-        "orientation TEXT,"
-        "height TEXT,"
-        "age TEXT,"
-        "mare TEXT,"
-        "CONSTRAINT ataglance_pkey PRIMARY KEY (profile_id))"
-    )
+    async with database.transaction() as conn:
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS guild_config("
+            "guild_id BIGINT UNIQUE NOT NULL,"
+            "post_channels BIGINT[],"
+            "CONSTRAINT guild_config_pkey PRIMARY KEY (guild_id))"
+        )
 
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS images("
-        "profile_id TEXT UNIQUE NOT NULL,"
-        "thumbnail TEXT,"
-        "main_image TEXT,"
-        "CONSTRAINT images_pkey PRIMARY KEY (profile_id))"
-    )
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles("
+            "profile_id TEXT UNIQUE NOT NULL,"
+            "user_id BIGINT NOT NULL,"
+            "guild_id BIGINT,"
+            "CONSTRAINT profile_pkey PRIMARY KEY (profile_id))"
+        )
 
-    c.execute(
-        "CREATE TABLE IF NOT EXISTS addl_images("
-        "profile_id TEXT,"
-        "image_id TEXT UNIQUE NOT NULL,"
-        "url TEXT,"
-        "caption TEXT,"
-        "CONSTRAINT addl_images_pkey PRIMARY KEY (image_id))"
-    )
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS details("
+            "profile_id TEXT UNIQUE NOT NULL,"
+            "char_name TEXT,"
+            "url TEXT,"
+            "color INTEGER,"
+            "jobs TEXT[],"
+            "rates TEXT,"
+            "post_url TEXT,"
+            "post_hash TEXT,"
+            "CONSTRAINT details_pkey PRIMARY KEY (profile_id))"
+        )
 
-    c.execute(
-        "CREATE OR REPLACE VIEW profile_master "
-        "AS "
-        # Data indices 0 - 2 Internal
-        "SELECT p.profile_id,"
-        "p.user_id,"
-        "p.guild_id,"
-        # Data indices 3 - 8 Details
-        "d.char_name,"
-        "d.url AS custom_url,"
-        "d.color,"
-        "d.jobs,"
-        "d.rates,"
-        "d.post_url,"
-        # Data indices 9 - 12 Personality
-        "pr.likes,"
-        "pr.dislikes,"
-        "pr.personality,"
-        "pr.aboutme,"
-        # Data indices 13 - 20 At A Glance
-        "a.gender,"
-        "a.pronouns,"
-        "a.race,"
-        "a.clan,"
-        "a.orientation,"
-        "a.height,"
-        "a.age,"
-        "a.mare,"
-        # Data indices 21 - 22 Images
-        "i.thumbnail,"
-        "i.main_image "
-        "FROM profiles p "
-        "JOIN details d ON p.profile_id = d.profile_id "
-        "JOIN personality pr ON p.profile_id = pr.profile_id "
-        "JOIN ataglance a on p.profile_id = a.profile_id "
-        "JOIN images i on p.profile_id = i.profile_id;"
-    )
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS personality("
+            "profile_id TEXT UNIQUE NOT NULL,"
+            "likes TEXT[],"
+            "dislikes TEXT[],"
+            "personality TEXT,"
+            "aboutme TEXT,"
+            "CONSTRAINT personality_pkey PRIMARY KEY (profile_id))"
+        )
 
-    db_connection.commit()
-    c.close()
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS ataglance("
+            "profile_id TEXT UNIQUE NOT NULL,"
+            "gender TEXT,"
+            "pronouns INTEGER[],"
+            "race TEXT,"
+            "clan TEXT,"
+            "orientation TEXT,"
+            "height TEXT,"
+            "age TEXT,"
+            "mare TEXT,"
+            "CONSTRAINT ataglance_pkey PRIMARY KEY (profile_id))"
+        )
 
-    return
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS images("
+            "profile_id TEXT UNIQUE NOT NULL,"
+            "thumbnail TEXT,"
+            "main_image TEXT,"
+            "CONSTRAINT images_pkey PRIMARY KEY (profile_id))"
+        )
 
-################################################################################
-def assert_guild_records(guilds: List[Guild]) -> None:
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS addl_images("
+            "profile_id TEXT,"
+            "image_id TEXT UNIQUE NOT NULL,"
+            "url TEXT,"
+            "caption TEXT,"
+            "CONSTRAINT addl_images_pkey PRIMARY KEY (image_id))"
+        )
 
-    c = db_connection.cursor()
+        # Every image stored by the bot, keyed by the SHA-256 of the uploaded
+        # content and the variant (eg. "thumbnail") it was normalized into.
+        # Images stored in Discord also keep the message/attachment they live
+        # in and when their signed URL expires (unix time).
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS image_store("
+            "sha256 TEXT NOT NULL,"
+            "variant TEXT NOT NULL,"
+            "url TEXT NOT NULL,"
+            "size_bytes BIGINT,"
+            "channel_id BIGINT,"
+            "message_id BIGINT,"
+            "attachment_id BIGINT,"
+            "expires_at BIGINT,"
+            "CONSTRAINT image_store_pkey PRIMARY KEY (sha256, variant))"
+        )
 
-    for guild in guilds:
-        c.execute(
-            "INSERT INTO guild_config (guild_id, post_channels) VALUES (%s, %s) "
-            "ON CONFLICT (guild_id) DO NOTHING",
-            (guild.id, [])
+    # Databases created before the list columns were arrays, before image_store
+    # was keyed by variant or tracked attachments, before posts kept a hash
+    # of their content, or before a user's profile was unique per guild.
+    await migrate_list_columns()
+    await migrate_image_store_key()
+    await add_missing_columns("image_store", IMAGE_STORE_ATTACHMENT_COLUMNS)
+    await add_missing_columns("details", DETAILS_POST_COLUMNS)
+    await migrate_unique_owner()
+
+    async with database.transaction() as conn:
+        # Lookups for lazily loaded profiles, and one profile per user per guild.
+        await conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS profiles_owner_idx ON profiles (guild_id, user_id)"
+        )
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS addl_images_profile_idx ON addl_images (profile_id)"
+        )
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS image_store_attachment_idx ON image_store (attachment_id)"
         )
 
-    db_connection.commit()
-    c.close()
+        # SQLite has no CREATE OR REPLACE VIEW.
+        if database.dialect == "sqlite":
+            await conn.execute("DROP VIEW IF EXISTS profile_master")
+            view_statement = "CREATE VIEW profile_master "
+        else:
+            view_statement = "CREATE OR REPLACE VIEW profile_master "
+
+        await conn.execute(
+            view_statement +
+            "AS "
+            # Data indices 0 - 2 Internal
+            "SELECT p.profile_id,"
+            "p.user_id,"
+            "p.guild_id,"
+            # Data indices 3 - 8 Details
+            "d.char_name,"
+            "d.url AS custom_url,"
+            "d.color,"
+            "d.jobs,"
+            "d.rates,"
+            "d.post_url,"
+            # Data indices 9 - 12 Personality
+            "pr.likes,"
+            "pr.dislikes,"
+            "pr.personality,"
+            "pr.aboutme,"
+            # Data indices 13 - 20 At A Glance
+            "a.gender,"
+            "a.pronouns,"
+            "a.race,"
+            "a.clan,"
+            "a.orientation,"
+            "a.height,"
+            "a.age,"
+            "a.mare,"
+            # Data indices 21 - 22 Images
+            "i.thumbnail,"
+            "i.main_image,"
+            # Data index 23 Details (added later, so it goes last)
+            "d.post_hash "
+            "FROM profiles p "
+            "JOIN details d ON p.profile_id = d.profile_id "
+            "JOIN personality pr ON p.profile_id = pr.profile_id "
+            "JOIN ataglance a on p.profile_id = a.profile_id "
+            "JOIN images i on p.profile_id = i.profile_id;"
+        )
 
     return
 
 ################################################################################
-def new_guild_entry(guild_id: int) -> None:
+async def assert_guild_records(guilds: List[Guild]) -> None:
 
-    c = db_connection.cursor()
-    c.execute(
-        "INSERT INTO guild_config (guild_id, post_channels) VALUES (%s, %s)",
-        (guild_id, [])
-    )
+    await database.guild_config.insert_many([guild.id for guild in guilds])
+
+    return
+
+################################################################################
+async def new_guild_entry(guild_id: int) -> None:
 
-    db_connection.commit()
-    c.close()
+    await database.guild_config.insert(guild_id)
 
     return
 
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from typing     import TYPE_CHECKING, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from utilities.metrics  import metrics, tracer
+
+from .instrument    import current_query_scope
+
+if TYPE_CHECKING:
+    from .core  import Database
+    from .pool  import DatabaseConnection
+################################################################################
+
+__all__ = ("WriteBehindQueue", )
+
+log = logging.getLogger(__name__)
+
+# A write may return a callback to run once its transaction has committed.
+PendingWrite = Callable[["DatabaseConnection"], Awaitable[Optional[Callable[[], None]]]]
+
+QUEUE_DEPTH = metrics.gauge(
+    "frogbot_db_write_queue_depth",
+    "Number of dirty rows waiting to be flushed."
+)
+WRITES_MARKED = metrics.counter(
+    "frogbot_db_writes_marked_total",
+    "Number of times a row was marked dirty."
+)
+WRITES_COALESCED = metrics.counter(
+    "frogbot_db_writes_coalesced_total",
+    "Number of dirty marks absorbed by an already-pending write to the same row."
+)
+ROWS_FLUSHED = metrics.counter(
+    "frogbot_db_rows_flushed_total",
+    "Number of row writes applied by the write-behind queue."
+)
+FLUSH_FAILURES = metrics.counter(
+    "frogbot_db_flush_failures_total",
+    "Number of row writes dropped after repeatedly failing on their own."
+)
+FLUSH_LATENCY = metrics.histogram(
+    "frogbot_db_flush_seconds",
+    "Time taken to apply one batch of coalesced writes."
+)
+
+################################################################################
+class WriteBehindQueue:
+    """Coalesces row writes and applies them in batches off the hot path.
+
+    Callers mark a row dirty with a key (eg. ``("details", profile_id)``) and a
+    coroutine function that writes the row's *current* state. Marking an
+    already-dirty key just replaces the pending writer, so a burst of setter
+    calls on one section collapses into a single UPDATE.
+
+    Dirty rows are flushed in one transaction every ``interval`` seconds, as
+    soon as ``max_batch`` rows are pending, or on :meth:`close`. Writes are
+    applied in the order their keys were first marked. A writer may return a
+    callback, which runs only after the write has been committed.
+    """
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, database: Database, *, interval: float = 2.0, max_batch: int = 100):
+
+        self.database: Database = database
+        self.interval: float = interval
+        self.max_batch: int = max_batch
+
+        self._dirty: Dict[Hashable, PendingWrite] = {}
+        self._attempts: Dict[Hashable, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+        QUEUE_DEPTH.set_function(lambda: len(self._dirty))
+
+################################################################################
+    @property
+    def depth(self) -> int:
+
+        return len(self._dirty)
+
+################################################################################
+    def start(self) -> None:
+
+        if self._task is not None:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run(), name="frogbot-db-write-behind")
+
+################################################################################
+    def mark_dirty(self, key: Hashable, write: PendingWrite) -> None:
+
+        if self._task is None:
+            raise RuntimeError("WriteBehindQueue.mark_dirty() called before start().")
+
+        WRITES_MARKED.inc()
+        if key in self._dirty:
+            WRITES_COALESCED.inc()
+
+        scope = current_query_scope()
+        if scope is not None:
+            scope.deferred_writes += 1
+
+        # The write itself happens later, outside the interaction's trace.
+        now = time.perf_counter()
+        tracer.add_span("deferred write", "db", now, now, key=repr(key))
+
+        self._dirty[key] = write
+
+        if len(self._dirty) >= self.max_batch:
+            self._wakeup.set()
+
+################################################################################
+    async def write_now(self, write: PendingWrite) -> None:
+        """Applies ``write`` in a transaction of its own straight away, rather
+        than with the next flush. Never during a flush, so it can't race a
+        pending write to the same rows."""
+
+        if self._lock is None:
+            raise RuntimeError("WriteBehindQueue.write_now() called before start().")
+
+        async with self._lock:
+            async with self.database.transaction() as conn:
+                callback = await write(conn)
+
+            if callback is not None:
+                callback()
+
+################################################################################
+    def is_dirty(self, key: Hashable) -> bool:
+
+        return key in self._dirty
+
+################################################################################
+    async def flush(self) -> None:
+        """Applies every write pending at the time of the call.
+
+        Rows that fail on their own are put back for the next flush and only
+        dropped after ``MAX_ATTEMPTS`` consecutive failures."""
+
+        if self._lock is None:
+            return
+
+        async with self._lock:
+            if not self._dirty:
+                return
+
+            batch, self._dirty = self._dirty, {}
+            failed = await self._apply(batch)
+
+            for key in batch:
+                if key not in failed:
+                    self._attempts.pop(key, None)
+
+            for key, write in failed.items():
+                attempts = self._attempts.get(key, 0) + 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    FLUSH_FAILURES.inc()
+                    self._attempts.pop(key, None)
+                    log.error("Dropping write for %r after %d failed attempts.", key, attempts)
+                else:
+                    self._attempts[key] = attempts
+                    # A newer mark for the same row supersedes the failed one.
+                    self._dirty.setdefault(key, write)
+
+################################################################################
+    async def close(self) -> None:
+
+        if self._task is None:
+            return
+
+        # Never cancel the loop mid-flush; that batch would be rolled back and lost.
+        async with self._lock:
+            self._task.cancel()
+
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        for _ in range(self.MAX_ATTEMPTS):
+            if not self._dirty:
+                break
+            await self.flush()
+
+        self._task = None
+
+################################################################################
+    async def _run(self) -> None:
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("Write-behind flush failed.")
+
+################################################################################
+    async def _apply(self, batch: Dict[Hashable, PendingWrite]) -> Dict[Hashable, PendingWrite]:
+
+        start = time.perf_counter()
+        failed: Dict[Hashable, PendingWrite] = {}
+        committed: List[Callable[[], None]] = []
+
+        try:
+            async with self.database.transaction() as conn:
+                callbacks = [await write(conn) for write in batch.values()]
+        except Exception:
+            # One bad row shouldn't hold the rest of the batch hostage, so fall
+            # back to writing each row in its own transaction.
+            log.warning("Batched flush of %d rows failed; retrying individually.", len(batch))
+            for key, write in batch.items():
+                try:
+                    async with self.database.transaction() as conn:
+                        callback = await write(conn)
+                except Exception:
+                    log.exception("Write for %r failed.", key)
+                    failed[key] = write
+                else:
+                    if callback is not None:
+                        committed.append(callback)
+        else:
+            committed.extend(c for c in callbacks if c is not None)
+
+        for callback in committed:
+            callback()
+
+        ROWS_FLUSHED.inc(len(batch) - len(failed))
+        FLUSH_LATENCY.observe(time.perf_counter() - start)
+
+        return failed
+
+################################################################################
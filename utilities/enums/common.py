@@ -1,4 +1,4 @@
-from enum       import Enum
+from enum       import Enum, IntEnum
 from typing     import List
 
 from discord    import SelectOption
@@ -6,6 +6,7 @@ from discord    import SelectOption
 
 __all__ = (
     "SectionType",
+    "OutboundPriority",
 )
 
 ################################################################################
@@ -46,3 +47,11 @@ class SectionType(FrogEnum):
         return self.name
 
 ################################################################################
+class OutboundPriority(IntEnum):
+    """Order in which queued Discord requests are sent; lower goes first."""
+
+    Interactive = 0
+    Background = 1
+    Refresh = 2
+
+################################################################################
@@ -6,6 +6,8 @@ from .common    import ErrorMessage
 __all__ = (
     "HeightInputError",
     "TooManyImages",
+    "ImageUploadFailed",
+    "ImageTooLarge",
     "CharNameNotSet",
     "NoPostChannelsConfigured"
 )
@@ -77,6 +79,62 @@ class TooManyImages(ErrorMessage):
             solution="Sorry, I can't add any more because of formatting restrictions. :("
         )
 
+####################################################################################################
+class ImageUploadFailed(ErrorMessage):
+    """An error message for when an uploaded image couldn't be stored, even
+    after retrying.
+
+    Overview:
+    ---------
+    Title:
+        "Image Upload Failed"
+
+    Description:
+        ""
+
+    Message:
+        "Your image couldn't be saved. It's not you, it's me."
+
+    Solution:
+        "Give it a minute and try the `/profiles add_image` command again."
+
+    """
+
+    def __init__(self):
+        super().__init__(
+            title="Image Upload Failed",
+            message="Your image couldn't be saved. It's not you, it's me.",
+            solution="Give it a minute and try the `/profiles add_image` command again."
+        )
+
+####################################################################################################
+class ImageTooLarge(ErrorMessage):
+    """An error message for when an uploaded image is bigger than the bot
+    will store.
+
+    Overview:
+    ---------
+    Title:
+        "Image Too Large"
+
+    Description:
+        ""
+
+    Message:
+        "Your image is bigger than the {limit} MB I can store."
+
+    Solution:
+        "Shrink or compress the image and try the `/profiles add_image` command again."
+
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            title="Image Too Large",
+            message=f"Your image is bigger than the {max_bytes // (1024 * 1024)} MB I can store.",
+            solution="Shrink or compress the image and try the `/profiles add_image` command again."
+        )
+
 ####################################################################################################
 class CharNameNotSet(ErrorMessage):
     """An error message for when a user attempts to post their profile without having
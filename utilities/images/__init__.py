@@ -0,0 +1,5 @@
+from .expiry    import *
+from .ingest    import *
+from .normalize import *
+from .storage   import *
+################################################################################
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+
+from discord        import Client, HTTPException
+from discord.http   import Route
+from typing         import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse   import parse_qs, urlsplit
+
+from utilities.database import database
+from utilities.enums    import OutboundPriority
+from utilities.metrics  import metrics
+from utilities.utils    import LRUCache, RateLimiter, channel_route, outbound
+################################################################################
+
+__all__ = (
+    "AttachmentURL",
+    "AttachmentURLRefresher",
+    "attachment_urls",
+    "parse_attachment_url",
+)
+
+log = logging.getLogger(__name__)
+
+URLS_REFRESHED = metrics.counter(
+    "frogbot_attachment_urls_refreshed_total",
+    "Discord attachment URLs submitted for refreshing, by outcome.",
+    ("result", )
+)
+REFRESH_LATENCY = metrics.histogram(
+    "frogbot_attachment_refresh_seconds",
+    "Time taken to refresh one batch of Discord attachment URLs."
+)
+
+_CDN_HOSTS = ("cdn.discordapp.com", "media.discordapp.net")
+
+################################################################################
+class AttachmentURL(NamedTuple):
+
+    channel_id: int
+    attachment_id: int
+    # Unix time the signature runs out, or None for unsigned (legacy) URLs.
+    expires_at: Optional[int]
+
+################################################################################
+def parse_attachment_url(url: Optional[str]) -> Optional[AttachmentURL]:
+    """Picks apart a Discord CDN attachment URL, ie.
+    ``https://cdn.discordapp.com/attachments/<channel>/<attachment>/<name>?ex=<hex expiry>&...``.
+    Returns ``None`` for anything else."""
+
+    if not url:
+        return None
+
+    parts = urlsplit(url)
+    segments = parts.path.split("/")
+    if (
+        parts.hostname not in _CDN_HOSTS
+        or len(segments) < 5
+        or segments[1] != "attachments"
+        or not segments[2].isdigit()
+        or not segments[3].isdigit()
+    ):
+        return None
+
+    try:
+        expires_at = int(parse_qs(parts.query)["ex"][0], 16)
+    except (KeyError, ValueError):
+        expires_at = None
+
+    return AttachmentURL(int(segments[2]), int(segments[3]), expires_at)
+
+################################################################################
+class AttachmentURLRefresher:
+    """Keeps the Discord attachment URLs profiles use from expiring.
+
+    Discord signs attachment URLs with an expiry time. Refreshed copies are
+    kept in a cache keyed by attachment, which :meth:`resolve` consults, so
+    stored URLs never need rewriting. :meth:`ensure_fresh` refreshes any URLs
+    within ``margin`` seconds of expiring before they're rendered, and once
+    :meth:`start`-ed a background sweep does the same for every image the bot
+    references each ``sweep_interval`` seconds.
+
+    Refreshes go to Discord in batches of up to ``BATCH_SIZE`` URLs, paced to
+    ``rate`` requests per second; concurrent requests for one attachment share
+    a refresh. A batch whose request fails is sent again (after any rate limit
+    pause) up to ``MAX_ATTEMPTS`` times. URLs Discord won't refresh are re-read
+    from the message they were posted in, if the image store knows it.
+    """
+
+    BATCH_SIZE = 50
+    MAX_ATTEMPTS = 3
+    # How long to let refresh requests pile up before sending a batch.
+    BATCH_WINDOW = 0.05
+
+    def __init__(
+        self,
+        *,
+        margin: float = 6 * 3600,
+        sweep_interval: float = 3600,
+        rate: float = 1.0,
+        cache_size: int = 20000
+    ):
+
+        self.margin: float = margin
+        self.sweep_interval: float = sweep_interval
+        self.limiter: RateLimiter = RateLimiter(rate)
+        # attachment_id -> (url, expires_at)
+        self.cache: LRUCache[int, Tuple[str, int]] = LRUCache("attachment_urls", cache_size)
+
+        self._client: Optional[Client] = None
+        self._queue: List[Tuple[int, str]] = []
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._attempts: Dict[int, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+        self.refreshed: int = 0
+        self.failed: int = 0
+        self.requests: int = 0
+
+################################################################################
+    def start(self, client: Client) -> None:
+        """Starts refreshing URLs through ``client``, including the periodic sweep."""
+
+        self._client = client
+
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [
+                asyncio.create_task(self._run(), name="frogbot-attachment-refresh"),
+                asyncio.create_task(self._sweep_forever(), name="frogbot-attachment-sweep"),
+            ]
+
+################################################################################
+    def resolve(self, url: Optional[str]) -> Optional[str]:
+        """Returns the freshest known copy of ``url``."""
+
+        ref = parse_attachment_url(url)
+        if ref is None:
+            return url
+
+        cached = self.cache.get(ref.attachment_id)
+        if cached is not None and cached[1] > (ref.expires_at or 0):
+            return cached[0]
+
+        return url
+
+################################################################################
+    def needs_refresh(self, url: Optional[str], now: Optional[float] = None) -> bool:
+
+        ref = parse_attachment_url(url)
+        if ref is None:
+            return False
+
+        expires_at = ref.expires_at or 0
+        cached = self.cache.peek(ref.attachment_id)
+        if cached is not None:
+            expires_at = max(expires_at, cached[1])
+
+        return expires_at - (now or time.time()) < self.margin
+
+################################################################################
+    async def ensure_fresh(self, urls: Iterable[Optional[str]]) -> int:
+        """Refreshes whichever of ``urls`` are close to expiring and waits for
+        them. Returns how many were refreshed."""
+
+        if self._client is None:
+            return 0
+
+        now = time.time()
+        # The same attachment may turn up under several of its signed URLs.
+        stale: Dict[int, str] = {}
+        for url in urls:
+            if self.needs_refresh(url, now):
+                stale.setdefault(parse_attachment_url(url).attachment_id, url)
+
+        if not stale:
+            return 0
+
+        return sum(await asyncio.gather(*[self._submit(a, url) for a, url in stale.items()]))
+
+################################################################################
+    def _submit(self, attachment_id: int, url: str) -> asyncio.Future:
+
+        future = self._pending.get(attachment_id)
+        if future is None:
+            future = self._pending[attachment_id] = asyncio.get_running_loop().create_future()
+            self._queue.append((attachment_id, url))
+            self._wakeup.set()
+
+        return asyncio.shield(future)
+
+################################################################################
+    async def _run(self) -> None:
+
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.BATCH_WINDOW)
+            self._wakeup.clear()
+
+            while self._queue:
+                batch = self._queue[:self.BATCH_SIZE]
+                del self._queue[:self.BATCH_SIZE]
+
+                try:
+                    refreshed = await self._refresh(batch)
+                except Exception:
+                    log.exception("Failed to refresh %d attachment URLs.", len(batch))
+                    refreshed = {}
+
+                if refreshed is None:
+                    # Back to the front of the queue; the limiter holds it for
+                    # any Retry-After.
+                    retry: List[Tuple[int, str]] = []
+                    for item in batch:
+                        attempts = self._attempts.get(item[0], 0) + 1
+                        if attempts < self.MAX_ATTEMPTS:
+                            self._attempts[item[0]] = attempts
+                            retry.append(item)
+                    self._queue[:0] = retry
+                    batch = [item for item in batch if item not in retry]
+                    refreshed = {}
+
+                    self.failed += len(batch)
+                    URLS_REFRESHED.inc(len(batch), result="failed")
+
+                for attachment_id, _ in batch:
+                    self._attempts.pop(attachment_id, None)
+                    future = self._pending.pop(attachment_id)
+                    if not future.done():
+                        future.set_result(attachment_id in refreshed)
+
+################################################################################
+    async def _refresh(self, batch: List[Tuple[int, str]]) -> Optional[Dict[int, Tuple[str, int]]]:
+        """Refreshes ``batch``, returning the new URL and expiry of each
+        attachment refreshed, or ``None`` if the request itself failed."""
+
+        await self.limiter.acquire()
+
+        start = time.perf_counter()
+        refreshed: Dict[int, Tuple[str, int]] = {}
+        try:
+            response = await outbound.submit(
+                "attachments:refresh-urls",
+                lambda: self._client.http.request(
+                    Route("POST", "/attachments/refresh-urls"),
+                    json={"attachment_urls": [url for _, url in batch]}
+                ),
+                priority=OutboundPriority.Refresh
+            )
+        except HTTPException as exc:
+            if exc.status == 429:
+                self.limiter.pause(float(exc.response.headers.get("Retry-After", 1.0)))
+            log.warning("Attachment URL refresh failed: %s", exc)
+            # Re-reading every message instead would only add more requests.
+            return None
+        finally:
+            self.requests += 1
+            REFRESH_LATENCY.observe(time.perf_counter() - start)
+
+        for item in response.get("refreshed_urls", []):
+            ref = parse_attachment_url(item.get("refreshed"))
+            if ref is not None and ref.expires_at is not None:
+                refreshed[ref.attachment_id] = (item["refreshed"], ref.expires_at)
+
+        # Fall back to re-reading the message for anything Discord didn't refresh.
+        for attachment_id, _ in batch:
+            if attachment_id not in refreshed:
+                fresh = await self._refetch(attachment_id)
+                if fresh is not None:
+                    refreshed[attachment_id] = fresh
+
+        for attachment_id, entry in refreshed.items():
+            self.cache.put(attachment_id, entry)
+        if refreshed:
+            await database.image_store.update_attachment_urls(
+                [(attachment_id, url, expires_at) for attachment_id, (url, expires_at) in refreshed.items()]
+            )
+
+        self.refreshed += len(refreshed)
+        self.failed += len(batch) - len(refreshed)
+        URLS_REFRESHED.inc(len(refreshed), result="refreshed")
+        URLS_REFRESHED.inc(len(batch) - len(refreshed), result="failed")
+
+        return refreshed
+
+################################################################################
+    async def _refetch(self, attachment_id: int) -> Optional[Tuple[str, int]]:
+
+        location = await database.image_store.fetch_message(attachment_id)
+        if location is None:
+            return None
+
+        await self.limiter.acquire()
+        try:
+            message = await outbound.submit(
+                channel_route(location[0]),
+                lambda: self._client.http.get_message(location[0], location[1]),
+                priority=OutboundPriority.Refresh
+            )
+        except HTTPException as exc:
+            log.warning("Couldn't re-read attachment %d: %s", attachment_id, exc)
+            return None
+        finally:
+            self.requests += 1
+
+        for attachment in message.get("attachments", []):
+            if int(attachment["id"]) == attachment_id:
+                ref = parse_attachment_url(attachment["url"])
+                if ref is not None and ref.expires_at is not None:
+                    return attachment["url"], ref.expires_at
+
+        return None
+
+################################################################################
+    async def sweep(self) -> int:
+        """Refreshes every referenced attachment URL that's close to expiring.
+        Returns how many were refreshed."""
+
+        return await self.ensure_fresh(await database.image_store.referenced_urls())
+
+################################################################################
+    async def _sweep_forever(self) -> None:
+
+        # URLs refreshed before a restart are still good.
+        for attachment_id, url, expires_at in await database.image_store.fetch_unexpired(int(time.time())):
+            self.cache.put(attachment_id, (url, expires_at))
+
+        while True:
+            start = time.perf_counter()
+            try:
+                refreshed = await self.sweep()
+            except Exception:
+                log.exception("Attachment URL sweep failed.")
+            else:
+                if refreshed:
+                    log.info(
+                        "Refreshed %d attachment URLs in %.2fs.",
+                        refreshed, time.perf_counter() - start
+                    )
+
+            await asyncio.sleep(self.sweep_interval)
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, int]:
+
+        return {
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "requests": self.requests,
+            "cached": len(self.cache),
+            "queued": len(self._queue),
+        }
+
+################################################################################
+    async def close(self) -> None:
+
+        for task in self._tasks:
+            task.cancel()
+        for future in self._pending.values():
+            future.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue.clear()
+        self._pending.clear()
+
+################################################################################
+
+attachment_urls = AttachmentURLRefresher(
+    margin=float(os.getenv("ATTACHMENT_REFRESH_MARGIN", 6 * 3600)),
+    sweep_interval=float(os.getenv("ATTACHMENT_SWEEP_INTERVAL", 3600)),
+    rate=float(os.getenv("ATTACHMENT_REFRESH_RATE", 1.0))
+)
+
+################################################################################
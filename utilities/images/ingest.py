@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+from aiohttp    import ClientSession
+from typing     import (
+    BinaryIO,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple
+)
+
+from utilities.database import database
+from utilities.enums    import SectionType
+from utilities.metrics  import metrics
+
+from .expiry    import parse_attachment_url
+from .normalize import _EXTENSIONS, ImageNormalizer, InvalidImageError, sniff_image_type
+from .storage   import ImageStorage
+################################################################################
+
+__all__ = (
+    "ImageTooLargeError",
+    "IngestedImage",
+    "ImageIngestor",
+)
+
+log = logging.getLogger(__name__)
+
+IMAGES_INGESTED = metrics.counter(
+    "frogbot_images_ingested_total",
+    "Images ingested, by whether they were uploaded or matched an existing copy.",
+    ("result", )
+)
+BYTES_UPLOADED = metrics.counter(
+    "frogbot_image_bytes_uploaded_total",
+    "Bytes of image content uploaded to storage."
+)
+BYTES_SAVED = metrics.counter(
+    "frogbot_image_bytes_saved_total",
+    "Bytes of incoming images that weren't processed or uploaded because an "
+    "identical image was already stored."
+)
+DOWNLOAD_LATENCY = metrics.histogram(
+    "frogbot_image_download_seconds",
+    "Time taken to stream and hash an incoming attachment."
+)
+UPLOAD_LATENCY = metrics.histogram(
+    "frogbot_image_upload_seconds",
+    "Time taken to upload a new image to storage."
+)
+
+################################################################################
+class ImageTooLargeError(ValueError):
+    """Raised when an uploaded image is bigger than the ingestor accepts."""
+
+    def __init__(self, max_bytes: int):
+
+        super().__init__(f"Image exceeds the {max_bytes} byte limit.")
+        self.max_bytes: int = max_bytes
+
+################################################################################
+class IngestedImage(NamedTuple):
+
+    url: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+################################################################################
+class ImageIngestor:
+    """Streams incoming images into storage, storing each distinct image once.
+
+    Attachments are downloaded in ``CHUNK_SIZE`` pieces and hashed (SHA-256) as
+    they arrive, spilling to a temporary file past ``SPOOL_SIZE`` rather than
+    being held in memory. If an image with the same hash has been stored
+    before, its URL is returned without uploading anything; concurrent
+    ingestions of the same image share one upload.
+
+    Content is validated by its magic bytes. Given a ``normalizer``, images for
+    a profile section are downscaled/transcoded for that section before being
+    uploaded, and deduplicated per section.
+
+    New images are put into ``storage`` under ``<variant>/<sha256>.<ext>``.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    SPOOL_SIZE = 2 * 1024 * 1024
+
+    def __init__(
+        self,
+        *,
+        storage: ImageStorage,
+        normalizer: Optional[ImageNormalizer] = None,
+        max_bytes: int = 25 * 1024 * 1024
+    ):
+
+        self.storage: ImageStorage = storage
+        self.normalizer: Optional[ImageNormalizer] = normalizer
+        self.max_bytes: int = max_bytes
+
+        self._session: Optional[ClientSession] = None
+        self._uploads: Dict[Tuple[str, str], asyncio.Task] = {}
+
+        self.uploaded: int = 0
+        self.deduplicated: int = 0
+        self.bytes_uploaded: int = 0
+        self.bytes_saved: int = 0
+
+################################################################################
+    async def ingest(
+        self,
+        url: str,
+        filename: str,
+        section: Optional[SectionType] = None
+    ) -> IngestedImage:
+        """Downloads the image at ``url`` and returns where it's stored.
+
+        Raises :class:`InvalidImageError` if it isn't an image we accept, or
+        :class:`ImageTooLargeError` if it's over ``max_bytes``."""
+
+        variant = self.normalizer.variant(section) if self.normalizer else "original"
+
+        spool = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_SIZE)
+        try:
+            sha256, size = await self._download(url, spool)
+
+            spool.seek(0)
+            content_type = sniff_image_type(spool.read(12))
+            if content_type is None:
+                raise InvalidImageError("Unrecognized image format.")
+
+            key = (sha256, variant)
+            stored_url = await database.image_store.fetch_url(sha256, variant)
+            if stored_url is None and key not in self._uploads:
+                spool.seek(0)
+                task = self._uploads[key] = asyncio.create_task(
+                    self._store(spool, filename, content_type, section, sha256, variant)
+                )
+                task.add_done_callback(lambda _: self._uploads.pop(key, None))
+                # _store() closes the file once it's uploaded.
+                spool = None
+
+                return IngestedImage(await asyncio.shield(task), sha256, size, False)
+
+            if stored_url is None:
+                # Someone else is uploading the same image right now.
+                stored_url = await asyncio.shield(self._uploads[key])
+        finally:
+            if spool is not None:
+                spool.close()
+
+        self.deduplicated += 1
+        self.bytes_saved += size
+        IMAGES_INGESTED.inc(result="deduplicated")
+        BYTES_SAVED.inc(size)
+        log.info("Reused stored image %s; saved uploading %d bytes.", sha256[:12], size)
+
+        return IngestedImage(stored_url, sha256, size, True)
+
+################################################################################
+    async def _download(self, url: str, spool: BinaryIO) -> Tuple[str, int]:
+
+        if self._session is None:
+            self._session = ClientSession()
+
+        start = time.perf_counter()
+        digest = hashlib.sha256()
+        size = 0
+
+        async with self._session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ImageTooLargeError(self.max_bytes)
+                digest.update(chunk)
+                spool.write(chunk)
+
+        DOWNLOAD_LATENCY.observe(time.perf_counter() - start)
+
+        return digest.hexdigest(), size
+
+################################################################################
+    async def _store(
+        self,
+        spool: BinaryIO,
+        filename: str,
+        content_type: str,
+        section: Optional[SectionType],
+        sha256: str,
+        variant: str
+    ) -> str:
+
+        try:
+            if variant != "original":
+                normalized = await self.normalizer.normalize(spool.read(), section)
+                spool.close()
+                spool = io.BytesIO(normalized.data)
+                content_type = normalized.content_type
+
+            size = spool.seek(0, io.SEEK_END)
+            spool.seek(0)
+
+            extension = _EXTENSIONS[content_type]
+            key = f"{variant}/{sha256}.{extension}"
+            filename = f"{os.path.splitext(filename)[0]}.{extension}"
+
+            start = time.perf_counter()
+            stored = await self.storage.put(spool, key, filename=filename, content_type=content_type)
+            elapsed = time.perf_counter() - start
+        finally:
+            spool.close()
+
+        url = stored.url
+        attachment = parse_attachment_url(url)
+        await database.image_store.insert(
+            sha256, variant, url, size,
+            channel_id=stored.channel_id,
+            message_id=stored.message_id,
+            attachment_id=stored.attachment_id,
+            expires_at=attachment.expires_at if attachment is not None else None
+        )
+
+        self.uploaded += 1
+        self.bytes_uploaded += size
+        IMAGES_INGESTED.inc(result="uploaded")
+        BYTES_UPLOADED.inc(size)
+        UPLOAD_LATENCY.observe(elapsed)
+        log.info("Stored image %s (%d bytes) in %.2fs.", sha256[:12], size, elapsed)
+
+        return url
+
+################################################################################
+    async def close(self) -> None:
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        await self.storage.close()
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, int]:
+
+        return {
+            "uploaded": self.uploaded,
+            "deduplicated": self.deduplicated,
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+################################################################################
@@ -0,0 +1,167 @@
+"""Moves stored images into another storage backend.
+
+Every image in use is copied across and everything using it is repointed.
+
+Run it while the bot is stopped (loaded profiles would otherwise write the old
+URLs back), with the target backend configured as it is for the bot:
+
+    IMAGE_STORAGE_PATH=... IMAGE_STORAGE_URL=... python -m utilities.images.migrate --to local
+    S3_ENDPOINT=... S3_BUCKET=... python -m utilities.images.migrate --to s3 --concurrency 8
+
+Images already in the target are skipped, so an interrupted run can simply be
+restarted. Old URLs keep working until their source is cleaned up.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from aiohttp        import ClientSession
+from typing         import Dict, List, NamedTuple, Tuple
+from urllib.parse   import urlsplit
+
+from utilities.database import connect_database, database
+
+from .ingest    import ImageIngestor
+from .normalize import _EXTENSIONS, sniff_image_type
+from .storage   import ImageStorage, open_image_storage
+################################################################################
+
+__all__ = (
+    "MigrationResult",
+    "migrate_images",
+)
+
+log = logging.getLogger(__name__)
+
+################################################################################
+class MigrationResult(NamedTuple):
+
+    migrated: int
+    skipped: int
+    failed: List[str]
+    bytes_copied: int
+
+################################################################################
+async def _copy(
+    session: ClientSession,
+    target: ImageStorage,
+    url: str,
+    stored: Dict[str, Tuple[str, str]]
+) -> Tuple[str, int]:
+
+    with tempfile.SpooledTemporaryFile(max_size=ImageIngestor.SPOOL_SIZE) as spool:
+        digest = hashlib.sha256()
+        async with session.get(url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(ImageIngestor.CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+
+        size = spool.tell()
+        spool.seek(0)
+        content_type = sniff_image_type(spool.read(12))
+        if content_type is None:
+            raise ValueError("Not an image we recognize.")
+        spool.seek(0)
+
+        # Keep the image store's key for images it knows about, so they stay
+        # deduplicated against future uploads.
+        sha256, variant = stored.get(url, (digest.hexdigest(), "original"))
+        extension = _EXTENSIONS[content_type]
+        filename = f"{os.path.splitext(os.path.basename(urlsplit(url).path))[0] or sha256}.{extension}"
+
+        result = await target.put(
+            spool, f"{variant}/{sha256}.{extension}", filename=filename, content_type=content_type
+        )
+        new_url = result.url
+
+    async with database.transaction() as conn:
+        await database.image_store.rewrite_url(url, new_url, conn=conn)
+        if url not in stored:
+            await database.image_store.insert(sha256, variant, new_url, size, conn=conn)
+
+    return new_url, size
+
+################################################################################
+async def migrate_images(
+    target: ImageStorage,
+    *,
+    concurrency: int = 4,
+    dry_run: bool = False
+) -> MigrationResult:
+    """Copies every image URL referenced by a profile or the image store that
+    doesn't already live in ``target`` into it, ``concurrency`` at a time, and
+    rewrites the references. Images that can't be fetched are left alone and
+    reported in the result."""
+
+    urls = await database.image_store.referenced_urls()
+    pending = [url for url in urls if not target.owns(url)]
+    stored = {r[2]: (r[0], r[1]) for r in await database.image_store.fetch_all()}
+
+    if dry_run:
+        return MigrationResult(len(pending), len(urls) - len(pending), [], 0)
+
+    slots = asyncio.Semaphore(concurrency)
+    failed: List[str] = []
+    copied = 0
+
+    async with ClientSession() as session:
+
+        async def migrate_one(url: str) -> None:
+            nonlocal copied
+            async with slots:
+                try:
+                    new_url, size = await _copy(session, target, url, stored)
+                except Exception as exc:
+                    log.warning("Couldn't migrate %s: %s", url, exc)
+                    failed.append(url)
+                else:
+                    copied += size
+                    log.info("Migrated %s -> %s", url, new_url)
+
+        await asyncio.gather(*[migrate_one(url) for url in pending])
+
+    return MigrationResult(len(pending) - len(failed), len(urls) - len(pending), failed, copied)
+
+################################################################################
+async def _main(args: argparse.Namespace) -> None:
+
+    target = open_image_storage(args.to)
+
+    await connect_database()
+    start = time.perf_counter()
+    try:
+        result = await migrate_images(target, concurrency=args.concurrency, dry_run=args.dry_run)
+    finally:
+        await target.close()
+        await database.close()
+
+    verb = "Would migrate" if args.dry_run else "Migrated"
+    print(
+        f"{verb} {result.migrated:,} image(s) ({result.bytes_copied / 1e6:,.1f} MB) "
+        f"in {time.perf_counter() - start:.1f}s; {result.skipped:,} already in {args.to}."
+    )
+    if result.failed:
+        print(f"{len(result.failed):,} failed:")
+        for url in result.failed:
+            print(f"    {url}")
+
+################################################################################
+if __name__ == "__main__":
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--to", choices=("local", "s3"), required=True)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dry-run", action="store_true")
+
+    asyncio.run(_main(parser.parse_args()))
+
+################################################################################
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import time
+
+from concurrent.futures         import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing                     import Dict, NamedTuple, Optional, Tuple
+
+from utilities.enums    import SectionType
+from utilities.metrics  import metrics
+################################################################################
+
+__all__ = (
+    "InvalidImageError",
+    "NormalizedImage",
+    "ImageNormalizer",
+    "sniff_image_type",
+)
+
+log = logging.getLogger(__name__)
+
+NORMALIZE_LATENCY = metrics.histogram(
+    "frogbot_image_normalize_seconds",
+    "Time taken to validate, downscale and transcode one image, including queueing."
+)
+BYTES_TRIMMED = metrics.counter(
+    "frogbot_image_bytes_trimmed_total",
+    "Bytes removed from uploaded images by downscaling and transcoding."
+)
+
+# (offset, signature, content type), checked in order.
+_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+)
+
+_EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+################################################################################
+class InvalidImageError(ValueError):
+    """Raised when uploaded content isn't an image type we accept."""
+
+################################################################################
+class NormalizedImage(NamedTuple):
+
+    data: bytes
+    content_type: str
+
+    @property
+    def extension(self) -> str:
+
+        return _EXTENSIONS[self.content_type]
+
+################################################################################
+def sniff_image_type(header: bytes) -> Optional[str]:
+    """Returns the content type indicated by an image's leading bytes (at
+    least 12 are needed), ignoring whatever the uploader claimed it was."""
+
+    if header[:4] == b"RIFF" and header[8:12] != b"WEBP":
+        return None
+
+    for offset, signature, content_type in _SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return content_type
+
+    return None
+
+################################################################################
+def _normalize(data: bytes, max_dimension: int, quality: int) -> Tuple[bytes, Optional[str]]:
+    """Runs in a worker process. Downscales a still image to fit within
+    ``max_dimension`` and re-encodes it as WebP if that makes it smaller.
+    Animations are left untouched. Returns the content type of the new data,
+    or ``None`` if the original should be kept."""
+
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # (Multi-picture JPEGs from phones also report several frames.)
+        if image.format in ("GIF", "PNG", "WEBP") and getattr(image, "is_animated", False):
+            return data, None
+
+        # Phone photos are often stored sideways with an EXIF rotation.
+        image = ImageOps.exif_transpose(image)
+        resized = max(image.size) > max_dimension
+        if resized:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+
+        out = io.BytesIO()
+        image.save(out, format="WEBP", quality=quality, method=4)
+
+    encoded = out.getvalue()
+    if not resized and len(encoded) >= len(data):
+        return data, None
+
+    return encoded, "image/webp"
+
+################################################################################
+class ImageNormalizer:
+    """Validates uploaded images and shrinks them to the size they're shown at.
+
+    Content is checked by its magic bytes rather than the declared type.
+    Still images larger than their section's entry in ``MAX_DIMENSIONS`` are
+    downscaled, and re-encoded as WebP whenever that makes them smaller. The
+    CPU-heavy part runs in a pool of ``workers`` processes so it never blocks
+    the event loop.
+
+    ``Pillow`` is only needed in the worker processes; without it images are
+    still validated but otherwise stored as uploaded.
+    """
+
+    MAX_DIMENSIONS: Dict[SectionType, int] = {
+        # Shown at 80px; leave headroom for high-DPI screens.
+        SectionType.Thumbnail: 320,
+        SectionType.MainImage: 1600,
+        SectionType.AdditionalImages: 1600,
+    }
+
+    def __init__(self, *, workers: Optional[int] = None, quality: int = 85):
+
+        self.workers: int = workers or min(os.cpu_count() or 1, 4)
+        self.quality: int = quality
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._available: Optional[bool] = None
+
+################################################################################
+    @property
+    def available(self) -> bool:
+        """Whether images can be resized/transcoded (ie. Pillow is installed)."""
+
+        if self._available is None:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                log.warning("Pillow is not installed; images will be stored as uploaded.")
+                self._available = False
+            else:
+                self._available = True
+
+        return self._available
+
+################################################################################
+    def variant(self, section: Optional[SectionType]) -> str:
+        """The name images normalized for ``section`` are stored under, or
+        ``"original"`` if they're stored as uploaded."""
+
+        if section not in self.MAX_DIMENSIONS or not self.available:
+            return "original"
+
+        return section.name.lower()
+
+################################################################################
+    async def normalize(self, data: bytes, section: Optional[SectionType] = None) -> NormalizedImage:
+        """Validates ``data`` and returns the version of it that should be stored.
+
+        Raises :class:`InvalidImageError` if it isn't a PNG, JPEG, GIF or WebP."""
+
+        content_type = sniff_image_type(data[:12])
+        if content_type is None:
+            raise InvalidImageError("Unrecognized image format.")
+
+        max_dimension = self.MAX_DIMENSIONS.get(section)
+        if max_dimension is None or not self.available:
+            return NormalizedImage(data, content_type)
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        pool = self._pool
+
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            encoded, new_type = await loop.run_in_executor(
+                pool, _normalize, data, max_dimension, self.quality
+            )
+        except BrokenProcessPool:
+            # A worker died (eg. out of memory), which breaks the whole pool for
+            # good; replace it on the next call. Other calls that were using it
+            # may have done so already.
+            if self._pool is pool:
+                self.close()
+            raise
+        except Exception as exc:
+            # Pillow rejects truncated and corrupt files the magic bytes can't catch.
+            raise InvalidImageError(str(exc)) from exc
+        finally:
+            NORMALIZE_LATENCY.observe(time.perf_counter() - start)
+
+        if new_type is None:
+            return NormalizedImage(data, content_type)
+
+        BYTES_TRIMMED.inc(len(data) - len(encoded))
+
+        return NormalizedImage(encoded, new_type)
+
+################################################################################
+    def close(self) -> None:
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+################################################################################
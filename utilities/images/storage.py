@@ -0,0 +1,664 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import hashlib
+import hmac
+import io
+import logging
+import os
+import tempfile
+import time
+
+from aiohttp        import ClientSession
+from discord        import Client, File, HTTPException, Message, TextChannel, Webhook
+from typing         import BinaryIO, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+from urllib.parse   import quote, urlsplit
+from xml.etree      import ElementTree
+from yarl           import URL
+
+from utilities.enums    import OutboundPriority
+from utilities.metrics  import metrics
+from utilities.utils    import RateLimiter, outbound
+################################################################################
+
+__all__ = (
+    "StoredObject",
+    "ImageStorage",
+    "DumpTarget",
+    "ChannelDumpTarget",
+    "WebhookDumpTarget",
+    "DiscordChannelStorage",
+    "LocalFileStorage",
+    "S3Storage",
+    "S3Error",
+    "open_image_storage",
+)
+
+log = logging.getLogger(__name__)
+
+DUMP_LATENCY = metrics.histogram(
+    "frogbot_image_dump_seconds",
+    "Time taken to post one image to a Discord dump channel or webhook.",
+    ("target", )
+)
+DUMP_IN_FLIGHT = metrics.gauge(
+    "frogbot_image_dump_in_flight",
+    "Image uploads currently in progress, per dump channel or webhook.",
+    ("target", )
+)
+DUMP_RATE_LIMITED = metrics.counter(
+    "frogbot_image_dump_rate_limited_total",
+    "Image uploads that were rate limited by Discord, per dump channel or webhook.",
+    ("target", )
+)
+S3_PARTS_UPLOADED = metrics.counter(
+    "frogbot_s3_parts_uploaded_total",
+    "Parts uploaded to S3-compatible storage as part of multipart uploads."
+)
+
+# The channel every image was dumped into before storage was configurable.
+DEFAULT_DUMP_CHANNEL = 991902526188302427
+
+################################################################################
+class StoredObject(NamedTuple):
+    """Where an image was stored. Images stored in Discord also record the
+    message and attachment they live in, so their URL can be refreshed."""
+
+    url: str
+    channel_id: Optional[int] = None
+    message_id: Optional[int] = None
+    attachment_id: Optional[int] = None
+
+################################################################################
+class ImageStorage:
+    """Somewhere stored images live.
+
+    Images are stored under a ``key`` derived from their content (eg.
+    ``thumbnail/<sha256>.webp``) so that backends which can choose their own
+    paths store each one exactly once.
+    """
+
+    name: str = "abstract"
+
+    async def put(self, fp: BinaryIO, key: str, *, filename: str, content_type: str) -> StoredObject:
+        """Stores the contents of ``fp`` and returns where they're served from."""
+
+        raise NotImplementedError
+
+################################################################################
+    def owns(self, url: str) -> bool:
+        """Whether ``url`` already points into this storage."""
+
+        return False
+
+################################################################################
+    async def close(self) -> None:
+
+        return
+
+################################################################################
+class DumpTarget:
+    """A channel or webhook images can be dumped into.
+
+    Each target has its own token bucket, matching the limit Discord puts on
+    posting to a single channel, and keeps the stats the pool uses to pick
+    the least loaded target.
+    """
+
+    __slots__ = (
+        "label",
+        "limiter",
+        "queued",
+        "in_flight",
+        "uploads",
+        "rate_limited",
+        "total_seconds",
+        "latency"
+    )
+
+    # Weight of the newest sample in the moving average latency.
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self, label: str, *, rate: float = 1.0, burst: int = 5):
+
+        self.label: str = label
+        self.limiter: RateLimiter = RateLimiter(rate, burst)
+
+        self.queued: int = 0
+        self.in_flight: int = 0
+        self.uploads: int = 0
+        self.rate_limited: int = 0
+        self.total_seconds: float = 0.0
+        # None until the first upload, so new targets get tried first.
+        self.latency: Optional[float] = None
+
+        DUMP_IN_FLIGHT.set_function(lambda: self.in_flight, target=label)
+
+################################################################################
+    async def send(self, fp: BinaryIO, filename: str) -> StoredObject:
+        """Posts the file and returns the attachment it became."""
+
+        raise NotImplementedError
+
+################################################################################
+    def load(self) -> Tuple[float, int, float]:
+        """Sort key for picking a target: shortest wait for the rate limit
+        (behind any uploads already waiting), then fewest uploads in flight,
+        then lowest recent latency."""
+
+        wait = self.limiter.delay() + self.queued / self.limiter.rate
+        return wait, self.in_flight, self.latency or 0.0
+
+################################################################################
+    def observe(self, seconds: float) -> None:
+
+        self.uploads += 1
+        self.total_seconds += seconds
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.LATENCY_SMOOTHING * (seconds - self.latency)
+
+        DUMP_LATENCY.observe(seconds, target=self.label)
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, float]:
+
+        return {
+            "uploads": self.uploads,
+            "in_flight": self.in_flight,
+            "rate_limited": self.rate_limited,
+            "mean_seconds": self.total_seconds / self.uploads if self.uploads else 0.0,
+            "recent_seconds": self.latency or 0.0,
+        }
+
+################################################################################
+class ChannelDumpTarget(DumpTarget):
+
+    __slots__ = (
+        "client",
+        "channel_id",
+        "_channel"
+    )
+
+    def __init__(self, client: Client, channel_id: int, **kwargs):
+
+        super().__init__(f"channel:{channel_id}", **kwargs)
+
+        self.client: Client = client
+        self.channel_id: int = channel_id
+
+        self._channel: Optional[TextChannel] = None
+
+################################################################################
+    async def channel(self) -> TextChannel:
+
+        if self._channel is None:
+            self._channel = (
+                self.client.get_channel(self.channel_id)
+                or await self.client.fetch_channel(self.channel_id)
+            )
+
+        return self._channel
+
+################################################################################
+    async def send(self, fp: BinaryIO, filename: str) -> StoredObject:
+
+        channel = await self.channel()
+        # The pool handles 429s itself, by moving on to another target.
+        post = await outbound.submit(
+            self.label,
+            lambda: channel.send(file=File(fp, filename=filename)),
+            priority=OutboundPriority.Interactive,
+            attempts=1
+        )
+        return _stored_attachment(post)
+
+################################################################################
+class WebhookDumpTarget(DumpTarget):
+
+    __slots__ = (
+        "url",
+        "_webhook"
+    )
+
+    def __init__(self, url: str, **kwargs):
+
+        # Label by the webhook's ID only; the rest of the URL is its token.
+        super().__init__(f"webhook:{urlsplit(url).path.split('/')[-2]}", **kwargs)
+
+        self.url: str = url
+        self._webhook: Optional[Webhook] = None
+
+################################################################################
+    async def send(self, fp: BinaryIO, filename: str) -> StoredObject:
+
+        if self._webhook is None:
+            self._webhook = Webhook.from_url(self.url, session=ClientSession())
+
+        post = await outbound.submit(
+            self.label,
+            lambda: self._webhook.send(file=File(fp, filename=filename), wait=True),
+            priority=OutboundPriority.Interactive,
+            attempts=1
+        )
+        return _stored_attachment(post)
+
+################################################################################
+    async def close(self) -> None:
+
+        if self._webhook is not None:
+            await self._webhook.session.close()
+            self._webhook = None
+
+################################################################################
+class DiscordChannelStorage(ImageStorage):
+    """Stores images as attachments to messages posted to a pool of Discord
+    channels and/or webhooks.
+
+    Each upload goes to whichever target could post soonest without hitting
+    its rate limit, then has the fewest uploads in flight, then has answered
+    fastest recently, so throughput grows with the size of the pool. An
+    upload that's rate limited anyway backs that target off and is retried
+    on another, up to ``MAX_ATTEMPTS`` times.
+    """
+
+    name = "discord"
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, targets: Sequence[DumpTarget]):
+
+        if not targets:
+            raise ValueError("Discord image storage needs at least one channel or webhook.")
+
+        self.targets: List[DumpTarget] = list(targets)
+        # Attachment URLs include the channel they were posted in.
+        self._channel_ids: Set[int] = {
+            t.channel_id for t in self.targets if isinstance(t, ChannelDumpTarget)
+        }
+
+################################################################################
+    async def resolve(self) -> None:
+        """Fetches every dump channel up front, so a bad ID fails at startup
+        rather than on the first upload."""
+
+        for target in self.targets:
+            if isinstance(target, ChannelDumpTarget):
+                await target.channel()
+
+################################################################################
+    async def put(self, fp: BinaryIO, key: str, *, filename: str, content_type: str) -> StoredObject:
+
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            target = min(self.targets, key=DumpTarget.load)
+            # Counted before waiting, so concurrent uploads spread out.
+            target.in_flight += 1
+            target.queued += 1
+            try:
+                try:
+                    await target.limiter.acquire()
+                finally:
+                    target.queued -= 1
+                fp.seek(0)
+                start = time.perf_counter()
+                stored = await target.send(fp, filename)
+            except HTTPException as exc:
+                if exc.status != 429 or attempt == self.MAX_ATTEMPTS:
+                    raise
+
+                retry_after = float(exc.response.headers.get("Retry-After", 1.0))
+                log.info("Image dump %s rate limited; pausing it %.2fs.", target.label, retry_after)
+                target.limiter.pause(retry_after)
+                target.rate_limited += 1
+                DUMP_RATE_LIMITED.inc(target=target.label)
+                continue
+            finally:
+                target.in_flight -= 1
+
+            target.observe(time.perf_counter() - start)
+            self._channel_ids.add(stored.channel_id)
+
+            return stored
+
+################################################################################
+    def owns(self, url: str) -> bool:
+
+        parts = urlsplit(url).path.split("/")
+        return (
+            len(parts) > 2
+            and parts[1] == "attachments"
+            and parts[2].isdigit()
+            and int(parts[2]) in self._channel_ids
+        )
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, Dict[str, float]]:
+
+        return {t.label: t.stats for t in self.targets}
+
+################################################################################
+    async def close(self) -> None:
+
+        for target in self.targets:
+            if isinstance(target, WebhookDumpTarget):
+                await target.close()
+
+################################################################################
+class LocalFileStorage(ImageStorage):
+    """Stores images as files under ``root``, which something else (eg. nginx)
+    serves at ``base_url``."""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+
+        self.root: str = os.path.abspath(root)
+        self.base_url: str = base_url.rstrip("/")
+
+################################################################################
+    async def put(self, fp: BinaryIO, key: str, *, filename: str, content_type: str) -> StoredObject:
+
+        await asyncio.get_running_loop().run_in_executor(None, self._write, fp, key)
+        return StoredObject(f"{self.base_url}/{key}")
+
+################################################################################
+    def _write(self, fp: BinaryIO, key: str) -> None:
+
+        path = os.path.join(self.root, *key.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write alongside and rename into place so nothing is ever served half-written.
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "wb") as out:
+                while chunk := fp.read(64 * 1024):
+                    out.write(chunk)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+################################################################################
+    def owns(self, url: str) -> bool:
+
+        return url.startswith(f"{self.base_url}/")
+
+################################################################################
+class S3Error(Exception):
+
+    def __init__(self, method: str, key: str, status: int, content: bytes):
+
+        super().__init__(f"{method} {key} failed with HTTP {status}: {content[:200]!r}")
+        self.status: int = status
+
+################################################################################
+class S3Storage(ImageStorage):
+    """Stores images in a bucket on any S3-compatible service (AWS, MinIO,
+    Ceph, R2...), addressed path-style at ``endpoint``.
+
+    Objects larger than ``part_size`` are sent as multipart uploads with up to
+    ``concurrency`` parts in flight (and in memory) at once. Images are served
+    from ``public_url`` if given (eg. a CDN in front of the bucket), otherwise
+    straight from the bucket, which must then allow anonymous reads.
+    """
+
+    name = "s3"
+
+    # S3 rejects parts (other than the last) smaller than this.
+    MIN_PART_SIZE = 5 * 1024 * 1024
+
+    def __init__(
+        self,
+        endpoint: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        *,
+        region: str = "us-east-1",
+        public_url: Optional[str] = None,
+        part_size: int = 8 * 1024 * 1024,
+        concurrency: int = 4
+    ):
+
+        self.endpoint: str = endpoint.rstrip("/")
+        self.bucket: str = bucket
+        self.region: str = region
+        self.public_url: str = (public_url or f"{self.endpoint}/{bucket}").rstrip("/")
+        self.part_size: int = max(part_size, self.MIN_PART_SIZE)
+        self.concurrency: int = concurrency
+
+        self._access_key: str = access_key
+        self._secret_key: str = secret_key
+        self._host: str = urlsplit(self.endpoint).netloc
+        self._session: Optional[ClientSession] = None
+
+################################################################################
+    async def put(self, fp: BinaryIO, key: str, *, filename: str, content_type: str) -> StoredObject:
+
+        size = fp.seek(0, io.SEEK_END)
+        fp.seek(0)
+
+        if size <= self.part_size:
+            await self._request("PUT", key, body=fp.read(), headers={"Content-Type": content_type})
+        else:
+            await self._multipart_upload(fp, key, content_type)
+
+        return StoredObject(f"{self.public_url}/{quote(key, safe='/~')}")
+
+################################################################################
+    async def _multipart_upload(self, fp: BinaryIO, key: str, content_type: str) -> None:
+
+        response = await self._request(
+            "POST", key, query={"uploads": ""}, headers={"Content-Type": content_type}
+        )
+        upload_id = _xml_text(response, "UploadId")
+
+        # Parts are read as a slot frees up, so at most `concurrency` are held at once.
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: List[asyncio.Task] = []
+
+        async def upload_part(number: int, data: bytes) -> Tuple[int, str]:
+            try:
+                headers = await self._request(
+                    "PUT", key, body=data,
+                    query={"partNumber": str(number), "uploadId": upload_id},
+                    return_headers=True
+                )
+            finally:
+                slots.release()
+
+            S3_PARTS_UPLOADED.inc()
+            return number, headers["ETag"]
+
+        try:
+            number = 1
+            while True:
+                await slots.acquire()
+                data = fp.read(self.part_size)
+                if not data:
+                    slots.release()
+                    break
+                tasks.append(asyncio.create_task(upload_part(number, data)))
+                number += 1
+
+            parts = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await self._abort(key, upload_id)
+            raise
+
+        body = "".join(
+            f"<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>"
+            for n, etag in sorted(parts)
+        )
+        await self._request(
+            "POST", key, query={"uploadId": upload_id},
+            body=f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode()
+        )
+
+################################################################################
+    async def _abort(self, key: str, upload_id: str) -> None:
+
+        try:
+            await self._request("DELETE", key, query={"uploadId": upload_id})
+        except Exception:
+            # The bucket's lifecycle rules will have to clean these parts up.
+            log.warning("Failed to abort multipart upload of %s.", key, exc_info=True)
+
+################################################################################
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        *,
+        query: Optional[Dict[str, str]] = None,
+        body: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+        return_headers: bool = False
+    ):
+
+        if self._session is None:
+            self._session = ClientSession()
+
+        path = "/" + quote(f"{self.bucket}/{key}", safe="/~")
+        query_string = "&".join(
+            f"{quote(k, safe='~')}={quote(v, safe='~')}"
+            for k, v in sorted((query or {}).items())
+        )
+
+        headers = dict(headers or {})
+        headers.update(self._sign(method, path, query_string, body))
+
+        url = URL(f"{self.endpoint}{path}" + (f"?{query_string}" if query_string else ""), encoded=True)
+        async with self._session.request(method, url, data=body, headers=headers) as response:
+            content = await response.read()
+            if response.status >= 300:
+                raise S3Error(method, key, response.status, content)
+
+            return response.headers if return_headers else content
+
+################################################################################
+    def _sign(self, method: str, path: str, query_string: str, body: bytes) -> Dict[str, str]:
+        """Returns the AWS Signature Version 4 headers for a request."""
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        payload_hash = hashlib.sha256(body).hexdigest()
+
+        signed = {"host": self._host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+        signed_names = ";".join(signed)
+        canonical = "\n".join((
+            method,
+            path,
+            query_string,
+            "".join(f"{k}:{v}\n" for k, v in signed.items()),
+            signed_names,
+            payload_hash
+        ))
+
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        to_sign = "\n".join((
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical.encode()).hexdigest()
+        ))
+
+        key = f"AWS4{self._secret_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+
+        return {
+            "Host": self._host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date,
+            "Authorization": (
+                f"AWS4-HMAC-SHA256 Credential={self._access_key}/{scope}, "
+                f"SignedHeaders={signed_names}, Signature={signature}"
+            ),
+        }
+
+################################################################################
+    def owns(self, url: str) -> bool:
+
+        return url.startswith(f"{self.public_url}/")
+
+################################################################################
+    async def close(self) -> None:
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+################################################################################
+def _stored_attachment(post: Message) -> StoredObject:
+
+    attachment = post.attachments[0]
+    return StoredObject(attachment.url, post.channel.id, post.id, attachment.id)
+
+################################################################################
+def _xml_text(content: bytes, tag: str) -> str:
+
+    for element in ElementTree.fromstring(content).iter():
+        # Responses are namespaced, eg. {http://s3.amazonaws.com/doc/2006-03-01/}UploadId.
+        if element.tag.rsplit("}", 1)[-1] == tag:
+            return element.text
+
+    raise ValueError(f"No <{tag}> in S3 response.")
+
+################################################################################
+def open_image_storage(kind: str, *, client: Optional[Client] = None) -> ImageStorage:
+    """Creates the storage backend named ``kind`` (``discord``, ``local`` or
+    ``s3``), configured from the environment.
+
+    ``discord`` spreads images across the comma-separated channel IDs in
+    ``IMAGE_DUMP_CHANNEL`` and webhook URLs in ``IMAGE_DUMP_WEBHOOKS``, each
+    allowed ``IMAGE_DUMP_BURST`` posts per ``IMAGE_DUMP_PERIOD`` seconds, and
+    needs a ``client``;
+    ``local`` writes them under ``IMAGE_STORAGE_PATH`` to be served at
+    ``IMAGE_STORAGE_URL``; ``s3`` uploads them to ``S3_BUCKET`` at
+    ``S3_ENDPOINT`` (see :class:`S3Storage` for the rest)."""
+
+    kind = kind.lower()
+
+    if kind == "discord":
+        if client is None:
+            raise ValueError("Discord image storage needs a connected client.")
+        burst = int(os.getenv("IMAGE_DUMP_BURST", 5))
+        limits = {"rate": burst / float(os.getenv("IMAGE_DUMP_PERIOD", 5)), "burst": burst}
+
+        channels = os.getenv("IMAGE_DUMP_CHANNEL", str(DEFAULT_DUMP_CHANNEL))
+        webhooks = os.getenv("IMAGE_DUMP_WEBHOOKS", "")
+        return DiscordChannelStorage(
+            [ChannelDumpTarget(client, int(c), **limits) for c in channels.split(",") if c.strip()]
+            + [WebhookDumpTarget(w.strip(), **limits) for w in webhooks.split(",") if w.strip()]
+        )
+
+    if kind == "local":
+        return LocalFileStorage(
+            os.getenv("IMAGE_STORAGE_PATH", "images"),
+            os.environ["IMAGE_STORAGE_URL"]
+        )
+
+    if kind == "s3":
+        return S3Storage(
+            os.environ["S3_ENDPOINT"],
+            os.environ["S3_BUCKET"],
+            os.environ["S3_ACCESS_KEY"],
+            os.environ["S3_SECRET_KEY"],
+            region=os.getenv("S3_REGION", "us-east-1"),
+            public_url=os.getenv("S3_PUBLIC_URL"),
+            part_size=int(os.getenv("S3_PART_SIZE", 8 * 1024 * 1024)),
+            concurrency=int(os.getenv("S3_UPLOAD_CONCURRENCY", 4))
+        )
+
+    raise ValueError(f"Unknown image storage backend: {kind!r}")
+
+################################################################################
@@ -0,0 +1,7 @@
+from .registry      import *
+from .exposition    import *
+from .instrument    import *
+from .loop          import *
+from .profiler      import *
+from .tracing       import *
+################################################################################
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import math
+
+from aiohttp    import web
+from typing     import List, Optional, Sequence
+
+from .registry  import Counter, Gauge, Histogram, Metric, MetricsRegistry, metrics
+################################################################################
+
+__all__ = (
+    "render_text",
+    "MetricsServer",
+)
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+################################################################################
+def _escape(value: str, quotes: bool = True) -> str:
+
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    # Only label values are quoted.
+    return value.replace("\"", "\\\"") if quotes else value
+
+################################################################################
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+################################################################################
+def _number(value: float) -> str:
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value))
+
+################################################################################
+def _render_metric(metric: Metric) -> List[str]:
+
+    lines = [
+        f"# HELP {metric.name} {_escape(metric.documentation, quotes=False)}",
+        f"# TYPE {metric.name} {metric.type_name}",
+    ]
+
+    if isinstance(metric, (Counter, Gauge)):
+        for values, value in sorted(metric.samples()):
+            lines.append(f"{metric.name}{_labels(metric.labelnames, values)} {_number(value)}")
+
+    elif isinstance(metric, Histogram):
+        for values, series in sorted(metric.samples(), key=lambda s: s[0]):
+            cumulative = 0
+            for upper, count in zip(metric.buckets, series.counts):
+                cumulative += count
+                le = f'le="{_number(upper)}"'
+                lines.append(
+                    f"{metric.name}_bucket{_labels(metric.labelnames, values, le)} {cumulative}"
+                )
+            lines.append(f"{metric.name}_sum{_labels(metric.labelnames, values)} {_number(series.sum)}")
+            lines.append(f"{metric.name}_count{_labels(metric.labelnames, values)} {series.count}")
+
+    return lines
+
+################################################################################
+def render_text(registry: MetricsRegistry = metrics) -> str:
+    """Every metric in ``registry``, in the Prometheus text exposition format."""
+
+    lines: List[str] = []
+    for metric in sorted(registry.collect(), key=lambda m: m.name):
+        lines.extend(_render_metric(metric))
+
+    return "\n".join(lines) + "\n"
+
+################################################################################
+class MetricsServer:
+    """Serves :func:`render_text` at ``/metrics`` for Prometheus to scrape.
+
+    Binds to ``host`` (loopback by default, so it's only reachable from the
+    machine the bot runs on) and ``port``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9108, registry: MetricsRegistry = metrics):
+
+        self.host: str = host
+        self.port: int = port
+        self.registry: MetricsRegistry = registry
+
+        self._runner: Optional[web.AppRunner] = None
+
+################################################################################
+    async def _handle(self, request: web.Request) -> web.Response:
+
+        return web.Response(
+            body=render_text(self.registry).encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE}
+        )
+
+################################################################################
+    async def start(self) -> None:
+
+        if self._runner is not None:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        log.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+################################################################################
+    async def close(self) -> None:
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+################################################################################
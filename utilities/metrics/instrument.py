@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import time
+
+from contextlib import contextmanager
+from typing     import Iterator
+
+from .registry  import metrics
+################################################################################
+
+__all__ = (
+    "track_interaction",
+    "interaction_failed",
+)
+
+INTERACTION_LATENCY = metrics.histogram(
+    "frogbot_interaction_seconds",
+    "Time taken to handle a slash command or view callback, start to finish.",
+    ("kind", "name"),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+INTERACTION_ERRORS = metrics.counter(
+    "frogbot_interaction_errors_total",
+    "Slash commands and view callbacks that raised an error.",
+    ("kind", "name")
+)
+INTERACTIONS_IN_FLIGHT = metrics.gauge(
+    "frogbot_interactions_in_flight",
+    "Slash commands and view callbacks currently being handled.",
+    ("kind", "name")
+)
+
+################################################################################
+@contextmanager
+def track_interaction(kind: str, name: str) -> Iterator[None]:
+    """Times one slash command (``kind="command"``) or view callback
+    (``kind="view"``) and counts it as in flight meanwhile."""
+
+    INTERACTIONS_IN_FLIGHT.inc(kind=kind, name=name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        INTERACTIONS_IN_FLIGHT.dec(kind=kind, name=name)
+        INTERACTION_LATENCY.observe(time.perf_counter() - start, kind=kind, name=name)
+
+################################################################################
+def interaction_failed(kind: str, name: str) -> None:
+
+    INTERACTION_ERRORS.inc(kind=kind, name=name)
+
+################################################################################
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+from collections    import Counter as _Tally
+from types          import FrameType
+from typing         import List, Optional
+
+from .registry  import metrics
+################################################################################
+
+__all__ = (
+    "LoopMonitor",
+)
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG = metrics.histogram(
+    "frogbot_event_loop_lag_seconds",
+    "How late the event loop woke the lag probe, ie. how long callbacks waited to run.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_LAG_LAST = metrics.gauge(
+    "frogbot_event_loop_lag_last_seconds",
+    "The lag probe's most recent measurement of event loop lag."
+)
+LOOP_BLOCKED = metrics.counter(
+    "frogbot_event_loop_blocked_total",
+    "Times the event loop was blocked past the threshold, by the code that blocked it.",
+    ("site", )
+)
+LOOP_BLOCKED_SECONDS = metrics.histogram(
+    "frogbot_event_loop_blocked_seconds",
+    "How long the event loop stayed blocked, each time it was blocked past the threshold.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+# Frames under here are the bot's own code; the rest is the standard library
+# and installed packages, which is rarely where the fix goes.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UNKNOWN = "unknown"
+
+################################################################################
+def _is_own_code(filename: str) -> bool:
+
+    return (
+        filename.startswith(ROOT)
+        and "site-packages" not in filename
+        and os.path.abspath(filename) != os.path.abspath(__file__)
+    )
+
+################################################################################
+def _site(frame: FrameType) -> str:
+    """``module:function`` for the innermost frame of the bot's own code in
+    ``frame``'s stack."""
+
+    while frame is not None:
+        if _is_own_code(frame.f_code.co_filename):
+            module = frame.f_globals.get("__name__", "?")
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+
+    return UNKNOWN
+
+################################################################################
+class LoopMonitor:
+    """Watches how responsive the event loop is.
+
+    A probe task sleeps for ``interval`` seconds at a time; however much later
+    than that it wakes up is the loop's lag, the time any callback would have
+    waited to run. Meanwhile a watchdog thread checks the probe is still
+    waking up: once it's gone ``threshold`` seconds past due, the loop is
+    blocked, and the watchdog samples the loop thread's stack every
+    ``sample_interval`` seconds until it comes back. The most common sample
+    is logged with how long the loop was blocked, and counted by the first
+    frame of the bot's own code in it.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.5,
+        threshold: float = 0.25,
+        sample_interval: float = 0.05
+    ):
+
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.sample_interval: float = sample_interval
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped: threading.Event = threading.Event()
+        self._loop_thread: Optional[int] = None
+
+        # When the probe is next due to wake up, by time.monotonic().
+        self._due: float = 0.0
+        # Stacks sampled while the loop's been blocked. Appended to by the
+        # watchdog thread, swapped out by the probe.
+        self._samples: List[str] = []
+        self._sites: List[str] = []
+
+################################################################################
+    def start(self) -> None:
+
+        if self._task is not None:
+            return
+
+        self._loop_thread = threading.get_ident()
+        self._due = time.monotonic() + self.interval
+        self._stopped.clear()
+
+        self._task = asyncio.create_task(self._probe(), name="frogbot-loop-probe")
+        self._watchdog = threading.Thread(target=self._watch, name="frogbot-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+################################################################################
+    async def close(self) -> None:
+
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+################################################################################
+    async def _probe(self) -> None:
+
+        while True:
+            self._due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+
+            lag = max(time.monotonic() - self._due, 0.0)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+            if lag >= self.threshold:
+                self._report(lag)
+
+################################################################################
+    def _report(self, lag: float) -> None:
+
+        samples, self._samples = self._samples, []
+        sites, self._sites = self._sites, []
+
+        if samples:
+            stack, _ = _Tally(samples).most_common(1)[0]
+            site, _ = _Tally(sites).most_common(1)[0]
+        else:
+            # Blocked for less than a sample interval past the threshold.
+            stack, site = "", UNKNOWN
+
+        LOOP_BLOCKED.inc(site=site)
+        LOOP_BLOCKED_SECONDS.observe(lag)
+
+        log.warning(
+            "Event loop blocked for %.0fms in %s (%d stack samples):\n%s",
+            lag * 1000, site, len(samples), stack.rstrip() or "  <no sample>"
+        )
+
+################################################################################
+    def _watch(self) -> None:
+
+        while not self._stopped.wait(self.sample_interval):
+            if time.monotonic() - self._due < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+
+            self._samples.append("".join(traceback.format_stack(frame)))
+            self._sites.append(_site(frame))
+
+################################################################################
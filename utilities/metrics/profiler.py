@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import asyncio
+import fnmatch
+import functools
+import itertools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from collections    import Counter as _Tally
+from contextlib     import contextmanager
+from types          import FrameType
+from typing         import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar
+)
+
+from .registry  import metrics
+################################################################################
+
+__all__ = (
+    "SamplingProfiler",
+    "profiler",
+    "profiled",
+)
+
+log = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+PROFILES_WRITTEN = metrics.counter(
+    "frogbot_profiles_written_total",
+    "Invocations profiled by the sampling profiler, by command, callback or function.",
+    ("name", )
+)
+
+EXTENSION = ".collapsed"
+# Marks the leaf of a stack sampled while its task was waiting rather than
+# running, eg. on a database query or Discord request.
+AWAITING = "[awaiting]"
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+################################################################################
+def _frame_name(frame: FrameType) -> str:
+
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+################################################################################
+def _running_stack(frame: FrameType) -> Tuple[str, ...]:
+    """The stack of the task running on the loop, outermost first, without
+    the event loop's own frames beneath it."""
+
+    names: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "_run" and code.co_filename.endswith(os.path.join("asyncio", "events.py")):
+            break
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+
+    return tuple(reversed(names))
+
+################################################################################
+def _awaiting_stack(task: asyncio.Task) -> Tuple[str, ...]:
+    """The chain of coroutines a suspended task is waiting in, outermost
+    first."""
+
+    names: List[str] = []
+    coro = task.get_coro()
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+
+    names.append(AWAITING)
+    return tuple(names)
+
+################################################################################
+class _Session:
+
+    __slots__ = (
+        "name",
+        "task",
+        "started",
+        "stacks"
+    )
+
+    def __init__(self, name: str, task: asyncio.Task):
+
+        self.name: str = name
+        self.task: asyncio.Task = task
+        self.started: float = time.perf_counter()
+        self.stacks: _Tally = _Tally()
+
+################################################################################
+class SamplingProfiler:
+    """Profiles chosen commands, view callbacks and functions in production,
+    without a redeploy.
+
+    ``targets`` maps names (or ``fnmatch`` patterns), such as
+    ``profiles finalize`` or ``Profile.post``, to the fraction of their
+    invocations to profile. While one is being profiled, a thread samples its
+    task every ``interval`` seconds: the stack it's running, or the
+    coroutines it's waiting in (ending ``[awaiting]``). Samples are written to
+    ``directory`` in the collapsed-stack format ``flamegraph.pl`` and
+    speedscope read, counted in microseconds, one file per invocation,
+    keeping the newest ``retention`` files.
+    """
+
+    def __init__(
+        self,
+        directory: str = "profiling",
+        *,
+        interval: float = 0.005,
+        retention: int = 50,
+        targets: Optional[Dict[str, float]] = None
+    ):
+
+        self.directory: str = directory
+        self.interval: float = interval
+        self.retention: int = retention
+        self.targets: Dict[str, float] = {}
+
+        self._sessions: Dict[asyncio.Task, _Session] = {}
+        self._lock: threading.Lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._seq = itertools.count()
+
+        for pattern, fraction in (targets or {}).items():
+            self.set_target(pattern, fraction)
+
+################################################################################
+    @staticmethod
+    def parse_targets(spec: str) -> Dict[str, float]:
+        """Parses ``name[=fraction],...``, eg.
+        ``profiles finalize=0.1,ProfileImages.handle_image``."""
+
+        targets: Dict[str, float] = {}
+        for part in spec.split(","):
+            name, _, fraction = part.partition("=")
+            if name.strip():
+                targets[name.strip()] = float(fraction) if fraction.strip() else 1.0
+
+        return targets
+
+################################################################################
+    def set_target(self, pattern: str, fraction: float = 1.0) -> None:
+        """Profiles ``fraction`` of the invocations matching ``pattern`` from
+        now on; ``0`` stops profiling them."""
+
+        if fraction <= 0:
+            self.targets.pop(pattern, None)
+        else:
+            self.targets[pattern] = min(fraction, 1.0)
+
+################################################################################
+    def fraction(self, name: str) -> float:
+
+        if name in self.targets:
+            return self.targets[name]
+
+        return max(
+            (f for pattern, f in self.targets.items() if fnmatch.fnmatchcase(name, pattern)),
+            default=0.0
+        )
+
+################################################################################
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Profiles the current task for the duration of this context, if
+        ``name`` is a target and this invocation is sampled. Contexts inside
+        one already profiling the task are ignored."""
+
+        session = None
+        if self.targets:
+            task = asyncio.current_task()
+            if (
+                task is not None
+                and task not in self._sessions
+                and random.random() < self.fraction(name)
+            ):
+                session = _Session(name, task)
+                self._begin(session)
+
+        try:
+            yield
+        finally:
+            if session is not None:
+                self._end(session)
+
+################################################################################
+    def _begin(self, session: _Session) -> None:
+
+        with self._lock:
+            self._sessions[session.task] = session
+            if self._thread is None:
+                self._loop = asyncio.get_running_loop()
+                self._loop_thread = threading.get_ident()
+                self._thread = threading.Thread(target=self._sample, name="frogbot-profiler", daemon=True)
+                self._thread.start()
+
+################################################################################
+    def _end(self, session: _Session) -> None:
+
+        with self._lock:
+            self._sessions.pop(session.task, None)
+            # The sampler may still be adding to the session it picked up
+            # before this; the copy is safe to read from another thread.
+            stacks = _Tally(session.stacks)
+
+        if not stacks:
+            return
+
+        PROFILES_WRITTEN.inc(name=session.name)
+        elapsed = time.perf_counter() - session.started
+        # Disk writes stay off the event loop.
+        asyncio.get_running_loop().run_in_executor(None, self._write, session.name, stacks, elapsed)
+
+################################################################################
+    def _sample(self) -> None:
+
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+
+            # A busy loop holds the GIL for longer than the interval, so
+            # samples are weighted by the time they stand for, in microseconds.
+            now = time.perf_counter()
+            weight, last = int((now - last) * 1_000_000), now
+
+            with self._lock:
+                sessions = list(self._sessions.values())
+                if not sessions:
+                    self._thread = None
+                    return
+
+            running = asyncio.current_task(self._loop)
+            frame = sys._current_frames().get(self._loop_thread)
+
+            samples: List[Tuple[_Session, Tuple[str, ...]]] = []
+            for session in sessions:
+                if session.task is running and frame is not None:
+                    samples.append((session, _running_stack(frame)))
+                else:
+                    samples.append((session, _awaiting_stack(session.task)))
+
+            with self._lock:
+                for session, stack in samples:
+                    session.stacks[stack] += weight
+
+################################################################################
+    def _write(self, name: str, stacks: _Tally, elapsed: float) -> None:
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        filename = "{0}-{1:04d}-{2}-{3:.0f}ms{4}".format(
+            time.strftime("%Y%m%d-%H%M%S"),
+            next(self._seq) % 10000,
+            _UNSAFE.sub("_", name),
+            elapsed * 1000,
+            EXTENSION
+        )
+        path = os.path.join(self.directory, filename)
+
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        log.info("Profiled %s (%.0fms) to %s", name, elapsed * 1000, path)
+        self._prune()
+
+################################################################################
+    def _prune(self) -> None:
+
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(EXTENSION)
+        ]
+        if len(paths) <= self.retention:
+            return
+
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.retention]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+################################################################################
+    def files(self) -> List[str]:
+        """The profiles currently on disk, newest first."""
+
+        if not os.path.isdir(self.directory):
+            return []
+
+        names = [name for name in os.listdir(self.directory) if name.endswith(EXTENSION)]
+        return sorted(names, reverse=True)
+
+################################################################################
+def profiled(func: F) -> F:
+    """Makes a coroutine function a profiler target under its qualified
+    name, eg. ``Profile.post``."""
+
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with profiler.profile(name):
+            return await func(*args, **kwargs)
+
+    return wrapper  # type: ignore
+
+################################################################################
+
+profiler = SamplingProfiler(
+    os.getenv("PROFILE_DIR", "profiling"),
+    interval=float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000,
+    retention=int(os.getenv("PROFILE_RETENTION", 50)),
+    targets=SamplingProfiler.parse_targets(os.getenv("PROFILE_TARGETS", ""))
+)
+
+################################################################################
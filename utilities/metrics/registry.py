@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import bisect
+import time
+
+from contextlib import contextmanager
+from typing     import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar
+)
+################################################################################
+
+__all__ = (
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "metrics",
+)
+
+M = TypeVar("M", bound="Metric")
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+################################################################################
+class Metric:
+    """Base class for the in-process metrics FrogBot keeps about itself.
+
+    Metrics are keyed by an ordered set of label values; label names are
+    fixed when the metric is registered.
+    """
+
+    type_name: str = "untyped"
+
+    __slots__ = (
+        "name",
+        "documentation",
+        "labelnames"
+    )
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+################################################################################
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name!r} expects labels {self.labelnames}, got {tuple(labels)}."
+            )
+
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+################################################################################
+class Counter(Metric):
+
+    type_name = "counter"
+
+    __slots__ = ("_values", )
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self._values: Dict[LabelValues, float] = {}
+
+################################################################################
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+################################################################################
+    def value(self, **labels: object) -> float:
+
+        return self._values.get(self._key(labels), 0.0)
+
+################################################################################
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+
+        return list(self._values.items())
+
+################################################################################
+class Gauge(Metric):
+
+    type_name = "gauge"
+
+    __slots__ = ("_values", "_functions")
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+################################################################################
+    def set(self, value: float, **labels: object) -> None:
+
+        self._values[self._key(labels)] = value
+
+################################################################################
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+################################################################################
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+
+        self.inc(-amount, **labels)
+
+################################################################################
+    def set_function(self, func: Callable[[], float], **labels: object) -> None:
+        """Has the gauge read its value from ``func`` whenever it is collected."""
+
+        self._functions[self._key(labels)] = func
+
+################################################################################
+    def value(self, **labels: object) -> float:
+
+        key = self._key(labels)
+        if key in self._functions:
+            return float(self._functions[key]())
+
+        return self._values.get(key, 0.0)
+
+################################################################################
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+
+        ret = dict(self._values)
+        for key, func in self._functions.items():
+            ret[key] = float(func())
+
+        return list(ret.items())
+
+################################################################################
+class _HistogramSeries:
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, num_buckets: int):
+
+        self.counts: List[int] = [0] * num_buckets
+        self.sum: float = 0.0
+        self.count: int = 0
+
+################################################################################
+class Histogram(Metric):
+
+    type_name = "histogram"
+
+    __slots__ = ("buckets", "_series")
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+
+        super().__init__(*args, **kwargs)
+
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (float("inf"), )
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+################################################################################
+    def observe(self, value: float, **labels: object) -> None:
+
+        key = self._key(labels)
+
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets))
+
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+################################################################################
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+################################################################################
+    def count(self, **labels: object) -> int:
+
+        series = self._series.get(self._key(labels))
+        return series.count if series is not None else 0
+
+################################################################################
+    def quantile(self, q: float, **labels: object) -> Optional[float]:
+        """Estimates the ``q`` quantile by linear interpolation within the
+        bucket it falls in, the same way Prometheus' ``histogram_quantile`` does."""
+
+        series = self._series.get(self._key(labels))
+        if series is None or series.count == 0:
+            return None
+
+        rank = q * series.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets, series.counts):
+            if seen + count >= rank and count:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * ((rank - seen) / count)
+            seen += count
+            lower = upper if upper != float("inf") else lower
+
+        return lower
+
+################################################################################
+    def samples(self) -> List[Tuple[LabelValues, _HistogramSeries]]:
+
+        return list(self._series.items())
+
+################################################################################
+class MetricsRegistry:
+    """A get-or-create registry of every metric in the process.
+
+    Registering the same name twice returns the existing metric, so modules can
+    declare the metrics they use at import time without coordinating."""
+
+    __slots__ = ("_metrics", )
+
+    def __init__(self):
+
+        self._metrics: Dict[str, Metric] = {}
+
+################################################################################
+    def _register(
+        self,
+        cls: Type[M],
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        **kwargs
+    ) -> M:
+
+        existing = self._metrics.get(name)
+        if existing is not None:
+            if not isinstance(existing, cls):
+                raise ValueError(f"Metric {name!r} is already registered as a {existing.type_name}.")
+            return existing  # type: ignore
+
+        metric = cls(name, documentation, labelnames, **kwargs)
+        self._metrics[name] = metric
+
+        return metric
+
+################################################################################
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+
+        return self._register(Counter, name, documentation, labelnames)
+
+################################################################################
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+
+        return self._register(Gauge, name, documentation, labelnames)
+
+################################################################################
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+################################################################################
+    def collect(self) -> List[Metric]:
+
+        return list(self._metrics.values())
+
+################################################################################
+    def get(self, name: str) -> Optional[Metric]:
+
+        return self._metrics.get(name)
+
+################################################################################
+
+metrics = MetricsRegistry()
+
+################################################################################
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+from contextlib     import contextmanager
+from contextvars    import ContextVar
+from typing         import Any, Dict, Iterator, List, Optional, Tuple
+
+from .instrument    import INTERACTION_LATENCY
+from .registry      import metrics
+################################################################################
+
+__all__ = (
+    "Span",
+    "Tracer",
+    "JsonFileExporter",
+    "tracer",
+)
+
+log = logging.getLogger(__name__)
+
+TRACES_EXPORTED = metrics.counter(
+    "frogbot_traces_exported_total",
+    "Interaction traces written out, by interaction and why they were kept.",
+    ("name", "reason")
+)
+
+################################################################################
+class Span:
+    """One timed step of an interaction: the interaction itself, or a
+    database statement, Discord request or compile step within it."""
+
+    __slots__ = (
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start",
+        "end",
+        "attributes",
+        "error"
+    )
+
+    def __init__(
+        self,
+        span_id: int,
+        parent_id: Optional[int],
+        name: str,
+        kind: str,
+        start: float,
+        attributes: Dict[str, Any]
+    ):
+
+        self.span_id: int = span_id
+        self.parent_id: Optional[int] = parent_id
+        self.name: str = name
+        self.kind: str = kind
+        self.start: float = start
+        self.end: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes
+        self.error: Optional[str] = None
+
+################################################################################
+    @property
+    def duration(self) -> float:
+
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+################################################################################
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+
+        ret = {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+        if self.attributes:
+            ret["attributes"] = self.attributes
+        if self.error is not None:
+            ret["error"] = self.error
+
+        return ret
+
+################################################################################
+class _Trace:
+
+    __slots__ = (
+        "trace_id",
+        "started_at",
+        "root",
+        "spans",
+        "dropped",
+        "finished",
+        "_ids"
+    )
+
+    def __init__(self):
+
+        self.trace_id: str = uuid.uuid4().hex[:16]
+        self.started_at: float = time.time()
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+        self.dropped: int = 0
+        self.finished: bool = False
+        self._ids = itertools.count(1)
+
+    def add(
+        self,
+        name: str,
+        kind: str,
+        parent: Optional[Span],
+        start: float,
+        attributes: Dict[str, Any],
+        max_spans: int
+    ) -> Optional[Span]:
+
+        if len(self.spans) >= max_spans:
+            self.dropped += 1
+            return None
+
+        span = Span(
+            next(self._ids),
+            parent.span_id if parent is not None else None,
+            name,
+            kind,
+            start,
+            attributes
+        )
+        self.spans.append(span)
+
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "kind": self.root.kind,
+            "timestamp": self.started_at,
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "dropped_spans": self.dropped,
+            "spans": [span.to_dict(self.root.start) for span in self.spans],
+        }
+
+################################################################################
+
+_current: ContextVar[Optional[Tuple[_Trace, Span]]] = ContextVar("frogbot_trace", default=None)
+
+################################################################################
+class JsonFileExporter:
+    """Appends kept traces to ``path``, one JSON object per line. Once the
+    file reaches ``max_bytes`` it's rotated to ``path.1`` (and so on), keeping
+    ``backups`` old files."""
+
+    def __init__(self, path: str = "traces/traces.jsonl", *, max_bytes: int = 10_000_000, backups: int = 3):
+
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+
+        self._lock: threading.Lock = threading.Lock()
+
+################################################################################
+    def export(self, trace: Dict[str, Any]) -> None:
+
+        line = json.dumps(trace, separators=(",", ":"), default=str) + "\n"
+
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except FileNotFoundError:
+                pass
+
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+################################################################################
+    def _rotate(self) -> None:
+
+        for i in range(self.backups, 0, -1):
+            source = f"{self.path}.{i - 1}" if i > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i}")
+
+        if not self.backups:
+            os.remove(self.path)
+
+################################################################################
+class Tracer:
+    """Traces interactions: a root span per slash command or view callback,
+    with child spans for the database statements, Discord requests and
+    compile steps run on its behalf.
+
+    Only some traces are kept and handed to ``exporter``: those taking at
+    least ``slow_threshold`` seconds, those at or above their command's
+    running p99 (once it's been seen ``p99_after`` times), and a random
+    ``sample_rate`` of the rest. With no exporter, nothing is traced.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[JsonFileExporter] = None,
+        *,
+        slow_threshold: float = 1.0,
+        sample_rate: float = 0.0,
+        p99_after: int = 100,
+        max_spans: int = 500
+    ):
+
+        self.exporter: Optional[JsonFileExporter] = exporter
+        self.slow_threshold: float = slow_threshold
+        self.sample_rate: float = sample_rate
+        self.p99_after: int = p99_after
+        self.max_spans: int = max_spans
+
+################################################################################
+    @contextmanager
+    def trace(self, name: str, kind: str = "command", **attributes: Any) -> Iterator[Optional[Span]]:
+        """Traces the interaction ``name`` (of ``kind`` ``command`` or
+        ``view``, as for :func:`track_interaction`). Inside another trace,
+        this is just a span of it. (Long-lived tasks started during an
+        interaction inherit its finished trace, which is ignored.)"""
+
+        current = _current.get()
+        if self.exporter is None or (current is not None and not current[0].finished):
+            with self.span(name, kind, **attributes) as span:
+                yield span
+            return
+
+        trace = _Trace()
+        root = trace.root = trace.add(name, kind, None, time.perf_counter(), attributes, self.max_spans)
+        token = _current.set((trace, root))
+        try:
+            yield root
+        except BaseException as exc:
+            root.error = type(exc).__name__
+            raise
+        finally:
+            root.end = time.perf_counter()
+            trace.finished = True
+            _current.reset(token)
+            self._finish(trace)
+
+################################################################################
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", **attributes: Any) -> Iterator[Optional[Span]]:
+        """Times a step of the current trace, if there is one."""
+
+        current = _current.get()
+        if current is None or current[0].finished:
+            yield None
+            return
+
+        trace, parent = current
+        span = trace.add(name, kind, parent, time.perf_counter(), attributes, self.max_spans)
+        if span is None:
+            yield None
+            return
+
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = type(exc).__name__
+            raise
+        finally:
+            span.end = time.perf_counter()
+            _current.reset(token)
+
+################################################################################
+    def add_span(self, name: str, kind: str, start: float, end: float, **attributes: Any) -> None:
+        """Records a step already timed (by ``time.perf_counter()``) in the
+        current trace, if there is one."""
+
+        current = _current.get()
+        if current is None or current[0].finished:
+            return
+
+        trace, parent = current
+        span = trace.add(name, kind, parent, start, attributes, self.max_spans)
+        if span is not None:
+            span.end = end
+
+################################################################################
+    def _keep(self, trace: _Trace) -> Optional[str]:
+
+        root = trace.root
+        if root.duration >= self.slow_threshold:
+            return "slow"
+
+        if INTERACTION_LATENCY.count(kind=root.kind, name=root.name) >= self.p99_after:
+            p99 = INTERACTION_LATENCY.quantile(0.99, kind=root.kind, name=root.name)
+            if p99 is not None and root.duration >= p99:
+                return "p99"
+
+        if random.random() < self.sample_rate:
+            return "sampled"
+
+        return None
+
+################################################################################
+    def _finish(self, trace: _Trace) -> None:
+
+        reason = self._keep(trace)
+        if reason is None:
+            return
+
+        TRACES_EXPORTED.inc(name=trace.root.name, reason=reason)
+
+        record = trace.to_dict()
+        record["reason"] = reason
+        # File writes stay off the event loop.
+        future = asyncio.get_running_loop().run_in_executor(None, self.exporter.export, record)
+        future.add_done_callback(self._exported)
+
+################################################################################
+    @staticmethod
+    def _exported(future: asyncio.Future) -> None:
+
+        if not future.cancelled() and future.exception() is not None:
+            log.warning("Couldn't export trace: %r", future.exception())
+
+################################################################################
+
+# An empty TRACE_FILE turns tracing off.
+_trace_file = os.getenv("TRACE_FILE", "traces/traces.jsonl")
+
+tracer = Tracer(
+    JsonFileExporter(_trace_file) if _trace_file else None,
+    slow_threshold=float(os.getenv("TRACE_SLOW_MS", 1000)) / 1000,
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0))
+)
+
+################################################################################
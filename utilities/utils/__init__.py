@@ -1,5 +1,10 @@
 from .common        import *
+from .debounce      import *
 from .helpers       import *
+from .hydration     import *
+from .jobs          import *
+from .lru           import *
+from .outbound      import *
 from .parsers       import *
 from .structs       import *
 from .validators    import *
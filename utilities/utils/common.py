@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import math
 import re
 
 from datetime       import datetime
 from discord import Colour, Embed, EmbedField
 from discord.embeds import EmptyEmbed
-from typing         import TYPE_CHECKING, Any, List, Optional, Tuple, Union
+from functools      import lru_cache
+from itertools      import repeat
+from typing         import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
 
 if TYPE_CHECKING:
     pass
@@ -14,6 +18,7 @@ if TYPE_CHECKING:
 
 __all__ = (
     "make_embed",
+    "embed_digest",
     "draw_separator",
     "titleize"
 )
@@ -134,47 +139,60 @@ def make_embed(
     return embed
 
 ################################################################################
+def embed_digest(embeds: Iterable[Embed]) -> str:
+    """A SHA-256 hex digest of the message payload ``embeds`` would make, so two
+    sets of embeds that would render identically hash the same."""
+
+    payload = json.dumps(
+        [embed.to_dict() for embed in embeds],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str
+    )
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+################################################################################
+# Approximate rendered width of each glyph in Discord's embed font, relative to
+# one "═". Anything not listed (including most non-Latin text) counts as zero.
+_GLYPH_WIDTHS: Dict[str, float] = {}
+for _width, _glyphs in (
+    # Listed widest-first, so a later (narrower) entry wins for a glyph
+    # appearing twice, as it did when this was an if/elif chain ("t").
+    (1.30, "@"),
+    (1.20, "M"),
+    (1.15, "mW"),
+    (1.00, "wNOQ%"),
+    (0.95, "GHU"),
+    (0.90, "ABCDKR#&"),
+    (0.85, "PVXY0"),
+    (0.80, "bdhpqEFLSTZ34$"),
+    (0.75, "nou25689"),
+    (0.70, "acegkvyJ7_=+~<>?"),
+    (0.65, "x^"),
+    (0.60, "sz*-"),
+    (0.50, "rt1{}\"\\/"),
+    (0.45, "()t"),
+    (0.40, "fl`[]"),
+    (0.35, "I!;|,"),
+    (0.30, "ij. "),
+    (0.25, "'"),
+):
+    for _glyph in _glyphs:
+        _GLYPH_WIDTHS[_glyph] = _width
+
+del _width, _glyphs, _glyph
+
+################################################################################
+@lru_cache(maxsize=4096)
 def draw_separator(*, text: str = "", num_emoji: int = 0, extra: float = 0.0) -> str:
 
-    text_value = extra + (1.95 * num_emoji)
-
-    for c in text:
-        if c == "'":
-            text_value += 0.25
-        elif c in ("i", "j", ".", " "):
-            text_value += 0.30
-        elif c in ("I", "!", ";", "|", ","):
-            text_value += 0.35
-        elif c in ("f", "l", "`", "[", "]"):
-            text_value += 0.40
-        elif c in ("(", ")", "t"):
-            text_value += 0.45
-        elif c in ("r", "t", "1" "{", "}", '"', "\\", "/"):
-            text_value += 0.50
-        elif c in ("s", "z", "*", "-"):
-            text_value += 0.60
-        elif c in ("x", "^"):
-            text_value += 0.65
-        elif c in ("a", "c", "e", "g", "k", "v", "y", "J", "7", "_", "=", "+", "~", "<", ">", "?"):
-            text_value += 0.70
-        elif c in ("n", "o", "u", "2", "5", "6", "8", "9"):
-            text_value += 0.75
-        elif c in ("b", "d", "h", "p", "q", "E", "F", "L", "S", "T", "Z", "3", "4", "$"):
-            text_value += 0.80
-        elif c in ("P", "V", "X", "Y", "0"):
-            text_value += 0.85
-        elif c in ("A", "B", "C", "D", "K", "R", "#", "&"):
-            text_value += 0.90
-        elif c in ("G", "H", "U"):
-            text_value += 0.95
-        elif c in ("w", "N", "O", "Q", "%"):
-            text_value += 1.0
-        elif c in ("m", "W"):
-            text_value += 1.15
-        elif c == "M":
-            text_value += 1.2
-        elif c == "@":
-            text_value += 1.3
+    # sum() adds left to right from its start value, exactly like the running
+    # total this used to keep, so rounding at the ceil() is unchanged.
+    text_value = sum(
+        map(_GLYPH_WIDTHS.get, text, repeat(0.0)),
+        extra + (1.95 * num_emoji)
+    )
 
     return "═" * math.ceil(text_value)
 
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from discord    import HTTPException
+from typing     import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Optional,
+    Tuple,
+    TypeVar
+)
+
+from utilities.metrics  import metrics
+
+from .hydration import RateLimiter
+################################################################################
+
+__all__ = ("DebouncedQueue", )
+
+log = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+
+RUNS_SCHEDULED = metrics.counter(
+    "frogbot_debounced_scheduled_total",
+    "Keys scheduled on a debounced queue, including ones already waiting.",
+    ("queue", )
+)
+RUNS_COALESCED = metrics.counter(
+    "frogbot_debounced_coalesced_total",
+    "Schedules absorbed by a run of the same key that was already waiting.",
+    ("queue", )
+)
+RUNS_FINISHED = metrics.counter(
+    "frogbot_debounced_runs_total",
+    "Debounced runs finished, by outcome.",
+    ("queue", "result")
+)
+RUNS_PENDING = metrics.gauge(
+    "frogbot_debounced_pending",
+    "Keys waiting on a debounced queue.",
+    ("queue", )
+)
+
+################################################################################
+class DebouncedQueue(Generic[K]):
+    """Runs ``handler`` for a key once changes to it have settled.
+
+    :meth:`schedule` queues a key to run ``delay`` seconds later; scheduling it
+    again while it waits pushes the run back, so a burst of changes collapses
+    into one run -- though never more than ``max_delay`` seconds after the
+    first. A single worker runs due keys at most ``rate`` times per second
+    (bursting up to ``burst``) across the whole queue. A 429 from Discord
+    pauses the queue for its Retry-After and puts the key back; other
+    failures are logged and the key is dropped.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[K], Awaitable[Any]],
+        *,
+        delay: float = 10.0,
+        max_delay: float = 60.0,
+        rate: float = 1.0,
+        burst: Optional[int] = None,
+        attempts: int = 3
+    ):
+
+        self.name: str = name
+        self.handler: Callable[[K], Awaitable[Any]] = handler
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self.attempts: int = attempts
+        self.limiter: RateLimiter = RateLimiter(rate, burst)
+
+        # key -> (run at, first scheduled at), both monotonic.
+        self._due: Dict[K, Tuple[float, float]] = {}
+        self._retries: Dict[K, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        RUNS_PENDING.set_function(lambda: len(self._due), queue=name)
+
+################################################################################
+    def schedule(self, key: K) -> None:
+
+        RUNS_SCHEDULED.inc(queue=self.name)
+
+        now = time.monotonic()
+        first = now
+        if key in self._due:
+            RUNS_COALESCED.inc(queue=self.name)
+            first = self._due[key][1]
+
+        self._due[key] = (min(now + self.delay, first + self.max_delay), first)
+
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name=f"frogbot-{self.name}")
+        self._wakeup.set()
+
+################################################################################
+    async def _run(self) -> None:
+
+        while True:
+            self._wakeup.clear()
+            if not self._due:
+                await self._wakeup.wait()
+                continue
+
+            key, (run_at, _) = min(self._due.items(), key=lambda item: item[1][0])
+            wait = run_at - time.monotonic()
+            if wait > 0:
+                # Woken early if something is scheduled in the meantime.
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.limiter.acquire()
+            # Rescheduled while waiting for the limiter; it isn't due any more.
+            if self._due.get(key, (0.0, ))[0] > time.monotonic():
+                continue
+
+            del self._due[key]
+            await self._call(key)
+
+################################################################################
+    async def _call(self, key: K) -> None:
+
+        try:
+            await self.handler(key)
+        except HTTPException as exc:
+            attempt = self._retries.pop(key, 0) + 1
+            if exc.status != 429 or attempt >= self.attempts:
+                log.warning("%s run failed: %s", self.name, exc)
+                RUNS_FINISHED.inc(queue=self.name, result="failed")
+                return
+
+            retry_after = float(exc.response.headers.get("Retry-After", 1.0))
+            log.info("%s rate limited; pausing %.2fs.", self.name, retry_after)
+            self.limiter.pause(retry_after)
+
+            self._retries[key] = attempt
+            if key not in self._due:
+                now = time.monotonic()
+                self._due[key] = (now, now)
+        except Exception:
+            self._retries.pop(key, None)
+            log.exception("%s run failed.", self.name)
+            RUNS_FINISHED.inc(queue=self.name, result="failed")
+        else:
+            self._retries.pop(key, None)
+            RUNS_FINISHED.inc(queue=self.name, result="succeeded")
+
+################################################################################
+    @property
+    def pending(self) -> int:
+
+        return len(self._due)
+
+################################################################################
+    async def close(self) -> None:
+        """Stops the worker. Runs still waiting are dropped."""
+
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        self._due.clear()
+        self._retries.clear()
+
+################################################################################
@@ -1,21 +1,31 @@
 from __future__ import annotations
 
-from discord    import Interaction
+import logging
+
+from discord    import HTTPException, Interaction
+
+from .outbound  import outbound
 ################################################################################
 
 __all__ = (
     "edit_message_helper",
 )
 
+log = logging.getLogger(__name__)
+
 ################################################################################
-async def edit_message_helper(interaction: Interaction, *args, **kwargs) -> None:
+async def edit_message_helper(interaction: Interaction, **kwargs) -> None:
 
-    try:
-        await interaction.message.edit(*args, **kwargs)
-    except:
+    if interaction.message is not None:
         try:
-            await interaction.edit_original_response(*args, **kwargs)
-        except:
-            print("Edit Message Helper FAILED")
+            await outbound.edit(interaction.message, **kwargs)
+            return
+        except HTTPException:
+            pass
+
+    try:
+        await outbound.edit_response(interaction, **kwargs)
+    except HTTPException as exc:
+        log.warning("Couldn't edit the message for interaction %d: %s", interaction.id, exc)
 
 ################################################################################
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from discord    import HTTPException, NotFound
+from typing     import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional
+)
+################################################################################
+
+__all__ = (
+    "RateLimiter",
+    "UserHydrator",
+)
+
+log = logging.getLogger(__name__)
+
+################################################################################
+class RateLimiter:
+    """A simple token bucket. :meth:`acquire` waits until a request may be sent
+    without exceeding ``rate`` requests per second (bursting up to ``burst``).
+
+    :meth:`pause` empties the bucket for a while, eg. after Discord returns a 429.
+    """
+
+    __slots__ = (
+        "rate",
+        "burst",
+        "_tokens",
+        "_updated",
+        "_paused_until",
+        "_lock"
+    )
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+
+        self.rate: float = rate
+        self.burst: int = burst or max(int(rate), 1)
+
+        self._tokens: float = float(self.burst)
+        self._updated: float = time.monotonic()
+        self._paused_until: float = 0.0
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+################################################################################
+    async def acquire(self) -> None:
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+################################################################################
+    def delay(self) -> float:
+        """How long :meth:`acquire` would currently have to wait, in seconds."""
+
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now + 1 / self.rate
+
+        tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        return max(0.0, (1 - tokens) / self.rate)
+
+################################################################################
+    def pause(self, seconds: float) -> None:
+
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+################################################################################
+class UserHydrator:
+    """Resolves raw user IDs into user objects in the background.
+
+    Each distinct ID is fetched at most once, with at most ``concurrency``
+    requests in flight and no more than ``rate`` requests per second. IDs
+    that are already cached are resolved without a request at all. Every
+    resolved user is handed to ``on_resolved``; IDs that can't be fetched
+    are left alone so callers keep working with the raw ID.
+    """
+
+    def __init__(
+        self,
+        *,
+        get: Callable[[int], Optional[Any]],
+        fetch: Callable[[int], Awaitable[Any]],
+        on_resolved: Callable[[int, Any], None],
+        concurrency: int = 8,
+        rate: float = 40.0,
+        max_retries: int = 3
+    ):
+
+        self.get: Callable[[int], Optional[Any]] = get
+        self.fetch: Callable[[int], Awaitable[Any]] = fetch
+        self.on_resolved: Callable[[int, Any], None] = on_resolved
+        self.max_retries: int = max_retries
+
+        self.limiter: RateLimiter = RateLimiter(rate)
+        self.concurrency: int = concurrency
+
+        self.resolved: int = 0
+        self.requests: int = 0
+        self.failed: int = 0
+
+################################################################################
+    async def run(self, user_ids: Iterable[int]) -> None:
+
+        pending: List[int] = []
+        for user_id in dict.fromkeys(user_ids):
+            user = self.get(user_id)
+            if user is not None:
+                self._resolve(user_id, user)
+            else:
+                pending.append(user_id)
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for user_id in pending:
+            queue.put_nowait(user_id)
+
+        workers = [
+            asyncio.create_task(self._worker(queue))
+            for _ in range(min(self.concurrency, len(pending)))
+        ]
+        if workers:
+            await asyncio.gather(*workers)
+
+################################################################################
+    async def _worker(self, queue: asyncio.Queue) -> None:
+
+        while not queue.empty():
+            user_id = queue.get_nowait()
+            user = await self._fetch(user_id)
+            if user is not None:
+                self._resolve(user_id, user)
+
+################################################################################
+    async def _fetch(self, user_id: int) -> Optional[Any]:
+
+        for _ in range(self.max_retries):
+            await self.limiter.acquire()
+            self.requests += 1
+
+            try:
+                return await self.fetch(user_id)
+            except NotFound:
+                break
+            except HTTPException as exc:
+                if exc.status != 429:
+                    log.warning("Failed to fetch user %d: %s", user_id, exc)
+                    break
+
+                retry_after = float(exc.response.headers.get("Retry-After", 1.0))
+                log.info("Rate limited while hydrating users; pausing %.2fs.", retry_after)
+                self.limiter.pause(retry_after)
+
+        self.failed += 1
+        return None
+
+################################################################################
+    def _resolve(self, user_id: int, user: Any) -> None:
+
+        self.resolved += 1
+        self.on_resolved(user_id, user)
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, int]:
+
+        return {
+            "resolved": self.resolved,
+            "requests": self.requests,
+            "failed": self.failed,
+        }
+
+################################################################################
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+
+from typing     import Awaitable, Callable, Set, Tuple, Type, TypeVar
+
+from utilities.metrics  import metrics
+################################################################################
+
+__all__ = (
+    "BackgroundJobs",
+)
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+JOBS_FINISHED = metrics.counter(
+    "frogbot_background_jobs_total",
+    "Background jobs finished, by queue and whether they eventually succeeded.",
+    ("queue", "result")
+)
+JOB_RETRIES = metrics.counter(
+    "frogbot_background_job_retries_total",
+    "Background job attempts that failed and were retried.",
+    ("queue", )
+)
+JOBS_PENDING = metrics.gauge(
+    "frogbot_background_jobs_pending",
+    "Background jobs queued or running.",
+    ("queue", )
+)
+
+################################################################################
+class BackgroundJobs:
+    """Runs jobs in the background, retrying failures with backoff.
+
+    :meth:`submit` returns a task straight away; at most ``concurrency`` jobs
+    run at once. A job that raises is retried up to ``attempts`` times in all,
+    waiting ``base_delay`` seconds doubled per attempt (capped at
+    ``max_delay``, with jitter so a burst of failures doesn't retry in
+    lockstep). Exceptions in ``permanent`` aren't worth retrying and are
+    raised to the waiter immediately.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        concurrency: int = 4,
+        attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        permanent: Tuple[Type[BaseException], ...] = ()
+    ):
+
+        self.name: str = name
+        self.attempts: int = attempts
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.permanent: Tuple[Type[BaseException], ...] = permanent
+
+        self._slots: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+        JOBS_PENDING.set_function(lambda: len(self._tasks), queue=name)
+
+################################################################################
+    def submit(self, job: Callable[[], Awaitable[T]]) -> asyncio.Task:
+        """Schedules ``job`` (called afresh for every attempt) and returns the
+        task that resolves to its result."""
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return task
+
+################################################################################
+    async def _run(self, job: Callable[[], Awaitable[T]]) -> T:
+
+        attempt = 1
+        while True:
+            try:
+                async with self._slots:
+                    result = await job()
+            except self.permanent:
+                JOBS_FINISHED.inc(queue=self.name, result="failed")
+                raise
+            except Exception as exc:
+                if attempt >= self.attempts:
+                    log.warning("%s job failed after %d attempts: %s", self.name, attempt, exc)
+                    JOBS_FINISHED.inc(queue=self.name, result="failed")
+                    raise
+
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                log.info(
+                    "%s job failed (attempt %d/%d): %s; retrying in %.1fs.",
+                    self.name, attempt, self.attempts, exc, delay
+                )
+                JOB_RETRIES.inc(queue=self.name)
+
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                JOBS_FINISHED.inc(queue=self.name, result="succeeded")
+                return result
+
+################################################################################
+    @property
+    def pending(self) -> int:
+
+        return len(self._tasks)
+
+################################################################################
+    async def close(self) -> None:
+
+        for task in list(self._tasks):
+            task.cancel()
+
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+################################################################################
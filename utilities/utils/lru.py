@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from collections    import OrderedDict
+from typing         import (
+    Callable,
+    Generic,
+    Hashable,
+    Iterator,
+    Optional,
+    Tuple,
+    TypeVar
+)
+
+from utilities.metrics  import metrics
+################################################################################
+
+__all__ = ("LRUCache", )
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+CACHE_HITS = metrics.counter(
+    "frogbot_cache_hits_total",
+    "Lookups answered from an in-memory cache.",
+    ("cache", )
+)
+CACHE_MISSES = metrics.counter(
+    "frogbot_cache_misses_total",
+    "Lookups that missed an in-memory cache.",
+    ("cache", )
+)
+CACHE_EVICTIONS = metrics.counter(
+    "frogbot_cache_evictions_total",
+    "Entries evicted from an in-memory cache to stay within its size bound.",
+    ("cache", )
+)
+CACHE_SIZE = metrics.gauge(
+    "frogbot_cache_size",
+    "Number of entries currently held by an in-memory cache.",
+    ("cache", )
+)
+
+################################################################################
+class LRUCache(Generic[K, V]):
+    """A size-bounded least-recently-used mapping.
+
+    :meth:`get` counts as a use and records a hit or miss; :meth:`peek` does
+    neither. When :meth:`put` pushes the cache past ``maxsize`` the oldest
+    entries are dropped and handed to ``on_evict``.
+    """
+
+    __slots__ = (
+        "name",
+        "maxsize",
+        "on_evict",
+        "hits",
+        "misses",
+        "evictions",
+        "_data"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        *,
+        on_evict: Optional[Callable[[K, V], None]] = None
+    ):
+
+        self.name: str = name
+        self.maxsize: int = maxsize
+        self.on_evict: Optional[Callable[[K, V], None]] = on_evict
+
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+        self._data: OrderedDict[K, V] = OrderedDict()
+
+        CACHE_SIZE.set_function(lambda: len(self._data), cache=name)
+
+################################################################################
+    def __len__(self) -> int:
+
+        return len(self._data)
+
+################################################################################
+    def __contains__(self, key: K) -> bool:
+
+        return key in self._data
+
+################################################################################
+    def __iter__(self) -> Iterator[K]:
+
+        return iter(self._data)
+
+################################################################################
+    def items(self) -> Iterator[Tuple[K, V]]:
+
+        return iter(list(self._data.items()))
+
+################################################################################
+    def get(self, key: K) -> Optional[V]:
+
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            CACHE_MISSES.inc(cache=self.name)
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        CACHE_HITS.inc(cache=self.name)
+
+        return value
+
+################################################################################
+    def peek(self, key: K) -> Optional[V]:
+
+        return self._data.get(key)
+
+################################################################################
+    def put(self, key: K, value: V) -> None:
+
+        self._data[key] = value
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            old_key, old_value = self._data.popitem(last=False)
+            self.evictions += 1
+            CACHE_EVICTIONS.inc(cache=self.name)
+
+            if self.on_evict is not None:
+                self.on_evict(old_key, old_value)
+
+################################################################################
+    def pop(self, key: K) -> Optional[V]:
+
+        return self._data.pop(key, None)
+
+################################################################################
+    def clear(self) -> None:
+
+        self._data.clear()
+
+################################################################################
@@ -0,0 +1,400 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+
+from discord    import HTTPException, Interaction, Message, PartialMessage
+from discord.abc    import Messageable
+from typing     import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TypeVar,
+    Union
+)
+
+from utilities.enums    import OutboundPriority
+from utilities.metrics  import metrics, tracer
+
+from .hydration import RateLimiter
+################################################################################
+
+__all__ = (
+    "OutboundScheduler",
+    "outbound",
+    "channel_route",
+    "interaction_route",
+)
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+QUEUE_WAIT = metrics.histogram(
+    "frogbot_outbound_queue_wait_seconds",
+    "Time Discord requests spent queued before being sent, by priority.",
+    ("priority", )
+)
+REQUESTS_FINISHED = metrics.counter(
+    "frogbot_outbound_requests_total",
+    "Discord requests sent through the outbound scheduler, by priority and outcome.",
+    ("priority", "result")
+)
+RATE_LIMITED = metrics.counter(
+    "frogbot_outbound_rate_limited_total",
+    "429 responses seen by the outbound scheduler, by whether they were global.",
+    ("scope", )
+)
+BACKPRESSURE = metrics.counter(
+    "frogbot_outbound_backpressure_total",
+    "Requests that had to wait for room because their priority's queue was full.",
+    ("priority", )
+)
+QUEUED = metrics.gauge(
+    "frogbot_outbound_queued",
+    "Discord requests queued or in flight, by priority.",
+    ("priority", )
+)
+
+################################################################################
+def channel_route(channel_id: int) -> str:
+
+    return f"channel:{channel_id}"
+
+################################################################################
+def interaction_route(interaction: Interaction) -> str:
+
+    return f"interaction:{interaction.id}"
+
+################################################################################
+class _Request:
+
+    __slots__ = (
+        "route",
+        "priority",
+        "seq",
+        "call",
+        "future",
+        "enqueued",
+        "sent",
+        "attempt",
+        "attempts"
+    )
+
+    def __init__(
+        self,
+        route: str,
+        priority: OutboundPriority,
+        seq: int,
+        call: Callable[[], Awaitable[Any]],
+        attempts: int
+    ):
+
+        self.route: str = route
+        self.priority: OutboundPriority = priority
+        self.seq: int = seq
+        self.call: Callable[[], Awaitable[Any]] = call
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.enqueued: float = time.perf_counter()
+        self.sent: Optional[float] = None
+        self.attempt: int = 1
+        self.attempts: int = attempts
+
+    def __lt__(self, other: _Request) -> bool:
+
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+################################################################################
+class _Route:
+
+    __slots__ = (
+        "busy",
+        "paused_until",
+        "deferred"
+    )
+
+    def __init__(self):
+
+        self.busy: bool = False
+        self.paused_until: float = 0.0
+        # Requests that came up while the route was busy or paused.
+        self.deferred: List[_Request] = []
+
+################################################################################
+class OutboundScheduler:
+    """Sends Discord requests from one prioritised queue.
+
+    Every request names a route (eg. ``channel:<id>``), matching the bucket
+    Discord rate limits it in. Requests on one route go out one at a time, in
+    priority order: interactive responses ahead of background republishes,
+    ahead of attachment refreshes. Across routes, ``concurrency`` requests
+    may be in flight, at no more than ``rate`` per second overall.
+
+    Each priority may have at most ``max_queued`` requests waiting or in
+    flight; past that, :meth:`submit` waits for room, so a flood of
+    background work slows its producer down instead of piling up. A 429
+    pauses the route (or, for a global limit, everything) for its
+    Retry-After and the request is tried again, up to ``attempts`` times.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float = 40.0,
+        concurrency: int = 8,
+        max_queued: int = 500,
+        attempts: int = 3
+    ):
+
+        self.limiter: RateLimiter = RateLimiter(rate)
+        self.concurrency: int = concurrency
+        self.max_queued: int = max_queued
+        self.attempts: int = attempts
+
+        self._heap: List[_Request] = []
+        self._routes: Dict[str, _Route] = {}
+        self._seq = itertools.count()
+        self._room: Dict[OutboundPriority, asyncio.Semaphore] = {}
+        self._queued: Dict[OutboundPriority, int] = {p: 0 for p in OutboundPriority}
+        self._ready: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+
+        for priority in OutboundPriority:
+            QUEUED.set_function(lambda p=priority: self._queued[p], priority=priority.name)
+
+################################################################################
+    async def submit(
+        self,
+        route: str,
+        call: Callable[[], Awaitable[T]],
+        *,
+        priority: OutboundPriority = OutboundPriority.Interactive,
+        attempts: Optional[int] = None
+    ) -> T:
+        """Queues ``call`` (called afresh for every attempt) on ``route`` and
+        returns its result once sent. Exceptions other than retried 429s are
+        raised here."""
+
+        if not self._workers:
+            self._start()
+
+        room = self._room[priority]
+        if room.locked():
+            BACKPRESSURE.inc(priority=priority.name)
+        await room.acquire()
+
+        self._queued[priority] += 1
+        try:
+            request = _Request(route, priority, next(self._seq), call, attempts or self.attempts)
+            with tracer.span(f"discord {route.partition(':')[0]}", "rest", route=route, priority=priority.name) as span:
+                self._push(request)
+                try:
+                    return await request.future
+                finally:
+                    if span is not None and request.sent is not None:
+                        span.attributes["queued_ms"] = round((request.sent - request.enqueued) * 1000, 3)
+                        span.attributes["attempts"] = request.attempt
+        finally:
+            self._queued[priority] -= 1
+            room.release()
+
+################################################################################
+    async def send(
+        self,
+        channel: Messageable,
+        *,
+        priority: OutboundPriority = OutboundPriority.Interactive,
+        **kwargs
+    ) -> Message:
+
+        return await self.submit(
+            channel_route(channel.id),  # type: ignore
+            lambda: channel.send(**kwargs),
+            priority=priority
+        )
+
+################################################################################
+    async def edit(
+        self,
+        message: Union[Message, PartialMessage],
+        *,
+        priority: OutboundPriority = OutboundPriority.Interactive,
+        **kwargs
+    ) -> Any:
+
+        return await self.submit(
+            channel_route(message.channel.id),
+            lambda: message.edit(**kwargs),
+            priority=priority
+        )
+
+################################################################################
+    async def respond(self, interaction: Interaction, **kwargs) -> Any:
+        """Responds to ``interaction``, or follows up if it's already been
+        responded to."""
+
+        async def call():
+            if interaction.response.is_done():
+                return await interaction.followup.send(**kwargs)
+            return await interaction.response.send_message(**kwargs)
+
+        return await self.submit(interaction_route(interaction), call)
+
+################################################################################
+    async def edit_response(self, interaction: Interaction, **kwargs) -> Any:
+
+        return await self.submit(
+            interaction_route(interaction),
+            lambda: interaction.edit_original_response(**kwargs)
+        )
+
+################################################################################
+    def _start(self) -> None:
+
+        self._ready = asyncio.Event()
+        self._room = {p: asyncio.Semaphore(self.max_queued) for p in OutboundPriority}
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"frogbot-outbound-{i}")
+            for i in range(self.concurrency)
+        ]
+
+################################################################################
+    def _push(self, request: _Request) -> None:
+
+        heapq.heappush(self._heap, request)
+        self._ready.set()
+
+################################################################################
+    async def _next(self) -> _Request:
+
+        while True:
+            while self._heap:
+                request = heapq.heappop(self._heap)
+                if request.future.done():
+                    # Its caller gave up waiting.
+                    continue
+
+                route = self._routes.get(request.route)
+                if route is None:
+                    route = self._routes[request.route] = _Route()
+                if route.busy or route.paused_until > time.monotonic():
+                    route.deferred.append(request)
+                    continue
+
+                route.busy = True
+                return request
+
+            self._ready.clear()
+            await self._ready.wait()
+
+################################################################################
+    def _release(self, key: str) -> None:
+
+        route = self._routes.get(key)
+        if route is None or route.busy:
+            return
+
+        wait = route.paused_until - time.monotonic()
+        if wait > 0:
+            asyncio.get_running_loop().call_later(wait, self._release, key)
+            return
+
+        for request in route.deferred:
+            heapq.heappush(self._heap, request)
+        route.deferred.clear()
+        del self._routes[key]
+
+        self._ready.set()
+
+################################################################################
+    async def _work(self) -> None:
+
+        while True:
+            request = await self._next()
+            route = self._routes[request.route]
+            try:
+                await self.limiter.acquire()
+                if request.attempt == 1:
+                    request.sent = time.perf_counter()
+                    QUEUE_WAIT.observe(request.sent - request.enqueued, priority=request.priority.name)
+
+                await self._send(request, route)
+            finally:
+                route.busy = False
+                self._release(request.route)
+
+################################################################################
+    async def _send(self, request: _Request, route: _Route) -> None:
+
+        priority = request.priority.name
+        try:
+            result = await request.call()
+        except HTTPException as exc:
+            if exc.status != 429 or request.attempt >= request.attempts:
+                REQUESTS_FINISHED.inc(priority=priority, result="failed")
+                if not request.future.done():
+                    request.future.set_exception(exc)
+                return
+
+            retry_after = float(exc.response.headers.get("Retry-After", 1.0))
+            if exc.response.headers.get("X-RateLimit-Global"):
+                RATE_LIMITED.inc(scope="global")
+                self.limiter.pause(retry_after)
+            else:
+                RATE_LIMITED.inc(scope="route")
+                route.paused_until = time.monotonic() + retry_after
+            log.info("%s rate limited; retrying in %.2fs.", request.route, retry_after)
+
+            request.attempt += 1
+            route.deferred.insert(0, request)
+        except Exception as exc:
+            REQUESTS_FINISHED.inc(priority=priority, result="failed")
+            if not request.future.done():
+                request.future.set_exception(exc)
+        else:
+            REQUESTS_FINISHED.inc(priority=priority, result="sent")
+            if not request.future.done():
+                request.future.set_result(result)
+
+################################################################################
+    @property
+    def stats(self) -> Dict[str, int]:
+
+        return {
+            "routes": len(self._routes),
+            **{p.name.lower(): n for p, n in self._queued.items()},
+        }
+
+################################################################################
+    async def close(self) -> None:
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        for request in self._heap:
+            request.future.cancel()
+        for route in self._routes.values():
+            for request in route.deferred:
+                request.future.cancel()
+
+        self._heap.clear()
+        self._routes.clear()
+
+################################################################################
+
+outbound = OutboundScheduler(
+    rate=float(os.getenv("OUTBOUND_RATE", 40)),
+    concurrency=int(os.getenv("OUTBOUND_CONCURRENCY", 8)),
+    max_queued=int(os.getenv("OUTBOUND_MAX_QUEUED", 500))
+)
+
+################################################################################
@@ -9,12 +9,52 @@ __all__ = (
 
 ################################################################################
 def convert_db_list(data: Optional[str]) -> List[str]:
+    """Parses a list from the old text-encoded list columns, eg. ``{a,"b, c"}``.
 
-    if data is None or not data or data == "{}":
+    List columns are native arrays now, so this is only needed to migrate rows
+    written before the switch. Quoted items may contain commas, braces and
+    backslash-escaped quotes."""
+
+    if not data:
+        return []
+
+    data = data.strip()
+    if data.startswith("{") and data.endswith("}"):
+        data = data[1:-1]
+    if not data:
         return []
 
-    base_list = [i for i in data.lstrip("{").rstrip("}").split(",")]
+    items: List[str] = []
+    current: List[str] = []
+    quoted = in_quotes = escaped = False
+
+    for c in data:
+        if escaped:
+            current.append(c)
+            escaped = False
+        elif c == "\\" and in_quotes:
+            escaped = True
+        elif c == '"':
+            in_quotes = not in_quotes
+            quoted = True
+        elif c == "," and not in_quotes:
+            items.append(_finish_item(current, quoted))
+            current, quoted = [], False
+        else:
+            current.append(c)
+
+    items.append(_finish_item(current, quoted))
+
+    return items
+
+################################################################################
+def _finish_item(chars: List[str], quoted: bool) -> str:
+
+    value = "".join(chars)
+    if quoted:
+        return value
 
-    return [i.strip("'").strip('"') for i in base_list]
+    # Some very old rows were written with Python-style quotes.
+    return value.strip().strip("'")
 
 ################################################################################